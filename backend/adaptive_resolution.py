@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Load-aware input resolution for YOLO inference.
+
+The detection service counts in-flight /api/detect requests and picks the
+inference `imgsz` from that backlog: full resolution when idle, smaller sizes
+under pressure. Only sizes whose validation mAP50 stays within the configured
+drop from the full-resolution baseline are eligible.
+
+Build the calibration table (validation mAP at each size):
+    python adaptive_resolution.py --model best.pt \
+        --data ../datasets/merged_food_dataset/data.yaml
+"""
+
+import argparse
+import asyncio
+import json
+import os
+from contextlib import asynccontextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+DEFAULT_IMGSZ = 640
+CALIBRATION_SIZES = [640, 576, 512, 480, 416, 352, 320]
+DEFAULT_CALIBRATION_PATH = os.path.join(os.path.dirname(__file__), "resolution_calibration.json")
+
+
+class InferenceQueue:
+    """Serializes model calls and tracks how many requests are waiting or running."""
+
+    def __init__(self, max_concurrent: int = 1):
+        self.max_concurrent = max_concurrent
+        self.depth = 0
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+
+    @asynccontextmanager
+    async def slot(self):
+        """Wait for an inference slot; yields the number of other requests in flight."""
+        self.depth += 1
+        try:
+            async with self._semaphore:
+                yield self.depth - 1
+        finally:
+            self.depth -= 1
+
+
+class ResolutionSelector:
+    """Maps queue depth to an input size using a validation calibration table."""
+
+    def __init__(
+        self,
+        calibration: List[Dict],
+        default_imgsz: int = DEFAULT_IMGSZ,
+        max_map50_drop: float = 0.05,
+        queue_step: int = 2,
+    ):
+        by_size = {int(entry["imgsz"]): entry for entry in calibration}
+        if default_imgsz not in by_size:
+            raise ValueError(f"Calibration table has no entry for default imgsz {default_imgsz}")
+
+        baseline = by_size[default_imgsz]["map50"]
+        self.default_imgsz = default_imgsz
+        self.max_map50_drop = max_map50_drop
+        self.queue_step = max(1, queue_step)
+        # Largest first; never go above the default resolution
+        self.sizes = sorted(
+            (size for size, entry in by_size.items()
+             if size <= default_imgsz and entry["map50"] >= baseline - max_map50_drop),
+            reverse=True,
+        )
+
+    @classmethod
+    def from_file(cls, path: str, **kwargs) -> "ResolutionSelector":
+        with open(path, "r") as f:
+            table = json.load(f)
+        return cls(table["sizes"], **kwargs)
+
+    def choose(self, queue_depth: int) -> int:
+        """Step down one eligible size for every `queue_step` requests waiting."""
+        level = min(max(queue_depth, 0) // self.queue_step, len(self.sizes) - 1)
+        return self.sizes[level]
+
+
+def load_selector_from_env() -> Optional[ResolutionSelector]:
+    """Build the selector if ADAPTIVE_IMGSZ is enabled and a calibration table exists."""
+    if os.getenv("ADAPTIVE_IMGSZ", "0").lower() not in ("1", "true", "yes"):
+        return None
+
+    path = os.getenv("IMGSZ_CALIBRATION", DEFAULT_CALIBRATION_PATH)
+    if not os.path.exists(path):
+        print(f"⚠️ Adaptive imgsz requested but calibration table not found: {path}")
+        return None
+
+    try:
+        selector = ResolutionSelector.from_file(
+            path,
+            default_imgsz=int(os.getenv("ADAPTIVE_IMGSZ_DEFAULT", DEFAULT_IMGSZ)),
+            max_map50_drop=float(os.getenv("ADAPTIVE_IMGSZ_MAX_MAP50_DROP", "0.05")),
+            queue_step=int(os.getenv("ADAPTIVE_IMGSZ_QUEUE_STEP", "2")),
+        )
+    except Exception as e:
+        print(f"❌ Failed to load imgsz calibration table: {e}")
+        return None
+
+    print(f"✅ Adaptive imgsz enabled, eligible sizes: {selector.sizes}")
+    return selector
+
+
+def calibrate(model_path: str, data: str, sizes: List[int], batch: int = 8) -> Dict:
+    """Run validation at each size and collect mAP and inference latency."""
+    from ultralytics import YOLO
+
+    from dataset_config import resolve_dataset_config
+
+    data_config = resolve_dataset_config(data)
+    model = YOLO(model_path)
+    entries = []
+
+    for imgsz in sizes:
+        print(f"🔍 Validating at imgsz={imgsz}...")
+        metrics = model.val(
+            data=data_config,
+            imgsz=imgsz,
+            batch=batch,
+            split="val",
+            device="cpu",
+            plots=False,
+            verbose=False,
+        )
+        entries.append({
+            "imgsz": imgsz,
+            "map50": round(float(metrics.box.map50), 4),
+            "map50_95": round(float(metrics.box.map), 4),
+            "inference_ms": round(float(metrics.speed["inference"]), 2),
+        })
+        print(f"   - mAP50: {entries[-1]['map50']:.4f}, inference: {entries[-1]['inference_ms']:.1f}ms")
+
+    return {
+        "model": os.path.basename(model_path),
+        "dataset": data,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "sizes": entries,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the imgsz calibration table for adaptive inference")
+    parser.add_argument("--model", default="best.pt")
+    parser.add_argument("--data", default="../datasets/merged_food_dataset/data.yaml")
+    parser.add_argument("--sizes", type=int, nargs="+", default=CALIBRATION_SIZES)
+    parser.add_argument("--batch", type=int, default=8)
+    parser.add_argument("--output", default=DEFAULT_CALIBRATION_PATH)
+    args = parser.parse_args()
+
+    if not Path(args.model).exists():
+        print(f"❌ Model not found: {args.model}")
+        return
+
+    table = calibrate(args.model, args.data, args.sizes, batch=args.batch)
+    with open(args.output, "w") as f:
+        json.dump(table, f, indent=2)
+    print(f"✅ Calibration table saved to: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
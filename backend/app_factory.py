@@ -0,0 +1,132 @@
+"""
+Application factory for every way the backend is deployed.
+
+    create_app("full")         detection + recipe generation (Ollama), mock
+                               fallbacks so development works without a model
+    create_app("detect-only")  the Docker detection service; recipes are
+                               generated on-device, so the recipe stack and
+                               ollama are never imported
+
+Both profiles share one DetectionPipeline and one set of detection routes
+(detection_api.py), so a change to the inference path is made once.
+main.py and main-docker.py build the two profiles; any profile can also be
+served straight from the factory:
+
+    APP_PROFILE=detect-only uvicorn --factory app_factory:create_app
+"""
+
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from fastapi import FastAPI, Response
+from fastapi.middleware.cors import CORSMiddleware
+
+from detection_api import create_detection_router
+from detection_pipeline import DetectionPipeline
+from metrics import render_metrics
+from profiling import profiling_middleware, router as profiling_router
+
+DEFAULT_PROFILE = "full"
+
+PROFILES = {
+    "full": {
+        "title": "Kitchen Assistant API",
+        "description": "Edge-AI Kitchen Assistant Backend API",
+        "version": "1.0.0",
+        "recipes": True,
+        "mock_fallback": True,
+    },
+    "detect-only": {
+        "title": "Kitchen Assistant API - YOLO Detection Service",
+        "description": "Ingredient detection service using fine-tuned YOLOv8n",
+        "version": "1.0.0-docker",
+        "recipes": False,
+        "mock_fallback": False,
+    },
+}
+
+
+def create_app(profile: Optional[str] = None) -> FastAPI:
+    profile = profile or os.getenv("APP_PROFILE", DEFAULT_PROFILE)
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown APP_PROFILE '{profile}', expected one of {sorted(PROFILES)}")
+    settings = PROFILES[profile]
+    print(f"🚀 Starting Kitchen Assistant backend ({profile} profile)")
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        # Recipe job workers (full profile) pick up jobs a stopped process left behind
+        recipe_jobs = app.state.recipe_jobs
+        if recipe_jobs is not None:
+            recipe_jobs.start()
+        try:
+            yield
+        finally:
+            if recipe_jobs is not None:
+                recipe_jobs.stop()
+
+    app = FastAPI(title=settings["title"], description=settings["description"], version=settings["version"],
+                  lifespan=lifespan)
+    pipeline = DetectionPipeline()
+    app.state.profile = profile
+    app.state.pipeline = pipeline
+    app.state.recipe_jobs = None
+
+    # CORS middleware for iOS app
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],  # For development - restrict in production
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    # Opt-in profiling (admin-gated, see profiling.py)
+    app.middleware("http")(profiling_middleware)
+    app.include_router(profiling_router)
+
+    app.include_router(create_detection_router(pipeline, mock_fallback=settings["mock_fallback"]))
+
+    services = {"detection": "available"}
+    extra_health = {}
+    if settings["recipes"]:
+        # Imported here so the detect-only image never loads ollama or the recipe stack
+        import recipe_api
+
+        app.include_router(recipe_api.router)
+        app.state.recipe_jobs = recipe_api.recipe_jobs
+        services["recipe_generation"] = "ollama" if recipe_api.OLLAMA_AVAILABLE else "mock"
+        extra_health["ollama_available"] = recipe_api.OLLAMA_AVAILABLE
+    else:
+        services["recipe_generation"] = "handled by iOS MLX on-device"
+        extra_health["yolo_model_loaded"] = pipeline.loaded  # Key the detection service has always reported
+
+    @app.get("/")
+    async def root():
+        return {
+            "message": settings["title"],
+            "version": settings["version"],
+            "status": "running",
+            "profile": profile,
+            "services": services,
+        }
+
+    @app.get("/health")
+    async def health_check():
+        return {
+            "status": "healthy",
+            "timestamp": time.time(),
+            "profile": profile,
+            **pipeline.health(),
+            **extra_health,
+        }
+
+    @app.get("/metrics")
+    async def metrics_endpoint():
+        """Prometheus scrape endpoint"""
+        body, content_type = render_metrics()
+        return Response(content=body, media_type=content_type)
+
+    return app
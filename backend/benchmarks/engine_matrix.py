@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+"""
+CPU inference-engine matrix for the fine-tuned detector.
+
+Exports the same .pt model to TorchScript, ONNX (FP32 and static INT8) and
+OpenVINO, then loads each artifact through Ultralytics so preprocessing and
+NMS are identical and only the engine differs. Every engine runs in its own
+spawned process on a fixed, in-memory image set, so peak RSS is per engine.
+
+Reported per engine: batch-1 latency p50/p95/p99, throughput at each batch
+size, peak RSS, artifact size, and mAP50 drift against the .pt baseline.
+Results go to a Markdown table (for committing) plus a JSON file.
+
+ONNX Runtime and OpenVINO are optional (pip install onnx onnxruntime openvino);
+engines whose packages are missing are listed as skipped.
+
+Examples:
+    python benchmarks/engine_matrix.py --model best.pt
+    python benchmarks/engine_matrix.py --engines pytorch onnx onnx-int8 --skip-map
+"""
+
+import argparse
+import glob
+import importlib.util
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import shutil
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+BENCH_DIR = Path(__file__).resolve().parent
+BACKEND_DIR = BENCH_DIR.parent
+REPO_DIR = BACKEND_DIR.parent
+DEFAULT_IMAGE_GLOB = str(REPO_DIR / "datasets" / "merged_food_dataset" / "val" / "images" / "*.jpg")
+DEFAULT_DATA = str(REPO_DIR / "datasets" / "merged_food_dataset" / "data.yaml")
+DEFAULT_OUTPUT_DIR = BENCH_DIR / "results"
+
+sys.path.insert(0, str(BACKEND_DIR))
+sys.path.insert(0, str(BENCH_DIR))
+from dataset_config import resolve_dataset_config  # noqa: E402
+from load_test import git_commit  # noqa: E402
+
+ENGINES = ("pytorch", "torchscript", "onnx", "onnx-int8", "openvino")
+ENGINE_REQUIREMENTS = {
+    "pytorch": [],
+    "torchscript": [],
+    "onnx": ["onnx", "onnxruntime"],
+    "onnx-int8": ["onnx", "onnxruntime"],
+    "openvino": ["openvino"],
+}
+
+
+def missing_requirements(engine: str) -> List[str]:
+    return [name for name in ENGINE_REQUIREMENTS[engine] if importlib.util.find_spec(name) is None]
+
+
+def load_images(pattern: str, limit: int) -> List[str]:
+    paths = sorted(glob.glob(pattern))[:limit]
+    if not paths:
+        raise FileNotFoundError(f"No images match: {pattern}")
+    return paths
+
+
+def _calibration_reader(paths: List[str], imgsz: int):
+    """Feeds letterboxed calibration images to onnxruntime's static quantizer."""
+    import cv2
+    from onnxruntime.quantization import CalibrationDataReader
+    from ultralytics.data.augment import LetterBox
+
+    class Reader(CalibrationDataReader):
+        def __init__(self):
+            self._paths = iter(paths)
+            self._letterbox = LetterBox((imgsz, imgsz), auto=False)
+
+        def get_next(self):
+            path = next(self._paths, None)
+            if path is None:
+                return None
+            image = self._letterbox(image=cv2.imread(path))[:, :, ::-1].transpose(2, 0, 1)
+            return {"images": np.ascontiguousarray(image[None], dtype=np.float32) / 255.0}
+
+    return Reader()
+
+
+def export_artifacts(model_path: str, engines: List[str], workdir: Path, imgsz: int,
+                     calibration_images: List[str]) -> Dict[str, str]:
+    """Export the model once per format into `workdir`; returns engine -> artifact path."""
+    from ultralytics import YOLO
+
+    workdir.mkdir(parents=True, exist_ok=True)
+    source = workdir / Path(model_path).name
+    shutil.copy2(model_path, source)
+    artifacts = {"pytorch": str(source)}
+
+    def export(**kwargs) -> str:
+        return str(YOLO(str(source)).export(imgsz=imgsz, device="cpu", **kwargs))
+
+    if "torchscript" in engines:
+        artifacts["torchscript"] = export(format="torchscript")
+    if "onnx" in engines or "onnx-int8" in engines:
+        artifacts["onnx"] = export(format="onnx", dynamic=True, simplify=True)
+    if "onnx-int8" in engines:
+        from onnxruntime.quantization import QuantFormat, QuantType, quantize_static
+
+        int8_path = str(workdir / f"{source.stem}_int8.onnx")
+        print(f"🔄 Quantizing ONNX to INT8 with {len(calibration_images)} calibration images...")
+        quantize_static(
+            artifacts["onnx"], int8_path, _calibration_reader(calibration_images, imgsz),
+            quant_format=QuantFormat.QDQ, per_channel=True,
+            weight_type=QuantType.QInt8, activation_type=QuantType.QUInt8,
+        )
+        artifacts["onnx-int8"] = int8_path
+    if "openvino" in engines:
+        artifacts["openvino"] = export(format="openvino", dynamic=True)
+    return {engine: path for engine, path in artifacts.items() if engine in engines}
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss survives fork+exec, so a spawned child would report the parent's
+    # peak; VmHWM belongs to the new address space and starts from zero.
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _artifact_size_mb(path: str) -> float:
+    target = Path(path)
+    files = target.rglob("*") if target.is_dir() else [target]
+    return sum(f.stat().st_size for f in files if f.is_file()) / (1024 * 1024)
+
+
+def bench_engine(artifact: str, image_paths: List[str], imgsz: int, batch_sizes: List[int],
+                 repeats: int, warmup: int) -> Dict:
+    """Runs in a fresh process: latency at batch 1 and throughput per batch size."""
+    import cv2
+    from ultralytics import YOLO
+
+    images = [cv2.imread(path) for path in image_paths]
+    model = YOLO(artifact, task="detect")
+
+    def predict(batch):
+        return model.predict(batch, imgsz=imgsz, batch=len(batch), conf=0.1, device="cpu", verbose=False)
+
+    for i in range(warmup):
+        predict([images[i % len(images)]])
+
+    latencies, inference_ms = [], []
+    for _ in range(repeats):
+        for image in images:
+            start = time.perf_counter()
+            results = predict([image])
+            latencies.append((time.perf_counter() - start) * 1000.0)
+            inference_ms.append(results[0].speed["inference"])
+
+    throughput = {}
+    for batch_size in batch_sizes:
+        predict(images[:batch_size])
+        processed = 0
+        start = time.perf_counter()
+        for _ in range(repeats):
+            for i in range(0, len(images), batch_size):
+                chunk = images[i:i + batch_size]
+                predict(chunk)
+                processed += len(chunk)
+        throughput[str(batch_size)] = round(processed / (time.perf_counter() - start), 2)
+
+    values = np.array(latencies)
+    return {
+        "latency_ms": {
+            "mean": round(float(values.mean()), 2),
+            "p50": round(float(np.percentile(values, 50)), 2),
+            "p95": round(float(np.percentile(values, 95)), 2),
+            "p99": round(float(np.percentile(values, 99)), 2),
+        },
+        "inference_ms_p50": round(float(np.median(inference_ms)), 2),
+        "throughput_ips": throughput,
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+    }
+
+
+def validate_engine(artifact: str, data: str, imgsz: int) -> Dict:
+    """Runs in a fresh process so validation memory does not count towards peak RSS."""
+    from ultralytics import YOLO
+
+    metrics = YOLO(artifact, task="detect").val(
+        data=resolve_dataset_config(data), imgsz=imgsz, batch=1, split="val",
+        device="cpu", plots=False, verbose=False,
+    )
+    return {"map50": round(float(metrics.box.map50), 4), "map50_95": round(float(metrics.box.map), 4)}
+
+
+def run_isolated(fn, *args):
+    ctx = multiprocessing.get_context("spawn")
+    with ctx.Pool(1, maxtasksperchild=1) as pool:
+        return pool.apply(fn, args)
+
+
+def _format_row(engine: str, entry: Dict, batch_sizes: List[int], baseline_map50: Optional[float]) -> str:
+    if "skipped" in entry:
+        return f"| {engine} | skipped: {entry['skipped']} |" + " |" * (7 + len(batch_sizes))
+    latency = entry["latency_ms"]
+    cells = [
+        engine,
+        f"{entry['size_mb']:.1f}",
+        f"{latency['p50']:.1f}",
+        f"{latency['p95']:.1f}",
+        f"{latency['p99']:.1f}",
+        f"{entry['inference_ms_p50']:.1f}",
+        *[f"{entry['throughput_ips'][str(b)]:.2f}" for b in batch_sizes],
+        f"{entry['peak_rss_mb']:.0f}",
+    ]
+    if "map50" in entry:
+        drift = entry["map50"] - baseline_map50 if baseline_map50 is not None else None
+        cells += [f"{entry['map50']:.4f}", f"{drift:+.4f}" if drift is not None else "n/a"]
+    else:
+        cells += ["n/a", "n/a"]
+    return "| " + " | ".join(cells) + " |"
+
+
+def render_markdown(report: Dict) -> str:
+    config = report["config"]
+    batch_sizes = config["batch_sizes"]
+    baseline_map50 = report["engines"].get("pytorch", {}).get("map50")
+    header = ["Engine", "Size (MB)", "p50 (ms)", "p95 (ms)", "p99 (ms)", "Model-only p50 (ms)",
+              *[f"img/s @b{b}" for b in batch_sizes], "Peak RSS (MB)", "mAP50", "ΔmAP50 vs .pt"]
+    lines = [
+        f"# Inference engine matrix — {report['model']}",
+        "",
+        f"- Created: {report['created_at']} (commit `{(report['git_commit'] or 'nogit')[:8]}`)",
+        f"- Machine: {report['machine']['platform']}, {report['machine']['cpu_count']} CPUs, "
+        f"Python {report['machine']['python']}",
+        f"- Images: {report['image_count']} from `{config['images']}`, imgsz={config['imgsz']}, "
+        f"{config['repeats']} repeat(s), {config['warmup']} warmup",
+        "- Latency is end-to-end `predict` at batch 1 (preprocess + model + NMS); "
+        "model-only is Ultralytics' inference stage.",
+        "",
+        "| " + " | ".join(header) + " |",
+        "|" + "---|" * len(header),
+    ]
+    lines += [_format_row(engine, entry, batch_sizes, baseline_map50) for engine, entry in report["engines"].items()]
+    return "\n".join(lines) + "\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the detector across CPU inference engines")
+    parser.add_argument("--model", default=str(BACKEND_DIR / "best.pt"))
+    parser.add_argument("--engines", nargs="+", choices=ENGINES, default=list(ENGINES))
+    parser.add_argument("--images", default=DEFAULT_IMAGE_GLOB)
+    parser.add_argument("--max-images", type=int, default=32)
+    parser.add_argument("--calibration-images", type=int, default=64, help="Images used for INT8 calibration")
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--data", default=DEFAULT_DATA, help="Dataset yaml for the mAP50 check")
+    parser.add_argument("--skip-map", action="store_true", help="Skip the mAP50 drift check")
+    parser.add_argument("--workdir", default=None, help="Where to write exported artifacts")
+    parser.add_argument("--output", default=str(DEFAULT_OUTPUT_DIR / "engine_matrix.md"))
+    args = parser.parse_args()
+
+    if not Path(args.model).exists():
+        print(f"❌ Model not found: {args.model}")
+        sys.exit(1)
+
+    images = load_images(args.images, args.max_images)
+    calibration = load_images(args.images, args.calibration_images)
+    workdir = Path(args.workdir) if args.workdir else BENCH_DIR / "artifacts" / Path(args.model).stem
+
+    engines = {}
+    runnable = []
+    for engine in args.engines:
+        missing = missing_requirements(engine)
+        if missing:
+            print(f"⚠️ Skipping {engine}: {', '.join(missing)} not installed")
+            engines[engine] = {"skipped": f"missing {', '.join(missing)}"}
+        else:
+            runnable.append(engine)
+
+    print(f"🔄 Exporting {args.model} for: {', '.join(runnable)}")
+    artifacts = export_artifacts(args.model, runnable, workdir, args.imgsz, calibration)
+
+    for engine in runnable:
+        artifact = artifacts[engine]
+        print(f"🚀 {engine}: {Path(artifact).name}")
+        entry = {"artifact": artifact, "size_mb": round(_artifact_size_mb(artifact), 2)}
+        entry.update(run_isolated(bench_engine, artifact, images, args.imgsz, args.batch_sizes,
+                                  args.repeats, args.warmup))
+        if not args.skip_map:
+            entry.update(run_isolated(validate_engine, artifact, args.data, args.imgsz))
+        engines[engine] = entry
+        latency = entry["latency_ms"]
+        print(f"   - p50 {latency['p50']:.1f}ms, p95 {latency['p95']:.1f}ms, "
+              f"peak RSS {entry['peak_rss_mb']:.0f}MB"
+              + (f", mAP50 {entry['map50']:.4f}" if "map50" in entry else ""))
+
+    report = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "git_commit": git_commit(),
+        "model": os.path.basename(args.model),
+        "machine": {
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "cpu_count": os.cpu_count(),
+        },
+        "image_count": len(images),
+        "config": {k: v for k, v in vars(args).items() if k not in ("output", "workdir")},
+        "engines": engines,
+    }
+
+    output = Path(args.output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(render_markdown(report))
+    output.with_suffix(".json").write_text(json.dumps(report, indent=2))
+    print(f"✅ Engine matrix saved to: {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Reproducible load test for /api/detect and /api/recipes.
+
+Starts the stub Ollama server and the API (uvicorn subprocess) unless --url is
+given, replays real images from datasets/ALL/*/test/images at each requested
+concurrency level, and writes throughput, p50/p95/p99 latency and error rate to
+a JSON file tagged with the current git commit.
+
+Examples:
+    python benchmarks/load_test.py --concurrency 1 4 8 --requests 100
+    python benchmarks/load_test.py --baseline benchmarks/results/<previous>.json
+"""
+
+import argparse
+import asyncio
+import glob
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import httpx
+import numpy as np
+
+BENCH_DIR = Path(__file__).resolve().parent
+BACKEND_DIR = BENCH_DIR.parent
+REPO_DIR = BACKEND_DIR.parent
+DEFAULT_IMAGE_GLOB = str(REPO_DIR / "datasets" / "ALL" / "*" / "test" / "images" / "*.jpg")
+DEFAULT_OUTPUT_DIR = BENCH_DIR / "results"
+
+sys.path.insert(0, str(BENCH_DIR))
+from stub_ollama import start_stub_server  # noqa: E402
+
+RECIPE_INGREDIENTS = ["Beef", "Pork", "Chicken", "Butter", "Cheese", "Milk",
+                      "Broccoli", "Carrot", "Cucumber", "Lettuce", "Tomato"]
+RECIPE_CRAVINGS = ["stir-fry", "pasta", "salad", "soup", "omelette"]
+
+
+def load_images(pattern: str, limit: int) -> List[Dict]:
+    """Read a fixed, sorted set of images into memory so disk I/O is not measured."""
+    paths = sorted(glob.glob(pattern))[:limit]
+    if not paths:
+        raise FileNotFoundError(f"No images match: {pattern}")
+    return [{"name": os.path.basename(p), "data": Path(p).read_bytes()} for p in paths]
+
+
+def build_recipe_requests(count: int, seed: int) -> List[Dict]:
+    rng = random.Random(seed)
+    return [
+        {
+            "ingredients": rng.sample(RECIPE_INGREDIENTS, rng.randint(2, 5)),
+            "mealCraving": rng.choice(RECIPE_CRAVINGS),
+            "dietaryRestrictions": [],
+            "preferredCuisine": "Any",
+        }
+        for _ in range(count)
+    ]
+
+
+def summarize(latencies: List[float], errors: int, total: int, wall_time: float) -> Dict:
+    values = np.array(latencies) * 1000.0 if latencies else np.array([0.0])
+    return {
+        "requests": total,
+        "errors": errors,
+        "error_rate": round(errors / total, 4) if total else 0.0,
+        "throughput_rps": round(total / wall_time, 3) if wall_time > 0 else 0.0,
+        "latency_ms": {
+            "mean": round(float(values.mean()), 2),
+            "p50": round(float(np.percentile(values, 50)), 2),
+            "p95": round(float(np.percentile(values, 95)), 2),
+            "p99": round(float(np.percentile(values, 99)), 2),
+            "max": round(float(values.max()), 2),
+        },
+    }
+
+
+async def run_level(client: httpx.AsyncClient, endpoint: str, payloads: List, concurrency: int,
+                    total: int, warmup: int) -> Dict:
+    """Closed-loop load: `concurrency` workers issue `total` requests between them."""
+
+    async def send(index: int):
+        payload = payloads[index % len(payloads)]
+        if endpoint == "detect":
+            files = {"image": (payload["name"], payload["data"], "image/jpeg")}
+            return await client.post("/api/detect", files=files)
+        return await client.post("/api/recipes", json=payload)
+
+    for i in range(warmup):
+        await send(i)
+
+    latencies: List[float] = []
+    errors = 0
+    counter = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        for index in counter:
+            start = time.perf_counter()
+            try:
+                response = await send(index)
+                ok = response.status_code == 200
+            except httpx.HTTPError:
+                ok = False
+            latencies.append(time.perf_counter() - start)
+            errors += 0 if ok else 1
+
+    wall_start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, errors, total, time.perf_counter() - wall_start)
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_api(app: str, port: int, ollama_url: str) -> subprocess.Popen:
+    env = {**os.environ, "OLLAMA_HOST": ollama_url, "PYTHONUNBUFFERED": "1"}
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", app, "--host", "127.0.0.1", "--port", str(port), "--workers", "1"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL,
+    )
+
+
+def wait_for_health(url: str, server: Optional[subprocess.Popen] = None, timeout: float = 120.0) -> Dict:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if server is not None and server.poll() is not None:
+            raise RuntimeError(f"API process exited with code {server.returncode}")
+        try:
+            response = httpx.get(f"{url}/health", timeout=2.0)
+            if response.status_code == 200:
+                return response.json()
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    raise TimeoutError(f"API did not become healthy at {url}")
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=REPO_DIR, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: Dict, baseline: Dict, max_regression: float) -> List[str]:
+    """List endpoint/concurrency levels where p95 or throughput regressed beyond the limit."""
+    regressions = []
+    for key, current in results["levels"].items():
+        previous = baseline.get("levels", {}).get(key)
+        if previous is None:
+            continue
+        p95_now, p95_before = current["latency_ms"]["p95"], previous["latency_ms"]["p95"]
+        rps_now, rps_before = current["throughput_rps"], previous["throughput_rps"]
+        if p95_before > 0 and p95_now > p95_before * (1 + max_regression):
+            regressions.append(f"{key}: p95 {p95_before:.1f}ms -> {p95_now:.1f}ms")
+        if rps_before > 0 and rps_now < rps_before * (1 - max_regression):
+            regressions.append(f"{key}: throughput {rps_before:.2f} -> {rps_now:.2f} rps")
+        if current["error_rate"] > previous["error_rate"]:
+            regressions.append(f"{key}: error rate {previous['error_rate']:.2%} -> {current['error_rate']:.2%}")
+    return regressions
+
+
+async def run_benchmark(args, url: str) -> Dict:
+    images = load_images(args.images, args.max_images)
+    recipes = build_recipe_requests(max(args.requests, 1), args.seed)
+    levels = {}
+
+    timeout = httpx.Timeout(args.timeout)
+    async with httpx.AsyncClient(base_url=url, timeout=timeout) as client:
+        for endpoint in args.endpoints:
+            payloads = images if endpoint == "detect" else recipes
+            for concurrency in args.concurrency:
+                key = f"{endpoint}@c{concurrency}"
+                print(f"🚀 {key}: {args.requests} requests...")
+                levels[key] = await run_level(client, endpoint, payloads, concurrency, args.requests, args.warmup)
+                latency = levels[key]["latency_ms"]
+                print(f"   - {levels[key]['throughput_rps']:.2f} rps, p50 {latency['p50']:.1f}ms, "
+                      f"p95 {latency['p95']:.1f}ms, p99 {latency['p99']:.1f}ms, "
+                      f"errors {levels[key]['error_rate']:.2%}")
+    return levels
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the Kitchen Assistant API")
+    parser.add_argument("--url", help="Benchmark an already running server instead of starting one")
+    parser.add_argument("--app", default="main:app", help="uvicorn app to start when --url is not given")
+    parser.add_argument("--endpoints", nargs="+", choices=["detect", "recipes"], default=["detect", "recipes"])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--requests", type=int, default=100, help="Requests per endpoint and concurrency level")
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--images", default=DEFAULT_IMAGE_GLOB)
+    parser.add_argument("--max-images", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--decode-ms-per-token", type=float, default=2.0, help="Stub Ollama decode speed")
+    parser.add_argument("--output", default=None, help="Results JSON path (default: benchmarks/results/)")
+    parser.add_argument("--baseline", help="Previous results JSON to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.10)
+    args = parser.parse_args()
+
+    server = stub = None
+    url = args.url
+    try:
+        if url is None:
+            stub, ollama_url = start_stub_server(decode_ms_per_token=args.decode_ms_per_token)
+            port = _free_port()
+            server = start_api(args.app, port, ollama_url)
+            url = f"http://127.0.0.1:{port}"
+            print(f"🧪 Started {args.app} on {url} with stub Ollama at {ollama_url}")
+        health = wait_for_health(url, server)
+        levels = asyncio.run(run_benchmark(args, url))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+        if stub is not None:
+            stub.shutdown()
+
+    commit = git_commit()
+    results = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "git_commit": commit,
+        "machine": {
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "cpu_count": os.cpu_count(),
+        },
+        "config": {k: v for k, v in vars(args).items() if k not in ("baseline", "output")},
+        "server_health": health,
+        "levels": levels,
+    }
+
+    output = Path(args.output) if args.output else DEFAULT_OUTPUT_DIR / (
+        f"load_{datetime.now().strftime('%Y%m%d-%H%M%S')}_{(commit or 'nogit')[:8]}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2))
+    print(f"✅ Results saved to: {output}")
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        regressions = compare(results, baseline, args.max_regression)
+        if regressions:
+            print(f"❌ Regressions vs {baseline.get('git_commit', args.baseline)}:")
+            for line in regressions:
+                print(f"   - {line}")
+            sys.exit(1)
+        print(f"✅ No regressions beyond {args.max_regression:.0%} vs {baseline.get('git_commit', args.baseline)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+OpenVINO async backend vs the current torch path for /api/detect.
+
+Both backends are driven the way the service drives them: N concurrent
+clients submit PIL images; torch requests go through a one-slot
+InferenceQueue and a worker thread (as in main.py), OpenVINO requests go
+straight to OpenVINODetector.detect, which spreads them over its streams.
+Each backend runs in its own spawned process on the same in-memory images.
+
+Reported per backend and concurrency: request latency p50/p95, throughput,
+and per-image agreement of the detected classes with the torch path.
+Results go to a Markdown table (for committing) plus a JSON file.
+
+Examples:
+    python benchmarks/openvino_vs_torch.py --model best.pt
+    python benchmarks/openvino_vs_torch.py --model best.pt --concurrency 1 4 8 --streams 2
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+BENCH_DIR = Path(__file__).resolve().parent
+BACKEND_DIR = BENCH_DIR.parent
+DEFAULT_OUTPUT = BENCH_DIR / "results" / "openvino_vs_torch.md"
+
+sys.path.insert(0, str(BACKEND_DIR))
+sys.path.insert(0, str(BENCH_DIR))
+from engine_matrix import DEFAULT_IMAGE_GLOB, load_images, run_isolated  # noqa: E402
+from load_test import git_commit  # noqa: E402
+
+BACKENDS = ("torch", "openvino")
+
+
+def bench_backend(backend: str, artifact: str, image_paths: List[str], imgsz: int, conf: float,
+                  concurrency_levels: List[int], requests: int, warmup: int, streams: str) -> Dict:
+    """Runs in a fresh process: latency and throughput per concurrency, plus detected classes per image."""
+    from PIL import Image
+
+    images = []
+    for path in image_paths:
+        with Image.open(path) as image:
+            images.append(image.convert("RGB"))
+
+    if backend == "torch":
+        from ultralytics import YOLO
+
+        from adaptive_resolution import InferenceQueue
+        from postprocess import result_arrays
+
+        model = YOLO(artifact)
+        queue = InferenceQueue()
+
+        async def infer(image):
+            async with queue.slot():
+                results = await asyncio.get_running_loop().run_in_executor(
+                    None, lambda: model(image, conf=conf, imgsz=imgsz, verbose=False)
+                )
+            return result_arrays(results[0])[0]
+        info = {"imgsz": imgsz}
+    else:
+        from openvino_backend import OpenVINODetector
+
+        detector = OpenVINODetector(artifact, streams=streams)
+
+        async def infer(image):
+            return (await detector.detect(image, conf=conf))[0]
+        info = {"imgsz": detector.imgsz, "streams": detector.streams, "infer_requests": detector.num_requests}
+
+    async def run_level(clients: int) -> Dict:
+        latencies, issued = [], iter(range(requests))
+
+        async def client():
+            for i in issued:
+                start = time.perf_counter()
+                await infer(images[i % len(images)])
+                latencies.append((time.perf_counter() - start) * 1000.0)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(clients)))
+        wall = time.perf_counter() - start
+        values = np.array(latencies)
+        return {
+            "p50_ms": round(float(np.percentile(values, 50)), 2),
+            "p95_ms": round(float(np.percentile(values, 95)), 2),
+            "throughput_rps": round(len(values) / wall, 2),
+        }
+
+    async def run() -> Dict:
+        for i in range(warmup):
+            await infer(images[i % len(images)])
+        detections = [sorted(set((await infer(image)).tolist())) for image in images]
+        levels = {}
+        for clients in concurrency_levels:
+            levels[str(clients)] = await run_level(clients)
+            print(f"   - {backend} x{clients}: p50 {levels[str(clients)]['p50_ms']:.1f}ms, "
+                  f"{levels[str(clients)]['throughput_rps']:.2f} req/s")
+        return {**info, "concurrency": levels, "detections": detections}
+
+    return asyncio.run(run())
+
+
+def render_markdown(report: Dict) -> str:
+    config = report["config"]
+    torch_levels = report["backends"]["torch"]["concurrency"]
+    lines = [
+        f"# OpenVINO vs torch — {report['model']}",
+        "",
+        f"- Created: {report['created_at']} (commit `{(report['git_commit'] or 'nogit')[:8]}`)",
+        f"- Machine: {report['machine']['platform']}, {report['machine']['cpu_count']} CPUs, "
+        f"Python {report['machine']['python']}",
+        f"- Images: {report['image_count']} from `{config['images']}`, imgsz={config['imgsz']}, "
+        f"conf={config['conf']}, {config['requests']} requests per level",
+        f"- OpenVINO: {report['backends']['openvino'].get('streams')} stream(s), "
+        f"{report['backends']['openvino'].get('infer_requests')} infer request(s)",
+        f"- Same classes as torch on {report['agreement'] * 100:.1f}% of images",
+        "",
+        "| Backend | Clients | p50 (ms) | p95 (ms) | req/s | Speedup vs torch |",
+        "|---|---|---|---|---|---|",
+    ]
+    for backend, entry in report["backends"].items():
+        for clients, level in entry["concurrency"].items():
+            speedup = level["throughput_rps"] / torch_levels[clients]["throughput_rps"]
+            lines.append(f"| {backend} | {clients} | {level['p50_ms']:.1f} | {level['p95_ms']:.1f} | "
+                         f"{level['throughput_rps']:.2f} | {speedup:.2f}x |")
+    return "\n".join(lines) + "\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the OpenVINO backend with the torch path")
+    parser.add_argument("--model", default=str(BACKEND_DIR / "best.pt"))
+    parser.add_argument("--openvino-model", default=None,
+                        help="OpenVINO IR folder (default: exported next to --model)")
+    parser.add_argument("--images", default=DEFAULT_IMAGE_GLOB)
+    parser.add_argument("--max-images", type=int, default=32)
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--conf", type=float, default=0.1)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--requests", type=int, default=64, help="Requests per concurrency level")
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--streams", default="AUTO", help="OpenVINO NUM_STREAMS (default: THROUGHPUT hint)")
+    parser.add_argument("--output", default=str(DEFAULT_OUTPUT))
+    args = parser.parse_args()
+
+    if not Path(args.model).exists():
+        print(f"❌ Model not found: {args.model}")
+        sys.exit(1)
+
+    from openvino_backend import OPENVINO_AVAILABLE, export_ir
+
+    if not OPENVINO_AVAILABLE:
+        print("❌ openvino is not installed (pip install openvino)")
+        sys.exit(1)
+
+    ir = args.openvino_model or str(Path(args.model).with_name(f"{Path(args.model).stem}_openvino_model"))
+    if not Path(ir).exists():
+        print(f"🔄 Exporting {args.model} to OpenVINO IR at imgsz={args.imgsz}...")
+        ir = export_ir(args.model, args.imgsz)
+
+    images = load_images(args.images, args.max_images)
+    backends = {}
+    for backend, artifact in (("torch", args.model), ("openvino", ir)):
+        print(f"🚀 {backend}: {Path(artifact).name}")
+        backends[backend] = run_isolated(bench_backend, backend, artifact, images, args.imgsz, args.conf,
+                                         args.concurrency, args.requests, args.warmup, args.streams)
+
+    same = [a == b for a, b in zip(backends["torch"]["detections"], backends["openvino"]["detections"])]
+    report = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "git_commit": git_commit(),
+        "model": os.path.basename(args.model),
+        "machine": {
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "cpu_count": os.cpu_count(),
+        },
+        "image_count": len(images),
+        "agreement": round(sum(same) / len(same), 4),
+        "config": {k: v for k, v in vars(args).items() if k != "output"},
+        "backends": backends,
+    }
+
+    output = Path(args.output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(render_markdown(report))
+    output.with_suffix(".json").write_text(json.dumps(report, indent=2))
+    print(render_markdown(report))
+    print(f"✅ Comparison saved to: {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Validation and serialization cost per recipe: field-by-field vs Pydantic v2 fast path.
+
+The LLM answers with JSON text wrapped in a little prose. Measured per recipe:
+
+- legacy: json.loads, then Recipe built field by field from nested
+  Ingredient/Instruction/NutritionInfo objects, and the response serialized
+  the way FastAPI does for response_model (validate again, jsonable dict,
+  json.dumps)
+- fast: LLMRecipe.model_validate_json on the text (one pass in
+  pydantic-core) and model_dump_json / a prebuilt TypeAdapter straight to
+  the response bytes
+
+Both paths run on the same answers, for one recipe and for a variants array.
+Results go to a Markdown table plus a JSON file.
+
+Example:
+    python benchmarks/recipe_models.py --iterations 2000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List
+
+BENCH_DIR = Path(__file__).resolve().parent
+BACKEND_DIR = BENCH_DIR.parent
+DEFAULT_OUTPUT = BENCH_DIR / "results" / "recipe_models.md"
+
+sys.path.insert(0, str(BACKEND_DIR))
+sys.path.insert(0, str(BENCH_DIR))
+from load_test import git_commit  # noqa: E402
+
+
+def legacy_recipe(Recipe, Ingredient, Instruction, NutritionInfo, recipe_data: Dict):
+    """The field-by-field construction the recipe endpoints used before the fast path."""
+    return Recipe(
+        title=recipe_data.get('title', 'Generated Recipe'),
+        description=recipe_data.get('description', ''),
+        prep_time=recipe_data.get('prep_time', 15),
+        cook_time=recipe_data.get('cook_time', 30),
+        servings=recipe_data.get('servings', 4),
+        difficulty=recipe_data.get('difficulty', 'Medium'),
+        ingredients=[Ingredient(**ing) for ing in recipe_data.get('ingredients', [])],
+        instructions=[Instruction(**inst) for inst in recipe_data.get('instructions', [])],
+        tags=recipe_data.get('tags', []),
+        nutrition_info=NutritionInfo(**recipe_data['nutrition_info']) if recipe_data.get('nutrition_info') else None
+    )
+
+
+def time_per_call(fn: Callable, iterations: int) -> float:
+    """Mean microseconds per call after a short warmup."""
+    for _ in range(min(100, iterations)):
+        fn()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def run(iterations: int, variants: int) -> Dict:
+    from fastapi.responses import JSONResponse
+    from fastapi.routing import serialize_response
+    from fastapi.utils import create_response_field
+
+    from recipe_api import (
+        RECIPE_LIST, Ingredient, Instruction, NutritionInfo, Recipe, _parse_recipe_variants, _recipe_from_llm,
+    )
+    from recipe_prompts import BUILTIN_EXEMPLARS
+
+    recipes = list(BUILTIN_EXEMPLARS.values())
+    single_text = f"Here is your recipe:\n{json.dumps(recipes[0], indent=2)}\nEnjoy!"
+    batch = [recipes[i % len(recipes)] | {"title": f"Variant {i}"} for i in range(variants)]
+    batch_text = f"Here are {variants} recipes:\n{json.dumps(batch, indent=2)}"
+
+    recipe_field = create_response_field(name="Response_recipe", type_=Recipe, mode="serialization")
+    list_field = create_response_field(name="Response_recipes", type_=List[Recipe], mode="serialization")
+
+    def fastapi_body(field, content) -> bytes:
+        encoded = asyncio.run(serialize_response(field=field, response_content=content))
+        return JSONResponse(encoded).body
+
+    def legacy_parse(text: str, open_char: str, close_char: str):
+        data = json.loads(text[text.find(open_char):text.rfind(close_char) + 1])
+        if isinstance(data, list):
+            return [legacy_recipe(Recipe, Ingredient, Instruction, NutritionInfo, item) for item in data]
+        return legacy_recipe(Recipe, Ingredient, Instruction, NutritionInfo, data)
+
+    parsed_one = _recipe_from_llm(single_text)
+    parsed_many = _parse_recipe_variants(batch_text, variants)
+    assert parsed_one.model_dump() == legacy_parse(single_text, "{", "}").model_dump()
+    assert json.loads(parsed_one.model_dump_json()) == json.loads(fastapi_body(recipe_field, parsed_one))
+    assert len(parsed_many) == variants
+
+    # serialize_response runs through asyncio.run; subtract that fixed overhead
+    loop_overhead = time_per_call(lambda: asyncio.run(asyncio.sleep(0)), iterations)
+
+    cases = {
+        "single": {
+            "validate": {
+                "legacy": time_per_call(lambda: legacy_parse(single_text, "{", "}"), iterations),
+                "fast": time_per_call(lambda: _recipe_from_llm(single_text), iterations),
+            },
+            "serialize": {
+                "legacy": time_per_call(lambda: fastapi_body(recipe_field, parsed_one), iterations) - loop_overhead,
+                "fast": time_per_call(parsed_one.model_dump_json, iterations),
+            },
+            "recipes": 1,
+        },
+        "variants": {
+            "validate": {
+                "legacy": time_per_call(lambda: legacy_parse(batch_text, "[", "]"), iterations),
+                "fast": time_per_call(lambda: _parse_recipe_variants(batch_text, variants), iterations),
+            },
+            "serialize": {
+                "legacy": time_per_call(lambda: fastapi_body(list_field, parsed_many), iterations) - loop_overhead,
+                "fast": time_per_call(lambda: RECIPE_LIST.dump_json(parsed_many), iterations),
+            },
+            "recipes": variants,
+        },
+    }
+    return cases
+
+
+def render_markdown(report: Dict) -> str:
+    lines = [
+        "# Recipe validation and serialization cost",
+        "",
+        f"- Created: {report['created_at']} (commit `{(report['git_commit'] or 'nogit')[:8]}`)",
+        f"- Machine: {report['machine']['platform']}, Python {report['machine']['python']}, "
+        f"pydantic {report['machine']['pydantic']}",
+        f"- {report['config']['iterations']} iterations per measurement",
+        "",
+        "| Case | Stage | Legacy (µs/recipe) | Fast (µs/recipe) | Speedup |",
+        "|---|---|---|---|---|",
+    ]
+    for case, entry in report["cases"].items():
+        for stage in ("validate", "serialize"):
+            legacy = entry[stage]["legacy"] / entry["recipes"]
+            fast = entry[stage]["fast"] / entry["recipes"]
+            lines.append(f"| {case} ({entry['recipes']}) | {stage} | {legacy:.1f} | {fast:.1f} | "
+                         f"{legacy / fast:.2f}x |")
+    return "\n".join(lines) + "\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark recipe validation and serialization")
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--variants", type=int, default=3, help="Recipes in the variants array")
+    parser.add_argument("--output", default=str(DEFAULT_OUTPUT))
+    args = parser.parse_args()
+
+    import pydantic
+
+    report = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "git_commit": git_commit(),
+        "machine": {
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "cpu_count": os.cpu_count(),
+            "pydantic": pydantic.VERSION,
+        },
+        "config": {k: v for k, v in vars(args).items() if k != "output"},
+        "cases": run(args.iterations, args.variants),
+    }
+
+    output = Path(args.output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(render_markdown(report))
+    output.with_suffix(".json").write_text(json.dumps(report, indent=2))
+    print(render_markdown(report))
+    print(f"✅ Results saved to: {output}")
+
+
+if __name__ == "__main__":
+    main()
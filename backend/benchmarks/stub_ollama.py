@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Minimal offline stand-in for the Ollama HTTP API, used by the benchmarks.
+
+Answers /api/chat with a canned recipe and simulates prefill/decode time from
+token counts so recipe latency is stable and reproducible without a GPU or a
+downloaded model. Point the backend at it with OLLAMA_HOST=http://127.0.0.1:<port>.
+
+Run standalone:
+    python benchmarks/stub_ollama.py --port 11435
+"""
+
+import argparse
+import json
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CANNED_RECIPE = {
+    "title": "Garden Vegetable Stir-Fry",
+    "description": "Quick savory stir-fry with crisp vegetables",
+    "prep_time": 15,
+    "cook_time": 10,
+    "servings": 2,
+    "difficulty": "Easy",
+    "ingredients": [
+        {"name": "Broccoli", "amount": "2", "unit": "cup", "notes": "florets"},
+        {"name": "Carrot", "amount": "1", "unit": "whole", "notes": "sliced"},
+        {"name": "Soy sauce", "amount": "2", "unit": "tbsp", "notes": None},
+        {"name": "Garlic", "amount": "2", "unit": "clove", "notes": "minced"},
+    ],
+    "instructions": [
+        {"step": 1, "text": "Slice the vegetables and mince the garlic.", "time": 10, "temperature": None, "tips": None},
+        {"step": 2, "text": "Heat oil in a wok over high heat and stir-fry the garlic.", "time": 1,
+         "temperature": "High", "tips": "Do not let it burn"},
+        {"step": 3, "text": "Add vegetables, stir-fry until crisp-tender, then add soy sauce.", "time": 6,
+         "temperature": "High", "tips": None},
+    ],
+    "tags": ["Asian", "Quick", "Vegetarian"],
+    "nutrition_info": {"calories": 180, "protein": "6g", "carbs": "20g", "fat": "8g",
+                       "fiber": "5g", "sugar": "7g", "sodium": "600mg"},
+}
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token), good enough for timing."""
+    return max(1, len(text) // 4)
+
+
+class StubOllamaHandler(BaseHTTPRequestHandler):
+    prefill_ms_per_token = 0.2
+    decode_ms_per_token = 2.0
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, payload, status=200):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/api/version":
+            self._send_json({"version": "stub"})
+        elif self.path == "/api/tags":
+            self._send_json({"models": [{"name": "qwen2.5:3b", "model": "qwen2.5:3b"}]})
+        else:
+            self._send_json({"error": "not found"}, status=404)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+
+        if self.path != "/api/chat":
+            self._send_json({"error": "not found"}, status=404)
+            return
+
+        prompt = "".join(message.get("content", "") for message in request.get("messages", []))
+        content = json.dumps(CANNED_RECIPE)
+        prompt_tokens = estimate_tokens(prompt)
+        completion_tokens = estimate_tokens(content)
+
+        prefill = prompt_tokens * self.prefill_ms_per_token / 1000.0
+        decode = completion_tokens * self.decode_ms_per_token / 1000.0
+        time.sleep(prefill + decode)
+
+        self._send_json({
+            "model": request.get("model", "qwen2.5:3b"),
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "message": {"role": "assistant", "content": content},
+            "done": True,
+            "done_reason": "stop",
+            "total_duration": int((prefill + decode) * 1e9),
+            "load_duration": 0,
+            "prompt_eval_count": prompt_tokens,
+            "prompt_eval_duration": int(prefill * 1e9),
+            "eval_count": completion_tokens,
+            "eval_duration": int(decode * 1e9),
+        })
+
+
+def start_stub_server(host: str = "127.0.0.1", port: int = 0,
+                      prefill_ms_per_token: float = 0.2, decode_ms_per_token: float = 2.0):
+    """Start the stub in a daemon thread; returns (server, base_url)."""
+    handler = type("ConfiguredStubOllamaHandler", (StubOllamaHandler,), {
+        "prefill_ms_per_token": prefill_ms_per_token,
+        "decode_ms_per_token": decode_ms_per_token,
+    })
+    server = ThreadingHTTPServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline Ollama stub for benchmarks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--prefill-ms-per-token", type=float, default=0.2)
+    parser.add_argument("--decode-ms-per-token", type=float, default=2.0)
+    args = parser.parse_args()
+
+    server, url = start_stub_server(args.host, args.port, args.prefill_ms_per_token, args.decode_ms_per_token)
+    print(f"🤖 Stub Ollama listening on {url} (Ctrl+C to stop)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Frame sampling and temporal aggregation for burst/video ingredient detection.
+
+Frames are decoded one at a time from the upload, near-duplicates are dropped
+with a cheap thumbnail difference, and the surviving keyframes are handed out
+in small batches so only one batch is ever held in memory.
+"""
+
+import os
+import shutil
+import tempfile
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+BURST_BATCH_SIZE = 4          # Keyframes per YOLO call
+MAX_FRAMES = 240              # Frames decoded before we stop reading the clip
+MAX_KEYFRAMES = 16            # Keyframes sent to the model per request
+VIDEO_SAMPLE_FPS = 4.0        # Frames per second sampled from a video
+DIFF_THRESHOLD = 8.0          # Mean abs thumbnail difference (0-255) to count as new
+THUMB_SIZE = 32
+SPOOL_CHUNK_SIZE = 1024 * 1024
+
+
+class KeyframeSampler:
+    """Keeps a frame only if it differs enough from the last kept frame."""
+
+    def __init__(self, diff_threshold: float = DIFF_THRESHOLD, thumb_size: int = THUMB_SIZE):
+        self.diff_threshold = diff_threshold
+        self.thumb_size = thumb_size
+        self._last_thumb: Optional[np.ndarray] = None
+
+    def is_keyframe(self, frame: np.ndarray) -> bool:
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        thumb = cv2.resize(gray, (self.thumb_size, self.thumb_size), interpolation=cv2.INTER_AREA)
+        thumb = thumb.astype(np.int16)
+
+        if self._last_thumb is not None:
+            if float(np.abs(thumb - self._last_thumb).mean()) < self.diff_threshold:
+                return False
+
+        self._last_thumb = thumb
+        return True
+
+
+class TemporalAggregator:
+    """Combines per-keyframe ingredient detections into one result."""
+
+    def __init__(self):
+        self.keyframes = 0
+        self._best: Dict[str, float] = {}
+        self._counts: Dict[str, int] = {}
+
+    def add(self, ingredients: List[str], confidences: List[float]):
+        self.keyframes += 1
+        for name, confidence in zip(ingredients, confidences):
+            self._best[name] = max(confidence, self._best.get(name, 0.0))
+            self._counts[name] = self._counts.get(name, 0) + 1
+
+    def result(self, min_support: int = 1) -> Tuple[List[str], List[float], List[int]]:
+        """Best confidence per ingredient seen in at least `min_support` keyframes."""
+        names = [name for name, count in self._counts.items() if count >= min_support]
+        names.sort(key=lambda name: (-self._best[name], name))
+        return names, [round(self._best[name], 2) for name in names], [self._counts[name] for name in names]
+
+
+def iter_image_frames(files: Iterable) -> Iterator[np.ndarray]:
+    """Decode a burst of uploaded images (UploadFile-like objects) one at a time."""
+    for upload in files:
+        data = np.frombuffer(upload.file.read(), dtype=np.uint8)
+        frame = cv2.imdecode(data, cv2.IMREAD_COLOR)
+        if frame is not None:
+            yield frame
+
+
+def iter_video_frames(fileobj, sample_fps: float = VIDEO_SAMPLE_FPS) -> Iterator[np.ndarray]:
+    """Spool a video upload to disk and yield frames sampled at `sample_fps`."""
+    fd, path = tempfile.mkstemp(suffix=".video")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            shutil.copyfileobj(fileobj, out, SPOOL_CHUNK_SIZE)
+
+        cap = cv2.VideoCapture(path)
+        try:
+            fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+            stride = max(1, int(round(fps / sample_fps)))
+            index = 0
+            # grab() skips the color conversion for frames we do not sample
+            while cap.grab():
+                if index % stride == 0:
+                    ok, frame = cap.retrieve()
+                    if ok:
+                        yield frame
+                index += 1
+        finally:
+            cap.release()
+    finally:
+        os.remove(path)
+
+
+def keyframe_batches(
+    frames: Iterable[np.ndarray],
+    sampler: KeyframeSampler,
+    batch_size: int = BURST_BATCH_SIZE,
+    max_frames: int = MAX_FRAMES,
+    max_keyframes: int = MAX_KEYFRAMES,
+    stats: Optional[Dict[str, int]] = None,
+) -> Iterator[List[np.ndarray]]:
+    """Group keyframes into batches, counting frames seen into `stats`."""
+    stats = stats if stats is not None else {}
+    stats.setdefault("frames", 0)
+    stats.setdefault("keyframes", 0)
+    batch: List[np.ndarray] = []
+
+    for frame in frames:
+        stats["frames"] += 1
+        if sampler.is_keyframe(frame):
+            batch.append(frame)
+            stats["keyframes"] += 1
+            if len(batch) == batch_size:
+                yield batch
+                batch = []
+        if stats["frames"] >= max_frames or stats["keyframes"] >= max_keyframes:
+            break
+
+    if batch:
+        yield batch
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Per-class confidence thresholds for the detection service.
+
+One global conf=0.1 lets through many low-confidence boxes for some classes
+while being stricter than needed for others. Calibration reads each class's
+precision/recall curve on the validation split (see evaluate.py) and picks the
+cutoff that maximizes F1, or the lowest cutoff that reaches --min-precision.
+
+At startup the service loads the table (CLASS_THRESHOLDS, default
+class_thresholds.json next to this file), runs the model at the lowest cutoff
+any class needs, and postprocess.extract_ingredients drops boxes below their
+class's cutoff. Without a table the service keeps the global conf=0.1.
+
+Build the table:
+    python class_thresholds.py --model best.pt \
+        --data ../datasets/merged_food_dataset/data.yaml
+"""
+
+import argparse
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional
+
+import numpy as np
+
+DEFAULT_CONF = 0.1
+DEFAULT_THRESHOLDS_PATH = os.path.join(os.path.dirname(__file__), "class_thresholds.json")
+
+
+class ClassThresholds:
+    """Cutoffs indexed by model class id, plus the conf the model must run at."""
+
+    def __init__(self, thresholds: Dict[str, float], names: Dict[int, str], default: float = DEFAULT_CONF):
+        by_name = {name.lower(): float(value) for name, value in thresholds.items()}
+        unknown = set(by_name) - {name.lower() for name in names.values()}
+        if unknown:
+            print(f"⚠️ Thresholds for classes the model does not have: {sorted(unknown)}")
+
+        self.cutoffs = np.full(max(names) + 1 if names else 0, default, dtype=np.float32)
+        for class_id, name in names.items():
+            self.cutoffs[class_id] = by_name.get(name.lower(), default)
+        # Boxes below the lowest cutoff would be dropped anyway; let NMS skip them
+        self.model_conf = round(float(self.cutoffs.min()), 4) if len(self.cutoffs) else default
+
+    @classmethod
+    def from_file(cls, path: str, names: Dict[int, str]) -> "ClassThresholds":
+        with open(path, "r") as f:
+            table = json.load(f)
+        return cls(table["thresholds"], names, default=table.get("default", DEFAULT_CONF))
+
+
+def load_thresholds_from_env(names: Dict[int, str]) -> Optional[ClassThresholds]:
+    """Load the calibrated table if one exists; None keeps the global DEFAULT_CONF."""
+    path = os.getenv("CLASS_THRESHOLDS", DEFAULT_THRESHOLDS_PATH)
+    if not os.path.exists(path):
+        if "CLASS_THRESHOLDS" in os.environ:
+            print(f"⚠️ Class thresholds requested but not found: {path}")
+        return None
+
+    try:
+        thresholds = ClassThresholds.from_file(path, names)
+    except Exception as e:
+        print(f"❌ Failed to load class thresholds: {e}")
+        return None
+
+    print(f"✅ Per-class thresholds loaded (model conf {thresholds.model_conf:.3f}): {path}")
+    return thresholds
+
+
+def pick_threshold(conf: np.ndarray, precision: np.ndarray, recall: np.ndarray,
+                   min_precision: Optional[float] = None) -> int:
+    """Index into `conf` of the chosen cutoff for one class's PR curve."""
+    if min_precision is not None:
+        reaching = np.nonzero((precision >= min_precision) & (recall > 0))[0]
+        if len(reaching):
+            return int(reaching[0])  # lowest cutoff, i.e. the most recall at that precision
+    f1 = 2 * precision * recall / (precision + recall + 1e-16)
+    return int(f1.argmax())
+
+
+def calibrate(model_path: str, data: str, imgsz: int = 640, min_precision: Optional[float] = None,
+              floor: float = 0.05, ceiling: float = 0.9) -> Dict:
+    """Per-class cutoffs from validation PR curves; classes without labels keep DEFAULT_CONF."""
+    from evaluate import evaluate, model_hash
+
+    result = evaluate(model_path, data, imgsz=imgsz, return_curves=True)
+    curves = result["curves"]
+    thresholds, stats = {}, {}
+    for class_id, row in enumerate(result["per_class"]):
+        if curves["n_labels"][class_id] == 0:
+            print(f"⚠️ No validation labels for {row['class']}, keeping conf {DEFAULT_CONF}")
+            continue
+        precision, recall = curves["p_curve"][class_id], curves["r_curve"][class_id]
+        cutoff = float(np.clip(curves["conf"][pick_threshold(curves["conf"], precision, recall, min_precision)],
+                               floor, ceiling))
+        i = min(int(np.searchsorted(curves["conf"], cutoff)), len(curves["conf"]) - 1)
+        thresholds[row["class"]] = round(cutoff, 3)
+        stats[row["class"]] = {
+            "labels": row["labels"],
+            "precision": round(float(precision[i]), 4),
+            "recall": round(float(recall[i]), 4),
+        }
+        print(f"   - {row['class']}: conf {thresholds[row['class']]:.3f} "
+              f"(P {precision[i]:.3f}, R {recall[i]:.3f})")
+
+    return {
+        "model": os.path.basename(model_path),
+        "model_hash": model_hash(model_path),
+        "dataset": data,
+        "imgsz": imgsz,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "method": f"min_precision={min_precision}" if min_precision is not None else "max_f1",
+        "default": DEFAULT_CONF,
+        "thresholds": thresholds,
+        "stats": stats,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibrate per-class confidence thresholds")
+    parser.add_argument("--model", default="best.pt")
+    parser.add_argument("--data", default="../datasets/merged_food_dataset/data.yaml")
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--min-precision", type=float, default=None,
+                        help="Lowest cutoff reaching this precision (default: max F1 per class)")
+    parser.add_argument("--floor", type=float, default=0.05, help="Never go below this cutoff")
+    parser.add_argument("--ceiling", type=float, default=0.9, help="Never go above this cutoff")
+    parser.add_argument("--output", default=DEFAULT_THRESHOLDS_PATH)
+    args = parser.parse_args()
+
+    if not Path(args.model).exists():
+        print(f"❌ Model not found: {args.model}")
+        return
+
+    table = calibrate(args.model, args.data, args.imgsz, args.min_precision, args.floor, args.ceiling)
+    with open(args.output, "w") as f:
+        json.dump(table, f, indent=2)
+    print(f"✅ Class thresholds saved to: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+CPU thread and affinity settings for inference, applied once at startup.
+
+torch and ONNX Runtime size their thread pools from the host's core count,
+not the container's CPU quota, so under `cpus: '1.0'` a 16-core host still
+gets 16 intra-op threads fighting over one core. This reads the cgroup quota
+(v2 cpu.max or v1 cfs_quota_us) and the allowed cores, and sizes every
+engine from the smaller of the two:
+
+- torch: set_num_threads / set_num_interop_threads
+- ONNX Runtime: ort_session_options() for the sessions we create
+- OpenVINO: INFERENCE_NUM_THREADS (see openvino_backend.py)
+
+Overrides: INFERENCE_THREADS, INFERENCE_INTEROP_THREADS (default 1; requests
+are serialized), and CPU_AFFINITY to pin the process ("auto" for the first
+INFERENCE_THREADS allowed cores, or a list like "0,2-3"). The effective
+settings are reported in /health.
+"""
+
+import math
+import os
+from typing import Dict, List, Optional
+
+CGROUP_V2_CPU_MAX = "/sys/fs/cgroup/cpu.max"
+CGROUP_V1_QUOTA = "/sys/fs/cgroup/cpu/cpu.cfs_quota_us"
+CGROUP_V1_PERIOD = "/sys/fs/cgroup/cpu/cpu.cfs_period_us"
+
+
+def cgroup_cpu_limit(root: str = "/") -> Optional[float]:
+    """CPUs allowed by the cgroup quota, or None when unlimited or unknown."""
+    def read(path: str) -> Optional[str]:
+        try:
+            with open(os.path.join(root, path.lstrip("/")), "r") as f:
+                return f.read().strip()
+        except OSError:
+            return None
+
+    cpu_max = read(CGROUP_V2_CPU_MAX)
+    if cpu_max:
+        quota, _, period = cpu_max.partition(" ")
+        if quota != "max" and period:
+            return int(quota) / int(period)
+        return None
+
+    quota, period = read(CGROUP_V1_QUOTA), read(CGROUP_V1_PERIOD)
+    if quota and period and int(quota) > 0:
+        return int(quota) / int(period)
+    return None
+
+
+def allowed_cores() -> List[int]:
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def parse_cpu_list(value: str) -> List[int]:
+    """'0,2-3' -> [0, 2, 3]"""
+    cores = set()
+    for part in value.replace(" ", "").split(","):
+        if not part:
+            continue
+        start, _, end = part.partition("-")
+        cores.update(range(int(start), int(end or start) + 1))
+    return sorted(cores)
+
+
+class ThreadConfig:
+    """Thread counts and core set for this process, plus where they came from."""
+
+    def __init__(self, intra_op: int, inter_op: int, affinity: Optional[List[int]],
+                 cgroup_cpus: Optional[float], cores: List[int]):
+        self.intra_op = intra_op
+        self.inter_op = inter_op
+        self.affinity = affinity
+        self.cgroup_cpus = cgroup_cpus
+        self.cores = cores
+
+    def as_dict(self) -> Dict:
+        return {
+            "intra_op_threads": self.intra_op,
+            "inter_op_threads": self.inter_op,
+            "affinity": self.affinity,
+            "cgroup_cpus": self.cgroup_cpus,
+            "allowed_cores": len(self.cores),
+        }
+
+
+def resolve_thread_config(cgroup_cpus: Optional[float], cores: List[int]) -> ThreadConfig:
+    """Pick thread counts from the environment, the cgroup quota and the allowed cores."""
+    budget = len(cores)
+    if cgroup_cpus is not None:
+        budget = min(budget, max(1, math.floor(cgroup_cpus)))
+
+    intra_op = int(os.getenv("INFERENCE_THREADS") or budget)
+    inter_op = int(os.getenv("INFERENCE_INTEROP_THREADS") or 1)
+
+    affinity = None
+    pinning = os.getenv("CPU_AFFINITY", "").strip().lower()
+    if pinning == "auto":
+        affinity = cores[:intra_op]
+    elif pinning:
+        affinity = [core for core in parse_cpu_list(pinning) if core in cores] or None
+        if affinity is None:
+            print(f"⚠️ CPU_AFFINITY={pinning} names no allowed core, not pinning")
+    if affinity and intra_op > len(affinity):
+        intra_op = len(affinity)
+    return ThreadConfig(intra_op, inter_op, affinity, cgroup_cpus, cores)
+
+
+def detect_thread_config() -> ThreadConfig:
+    return resolve_thread_config(cgroup_cpu_limit(), allowed_cores())
+
+
+def apply_thread_config(config: ThreadConfig):
+    """Pin the process and size torch's pools; call before the first model call."""
+    if config.affinity and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, config.affinity)
+
+    # Read by OpenMP/MKL pools that are created after this point
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ.setdefault(var, str(config.intra_op))
+
+    import torch
+
+    torch.set_num_threads(config.intra_op)
+    try:
+        torch.set_num_interop_threads(config.inter_op)
+    except RuntimeError:
+        # Only settable once per process, before any inter-op work
+        config.inter_op = torch.get_num_interop_threads()
+
+
+def ort_session_options(config: Optional[ThreadConfig] = None):
+    """ONNX Runtime SessionOptions with the same thread budget."""
+    import onnxruntime as ort
+
+    config = config or detect_thread_config()
+    options = ort.SessionOptions()
+    options.intra_op_num_threads = config.intra_op
+    options.inter_op_num_threads = config.inter_op
+    return options
+
+
+def load_thread_config_from_env() -> ThreadConfig:
+    """Detect the CPU budget, apply it to this process and log the result."""
+    config = detect_thread_config()
+    apply_thread_config(config)
+    quota = f"{config.cgroup_cpus:g}" if config.cgroup_cpus is not None else "none"
+    print(f"✅ CPU threads: intra-op {config.intra_op}, inter-op {config.inter_op} "
+          f"(cgroup quota {quota}, {len(config.cores)} allowed cores"
+          + (f", pinned to {config.affinity})" if config.affinity else ")"))
+    return config
@@ -0,0 +1,31 @@
+"""
+Helpers for YOLO dataset yaml files shared by the training and evaluation tools.
+"""
+
+import tempfile
+from pathlib import Path
+
+import yaml
+
+
+def resolve_dataset_config(data: str) -> str:
+    """
+    Return a dataset yaml Ultralytics can use from any working directory.
+
+    A relative `path` is taken relative to the yaml itself (Ultralytics would
+    resolve it against the CWD), and a missing absolute one falls back to the
+    yaml's folder. Either way a temporary yaml with an absolute `path` is written.
+    """
+    with open(data, "r") as f:
+        config = yaml.safe_load(f)
+
+    root = Path(data).resolve().parent
+    path = Path(config["path"]) if config.get("path") else None
+    if path is not None and path.is_absolute() and path.exists():
+        return data
+
+    config["path"] = str((root / path).resolve() if path is not None and not path.is_absolute() else root)
+    tmp = tempfile.NamedTemporaryFile("w", suffix=".yaml", delete=False)
+    yaml.safe_dump(config, tmp)
+    tmp.close()
+    return tmp.name
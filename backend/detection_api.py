@@ -0,0 +1,221 @@
+"""
+Detection endpoints (/api/detect, /api/detect/burst, /ws/detect) on top of a
+DetectionPipeline.
+
+Profiles differ only in how failures are answered. With mock_fallback (the
+full development profile) a missing model, an empty result or an inference
+error returns mock ingredients, so the app keeps working without best.pt.
+Without it (detect-only, the deployed service) they are 503 / 404 / 500.
+Quality-gate rejections are a 422 in both.
+"""
+
+import asyncio
+import random
+import time
+from typing import List, Optional
+
+from fastapi import APIRouter, File, HTTPException, Response, UploadFile, WebSocket
+from pydantic import BaseModel
+
+from burst_detection import iter_image_frames, iter_video_frames
+from detection_pipeline import DetectionPipeline, ImageRejected
+from live_detection import run_live_session
+from metrics import record_detection, record_rejection, stage_timer
+
+# Mock data for demonstration
+MOCK_INGREDIENTS = [
+    "Tomatoes", "Bell Peppers", "Onions", "Carrots", "Broccoli",
+    "Cheese", "Milk", "Eggs", "Chicken Breast", "Garlic",
+    "Spinach", "Potatoes", "Mushrooms", "Cucumber", "Lettuce"
+]
+
+MODEL_UNAVAILABLE = "YOLO model not loaded. Service unavailable."
+
+
+class DetectionResponse(BaseModel):
+    ingredients: List[str]
+    confidence: List[float]
+    processing_time: float
+    imgsz: Optional[int] = None  # Input resolution used for inference
+
+
+class BurstDetectionResponse(DetectionResponse):
+    frames_received: int
+    keyframes: int
+    frame_counts: List[int]  # Keyframes each ingredient was seen in
+
+
+async def _fallback_mock_detection(start_time: float) -> DetectionResponse:
+    """Fallback function for mock detection when YOLO fails"""
+    # Simulate processing time
+    await asyncio.sleep(1.0)
+
+    # Mock ingredient detection
+    detected_count = random.randint(3, 6)
+    detected_ingredients = random.sample(MOCK_INGREDIENTS, detected_count)
+    confidence_scores = [round(random.uniform(0.6, 0.85), 2) for _ in detected_ingredients]
+
+    processing_time = time.time() - start_time
+
+    print(f"🔄 Using mock detection: {detected_ingredients}")
+
+    return DetectionResponse(
+        ingredients=detected_ingredients,
+        confidence=confidence_scores,
+        processing_time=processing_time
+    )
+
+
+async def _fallback_mock_burst(start_time: float) -> BurstDetectionResponse:
+    """Fallback for burst detection, reusing the single-image mock"""
+    mock = await _fallback_mock_detection(start_time)
+    return BurstDetectionResponse(
+        **mock.model_dump(),
+        frames_received=0,
+        keyframes=0,
+        frame_counts=[1] * len(mock.ingredients)
+    )
+
+
+def create_detection_router(pipeline: DetectionPipeline, mock_fallback: bool) -> APIRouter:
+    router = APIRouter()
+
+    @router.post("/api/detect", response_model=DetectionResponse)
+    async def detect_ingredients(image: UploadFile = File(...)):
+        """
+        Detect ingredients in uploaded fridge image using fine-tuned YOLOv8n model.
+        """
+        start_time = time.time()
+
+        # Validate image file
+        if not image.content_type.startswith("image/"):
+            record_detection("invalid")
+            raise HTTPException(status_code=400, detail="File must be an image")
+
+        if not pipeline.loaded:
+            if mock_fallback:
+                record_detection("fallback")
+                return await _fallback_mock_detection(start_time)
+            record_detection("unavailable")
+            raise HTTPException(status_code=503, detail=MODEL_UNAVAILABLE)
+
+        try:
+            with stage_timer("upload_read"):
+                image_data = await image.read()
+            detected_ingredients, confidence_scores, imgsz = await pipeline.detect(image_data)
+        except ImageRejected as e:
+            record_rejection(e.rejection.reason)
+            print(f"🚫 Rejected upload: {e.rejection.reason} {e.rejection.stats}")
+            raise HTTPException(status_code=422, detail=e.rejection.as_detail())
+        except Exception as e:
+            print(f"❌ YOLO detection failed: {e}")
+            record_detection("error")
+            if mock_fallback:
+                return await _fallback_mock_detection(start_time)
+            raise HTTPException(status_code=500, detail=f"Detection failed: {str(e)}")
+
+        if not detected_ingredients:
+            record_detection("empty")
+            if mock_fallback:
+                print("⚠️ No food items detected, using fallback")
+                return await _fallback_mock_detection(start_time)
+            raise HTTPException(
+                status_code=404,
+                detail="No food items detected in the image. Please try a clearer photo."
+            )
+
+        processing_time = time.time() - start_time
+
+        print(f"🔍 Detected {len(detected_ingredients)} food items: {detected_ingredients} "
+              f"in {processing_time:.2f}s (imgsz={imgsz})")
+
+        with stage_timer("serialization"):
+            body = DetectionResponse(
+                ingredients=detected_ingredients,
+                confidence=confidence_scores,
+                processing_time=processing_time,
+                imgsz=imgsz
+            ).model_dump_json()
+
+        record_detection("ok")
+        return Response(content=body, media_type="application/json")
+
+    @router.post("/api/detect/burst", response_model=BurstDetectionResponse)
+    async def detect_burst(
+        frames: List[UploadFile] = File([]),
+        video: Optional[UploadFile] = File(None),
+    ):
+        """
+        Detect ingredients across a short video or a burst of frames (e.g. panning
+        across the fridge). Near-duplicate frames are skipped and the remaining
+        keyframes are batched through YOLO, then aggregated over time.
+        """
+        start_time = time.time()
+
+        if video is not None:
+            if not video.content_type.startswith("video/"):
+                raise HTTPException(status_code=400, detail="Video upload must be a video file")
+            frame_source = iter_video_frames(video.file)
+        elif frames:
+            if any(not frame.content_type.startswith("image/") for frame in frames):
+                raise HTTPException(status_code=400, detail="All frames must be images")
+            frame_source = iter_image_frames(frames)
+        else:
+            raise HTTPException(status_code=400, detail="Provide a video or at least one frame")
+
+        if not pipeline.loaded:
+            frame_source.close()
+            if mock_fallback:
+                return await _fallback_mock_burst(start_time)
+            raise HTTPException(status_code=503, detail=MODEL_UNAVAILABLE)
+
+        try:
+            (detected_ingredients, confidence_scores, frame_counts), stats, imgsz = (
+                await pipeline.detect_burst(frame_source)
+            )
+        except Exception as e:
+            print(f"❌ Burst detection failed: {e}")
+            if mock_fallback:
+                return await _fallback_mock_burst(start_time)
+            raise HTTPException(status_code=500, detail=f"Detection failed: {str(e)}")
+
+        if not detected_ingredients:
+            if mock_fallback:
+                print("⚠️ No food items detected in burst, using fallback")
+                return await _fallback_mock_burst(start_time)
+            raise HTTPException(
+                status_code=404,
+                detail="No food items detected in the frames. Please try again with a slower pan."
+            )
+
+        processing_time = time.time() - start_time
+
+        print(f"🎞️ Burst: {stats['frames']} frames, {stats['keyframes']} keyframes, "
+              f"detected {detected_ingredients} in {processing_time:.2f}s (imgsz={imgsz})")
+
+        return BurstDetectionResponse(
+            ingredients=detected_ingredients,
+            confidence=confidence_scores,
+            processing_time=processing_time,
+            imgsz=imgsz,
+            frames_received=stats["frames"],
+            keyframes=stats["keyframes"],
+            frame_counts=frame_counts
+        )
+
+    @router.websocket("/ws/detect")
+    async def live_detection(websocket: WebSocket):
+        """
+        Live-camera detection: binary JPEG frames in, JSON detections out.
+        Stale frames are dropped so the newest one is always processed next.
+        """
+        await websocket.accept()
+
+        if not pipeline.loaded:
+            await websocket.send_json({"error": MODEL_UNAVAILABLE})
+            await websocket.close(code=1011)
+            return
+
+        await run_live_session(websocket, pipeline.detect_frame)
+
+    return router
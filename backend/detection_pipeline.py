@@ -0,0 +1,180 @@
+"""
+The detection pipeline shared by every service profile.
+
+One DetectionPipeline owns what /api/detect, /api/detect/burst and
+/ws/detect need: the CPU thread budget, the YOLO model (plus the optional
+OpenVINO IR), per-class cutoffs, the inference queues with adaptive input
+resolution, and the upload quality gate. The endpoints in detection_api.py
+only decide how to answer; the inference path is the same in every profile.
+"""
+
+import io
+import os
+import time
+from typing import Iterator, List, Optional, Tuple
+
+from PIL import Image
+from starlette.concurrency import run_in_threadpool
+from ultralytics import YOLO
+
+from adaptive_resolution import DEFAULT_IMGSZ, InferenceQueue, load_selector_from_env
+from burst_detection import KeyframeSampler, TemporalAggregator, keyframe_batches
+from class_thresholds import DEFAULT_CONF, load_thresholds_from_env
+from cpu_config import load_thread_config_from_env
+from image_quality import QualityRejection, load_quality_filter_from_env
+from ingredients import YOLO_TO_FOOD_MAPPING
+from live_detection import decode_frame
+from metrics import observe_inference_speed, stage_timer, track_queue_depth
+from openvino_backend import load_detector_from_env
+from postprocess import extract_ingredients, result_arrays
+from profiling import profile_model_call
+
+DEFAULT_MODEL_PATH = os.path.join(os.path.dirname(__file__), 'best.pt')
+
+
+class ImageRejected(Exception):
+    """The upload failed the quality gate; carries the reason and stats."""
+
+    def __init__(self, rejection: QualityRejection):
+        super().__init__(rejection.reason)
+        self.rejection = rejection
+
+
+def decode_upload(image_data: bytes) -> Image.Image:
+    """Fully decode an upload, timed as its own stage; runs in the threadpool."""
+    with stage_timer("decode"):
+        pil_image = Image.open(io.BytesIO(image_data))
+        pil_image.load()
+    return pil_image
+
+
+class DetectionPipeline:
+    def __init__(self, model_path: Optional[str] = None):
+        # Size torch/ORT/OpenVINO thread pools to the container's CPU quota before loading models
+        self.thread_config = load_thread_config_from_env()
+
+        model_path = model_path or DEFAULT_MODEL_PATH
+        if not os.path.exists(model_path):
+            # If model not in backend folder, try current directory
+            model_path = 'best.pt'
+        try:
+            self.yolo_model = YOLO(model_path)
+            print("✅ YOLO model loaded successfully")
+        except Exception as e:
+            print(f"❌ Failed to load YOLO model: {e}")
+            self.yolo_model = None
+
+        # Per-class cutoffs (see class_thresholds.py); the model runs at the lowest one
+        names = self.yolo_model.names if self.yolo_model is not None else None
+        class_thresholds = load_thresholds_from_env(names) if names is not None else None
+        self.conf = class_thresholds.model_conf if class_thresholds else DEFAULT_CONF
+        self.class_cutoffs = class_thresholds.cutoffs if class_thresholds else None
+
+        # Optional OpenVINO IR of the same weights (DETECTION_BACKEND=openvino) for /api/detect
+        self.ov_detector = (
+            load_detector_from_env(names, threads=self.thread_config.intra_op) if names is not None else None
+        )
+
+        # Inference is serialized; the backlog drives the adaptive input resolution
+        self.inference_queue = InferenceQueue()
+        self.resolution_selector = load_selector_from_env()
+        # Cheap blur/exposure check ahead of inference (see image_quality.py)
+        self.quality_filter = load_quality_filter_from_env()
+        track_queue_depth("inference", lambda: self.inference_queue.depth)
+        # OpenVINO requests run in parallel (one slot per infer request), apart from torch
+        self.openvino_queue = (
+            InferenceQueue(max_concurrent=self.ov_detector.num_requests) if self.ov_detector else None
+        )
+        if self.openvino_queue:
+            track_queue_depth("openvino", lambda: self.openvino_queue.depth)
+
+    @property
+    def loaded(self) -> bool:
+        return self.yolo_model is not None
+
+    def health(self) -> dict:
+        return {
+            "yolo_loaded": self.loaded,
+            "detection_backend": "openvino" if self.ov_detector else "torch",
+            "inference_queue_depth": self.inference_queue.depth,
+            "adaptive_imgsz": self.resolution_selector.sizes if self.resolution_selector else None,
+            "image_quality_gate": self.quality_filter is not None,
+            "cpu": self.thread_config.as_dict(),
+        }
+
+    def _imgsz(self, backlog: int) -> int:
+        return self.resolution_selector.choose(backlog) if self.resolution_selector else DEFAULT_IMGSZ
+
+    def _ingredients(self, class_ids, confidences) -> Tuple[List[str], List[float]]:
+        return extract_ingredients(class_ids, confidences, self.yolo_model.names, YOLO_TO_FOOD_MAPPING,
+                                   self.class_cutoffs)
+
+    def _check_quality(self, image_data: bytes) -> Optional[QualityRejection]:
+        # Thumbnail decode, ~16ms for a 12MP photo; runs in the threadpool
+        with stage_timer("quality"):
+            return self.quality_filter.check(image_data)
+
+    async def detect(self, image_data: bytes) -> Tuple[List[str], List[float], int]:
+        """Ingredients, confidences and imgsz for one uploaded image; raises ImageRejected."""
+        # Blurry, dark or blank photos are turned away from a thumbnail, before the full decode
+        if self.quality_filter:
+            rejection = await run_in_threadpool(self._check_quality, image_data)
+            if rejection:
+                raise ImageRejected(rejection)
+
+        # Decode eagerly (timed on its own) off the event loop: ~100ms for a 12MP JPEG
+        pil_image = await run_in_threadpool(decode_upload, image_data)
+
+        # Run YOLO inference off the event loop; pick imgsz from the current backlog
+        if self.ov_detector:
+            # Fixed-size IR; requests overlap across OpenVINO streams
+            async with self.openvino_queue.slot():
+                imgsz = self.ov_detector.imgsz
+                class_ids, confidences, speed = await self.ov_detector.detect(pil_image, conf=self.conf)
+        else:
+            async with self.inference_queue.slot() as backlog:
+                imgsz = self._imgsz(backlog)
+                results = await run_in_threadpool(
+                    profile_model_call, self.yolo_model, pil_image,
+                    conf=self.conf, imgsz=imgsz  # lowest per-class cutoff
+                )
+            class_ids, confidences = result_arrays(results[0])
+            speed = results[0].speed
+
+        # Map boxes to ingredients (single image, so a single result)
+        postprocess_start = time.perf_counter()
+        ingredients, confidence_scores = self._ingredients(class_ids, confidences)
+        observe_inference_speed(speed, time.perf_counter() - postprocess_start)
+        return ingredients, confidence_scores, imgsz
+
+    async def detect_burst(self, frame_source: Iterator) -> Tuple[tuple, dict, int]:
+        """(ingredients, confidences, frame counts), sampling stats and imgsz for a frame stream."""
+        stats = {}
+        batches = keyframe_batches(frame_source, KeyframeSampler(), stats=stats)
+        aggregator = TemporalAggregator()
+        imgsz = DEFAULT_IMGSZ
+
+        try:
+            # Frames are decoded lazily off the event loop; one batch in memory at a time
+            while (batch := await run_in_threadpool(next, batches, None)) is not None:
+                async with self.inference_queue.slot() as backlog:
+                    imgsz = self._imgsz(backlog)
+                    results = await run_in_threadpool(self.yolo_model, batch, conf=self.conf, imgsz=imgsz)
+
+                for result in results:
+                    aggregator.add(*self._ingredients(*result_arrays(result)))
+        finally:
+            frame_source.close()
+
+        return aggregator.result(), stats, imgsz
+
+    async def detect_frame(self, data: bytes) -> Tuple[List[str], List[float], int]:
+        """Run one WebSocket frame through the shared inference queue"""
+        async with self.inference_queue.slot() as backlog:
+            imgsz = self._imgsz(backlog)
+            results = await run_in_threadpool(
+                lambda: self.yolo_model(decode_frame(data), conf=self.conf, imgsz=imgsz, verbose=False)
+            )
+
+        ingredients, confidences = self._ingredients(*result_arrays(results[0]))
+        return ingredients, confidences, imgsz
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+Knowledge distillation of the fine-tuned detector into a faster CPU student.
+
+The teacher (yolov8n_merged_food_cpu_aug_finetuned.pt) stays frozen while a
+student trains on merged_food_dataset with Ultralytics' feature distillation
+(`distill_model` / `dis`): the student's neck features are projected onto the
+teacher's and pulled towards them on top of the normal detection loss.
+Those train arguments only exist from Ultralytics 8.4, newer than the serving
+pins, so training runs from requirements-train.txt.
+
+The student is either
+- lower resolution: the teacher's own weights retrained at a smaller imgsz
+  (default 416), or
+- narrower: a YOLOv8 with a smaller width multiple (--width), trained from
+  scratch, so it needs more epochs.
+
+Training goes through train_orchestrator.run_training (resume, time budget,
+epoch timings) with the augmentations from fine_tune_yolo_cpu_aug.py. The best
+student is exported with export_onnx.py's settings, and teacher and student are
+benchmarked (.pt and ONNX latency, mAP on the val split) into a trade-off report.
+
+Examples:
+    python distill.py --epochs 30 --imgsz 416
+    python distill.py --width 0.125 --imgsz 640 --epochs 60 --name student_w125_640
+    python distill.py --skip-train --name distill_416  # re-run export + report only
+"""
+
+import argparse
+import json
+import shutil
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional
+
+import yaml
+
+BACKEND_DIR = Path(__file__).resolve().parent
+DEFAULT_TEACHER = "yolov8n_merged_food_cpu_aug_finetuned.pt"
+DEFAULT_DATA = "../datasets/merged_food_dataset/data.yaml"
+DEFAULT_PROJECT = "kitchen_assistant_training_distill"
+DEFAULT_REPORT = BACKEND_DIR / "benchmarks" / "results" / "distillation.md"
+BASE_ARCHITECTURE = "yolov8n.yaml"
+NANO_WIDTH = 0.25
+DISTILL_REQUIREMENTS = "requirements-train.txt"
+
+
+def supports_distillation() -> bool:
+    """Whether the installed Ultralytics accepts the distill_model / dis train arguments (8.4+)."""
+    from ultralytics.cfg import DEFAULT_CFG_DICT
+
+    return "distill_model" in DEFAULT_CFG_DICT and "dis" in DEFAULT_CFG_DICT
+
+
+def student_config(width: float, nc: int, out_path: Path, depth: float = 0.33) -> str:
+    """Write a YOLOv8 model yaml with an explicit width multiple (yolov8n is 0.25)."""
+    from ultralytics.nn.tasks import yaml_model_load
+
+    cfg = yaml_model_load(BASE_ARCHITECTURE)
+    for key in ("scale", "scales", "yaml_file"):
+        cfg.pop(key, None)
+    cfg.update({"nc": nc, "depth_multiple": depth, "width_multiple": width, "max_channels": 1024})
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(out_path, "w") as f:
+        f.write(f"# Distillation student generated by backend/distill.py (width {width})\n")
+        yaml.safe_dump(cfg, f, sort_keys=False)
+    return str(out_path)
+
+
+def model_stats(model_path: str, imgsz: int) -> Dict:
+    from ultralytics import YOLO
+    from ultralytics.utils.torch_utils import get_flops
+
+    model = YOLO(model_path).model
+    return {
+        "params_m": round(sum(p.numel() for p in model.parameters()) / 1e6, 3),
+        "gflops": round(get_flops(model, imgsz), 2),
+    }
+
+
+def benchmark(label: str, model_path: str, imgsz: int, args) -> Dict:
+    """Latency of the .pt and its ONNX export plus val mAP, each in a fresh process."""
+    from benchmarks.engine_matrix import _artifact_size_mb, bench_engine, load_images, run_isolated, validate_engine
+    from export_onnx import export_onnx
+
+    images = load_images(args.images, args.max_images)
+    entry = {"model": model_path, "imgsz": imgsz, **model_stats(model_path, imgsz)}
+    onnx_path = str(Path(model_path).with_suffix(".onnx"))
+    if not Path(onnx_path).exists() or Path(onnx_path).stat().st_mtime < Path(model_path).stat().st_mtime:
+        onnx_path = export_onnx(model_path, imgsz)
+
+    for engine, artifact in (("pytorch", model_path), ("onnx", onnx_path)):
+        if artifact is None:
+            entry[engine] = {"skipped": "export failed"}
+            continue
+        print(f"🚀 {label} / {engine}: {Path(artifact).name} @ {imgsz}")
+        result = run_isolated(bench_engine, artifact, images, imgsz, [1], args.repeats, args.warmup)
+        entry[engine] = {"size_mb": round(_artifact_size_mb(artifact), 2), **result}
+
+    if not args.skip_map:
+        entry.update(run_isolated(validate_engine, model_path, args.data, imgsz))
+    return entry
+
+
+def render_report(report: Dict) -> str:
+    teacher = report["teacher"]
+
+    def latency(entry: Dict, engine: str) -> Optional[float]:
+        return entry.get(engine, {}).get("latency_ms", {}).get("p50")
+
+    def cell(value, fmt: str) -> str:
+        return format(value, fmt) if value is not None else "n/a"
+
+    lines = [
+        "# Distillation trade-off — teacher vs student",
+        "",
+        f"- Created: {report['created_at']} (commit `{(report['git_commit'] or 'nogit')[:8]}`)",
+        f"- Student: {report['student']['description']}, {report['training']['epochs']} epoch(s), "
+        f"dis={report['training']['dis']}",
+        f"- Latency: end-to-end `predict` p50 at batch 1 on {report['image_count']} val images, "
+        f"{report['config']['repeats']} repeat(s); each model at its own imgsz",
+        "",
+        "| Model | imgsz | Params (M) | GFLOPs | .pt p50 (ms) | ONNX p50 (ms) | ONNX speedup | mAP50 | ΔmAP50 | mAP50-95 |",
+        "|---|---|---|---|---|---|---|---|---|---|",
+    ]
+    for label in ("teacher", "student"):
+        entry = report[label]
+        onnx_p50, teacher_onnx_p50 = latency(entry, "onnx"), latency(teacher, "onnx")
+        speedup = teacher_onnx_p50 / onnx_p50 if onnx_p50 and teacher_onnx_p50 else None
+        drift = entry["map50"] - teacher["map50"] if label == "student" and "map50" in teacher else None
+        lines.append("| " + " | ".join([
+            f"{label} (`{Path(entry['model']).name}`)",
+            str(entry["imgsz"]),
+            f"{entry['params_m']:.2f}",
+            f"{entry['gflops']:.1f}",
+            cell(latency(entry, "pytorch"), ".1f"),
+            cell(onnx_p50, ".1f"),
+            cell(speedup, ".2f") + ("x" if speedup else ""),
+            cell(entry.get("map50"), ".4f"),
+            cell(drift, "+.4f"),
+            cell(entry.get("map50_95"), ".4f"),
+        ]) + " |")
+    return "\n".join(lines) + "\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Distill the fine-tuned detector into a faster student")
+    parser.add_argument("--teacher", default=DEFAULT_TEACHER)
+    parser.add_argument("--teacher-imgsz", type=int, default=640)
+    parser.add_argument("--data", default=DEFAULT_DATA)
+    parser.add_argument("--width", type=float, default=None,
+                        help=f"Narrower student width multiple (yolov8n is {NANO_WIDTH}); default: teacher architecture")
+    parser.add_argument("--imgsz", type=int, default=416, help="Student training/serving resolution")
+    parser.add_argument("--dis", type=float, default=6.0, help="Distillation loss weight")
+    parser.add_argument("--epochs", type=int, default=30)
+    parser.add_argument("--batch", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--project", default=DEFAULT_PROJECT)
+    parser.add_argument("--name", default=None, help="Run name (default: derived from width/imgsz)")
+    parser.add_argument("--budget-hours", type=float, default=None, help="Stop cleanly before exceeding this")
+    parser.add_argument("--image-cache", action="store_true", help="Read images from the memmap store")
+    parser.add_argument("--skip-train", action="store_true", help="Only export and report an existing student")
+    parser.add_argument("--output", default=None, help="Student weights (default: <teacher stem>_distilled_<imgsz>.pt)")
+    parser.add_argument("--images", default=str(BACKEND_DIR.parent / "datasets" / "merged_food_dataset"
+                                                 / "val" / "images" / "*.jpg"))
+    parser.add_argument("--max-images", type=int, default=32)
+    parser.add_argument("--repeats", type=int, default=2)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--skip-map", action="store_true")
+    parser.add_argument("--report", default=str(DEFAULT_REPORT))
+    args = parser.parse_args()
+
+    if not Path(args.teacher).exists():
+        print(f"❌ Teacher model not found: {args.teacher}")
+        sys.exit(1)
+
+    from dataset_config import resolve_dataset_config
+    from fine_tune_yolo_cpu_aug import AUGMENTATIONS, HYPERPARAMETERS
+    from train_orchestrator import run_training
+
+    teacher = str(Path(args.teacher).resolve())
+    width_tag = f"w{round(args.width * 1000)}" if args.width else "same"
+    name = args.name or f"distill_{width_tag}_{args.imgsz}"
+    run_dir = Path(args.project) / name
+    output = Path(args.output or f"{Path(args.teacher).stem.replace('_finetuned', '')}_distilled_{args.imgsz}.pt")
+    data = resolve_dataset_config(args.data)
+
+    if args.width:
+        with open(data, "r") as f:
+            nc = len(yaml.safe_load(f)["names"])
+        student = student_config(args.width, nc, run_dir / "student.yaml")
+        description = f"YOLOv8 width {args.width} (yolov8n is {NANO_WIDTH}), from scratch, imgsz {args.imgsz}"
+    else:
+        student = teacher
+        description = f"teacher architecture initialised from the teacher, imgsz {args.imgsz}"
+
+    state = None
+    if not args.skip_train:
+        if not supports_distillation():
+            import ultralytics
+
+            print(f"❌ Ultralytics {ultralytics.__version__} has no feature distillation (needs 8.4+); "
+                  f"pip install -r {DISTILL_REQUIREMENTS}")
+            sys.exit(1)
+
+        trainer = None
+        if args.image_cache:
+            from image_cache import build_store, cached_trainer, dataset_image_dirs, default_cache_dir
+
+            cache_dir = default_cache_dir(args.data)
+            for img_path in dataset_image_dirs(args.data):
+                build_store(img_path, args.imgsz, cache_dir)
+            trainer = cached_trainer(str(cache_dir))
+
+        print(f"🎓 Distilling {Path(teacher).name} into: {description}")
+        state = run_training(
+            student,
+            {
+                "data": data,
+                "epochs": args.epochs,
+                "batch": args.batch,
+                "imgsz": args.imgsz,
+                "workers": args.workers,
+                "device": "cpu",
+                "project": args.project,
+                "name": name,
+                "exist_ok": True,
+                "amp": False,
+                "plots": False,
+                "distill_model": teacher,
+                "dis": args.dis,
+                **HYPERPARAMETERS,
+                **AUGMENTATIONS,
+            },
+            budget_hours=args.budget_hours,
+            trainer=trainer,
+        )
+        if state["status"] != "completed":
+            print("⏳ Student not finished; re-run the same command to resume")
+            return
+
+    best = run_dir / "weights" / "best.pt"
+    if not best.exists():
+        print(f"❌ No trained student at {best}")
+        sys.exit(1)
+    shutil.copy2(best, output)
+    print(f"📁 Student weights: {output}")
+
+    from benchmarks.engine_matrix import load_images
+    from benchmarks.load_test import git_commit
+
+    teacher_entry = benchmark("teacher", args.teacher, args.teacher_imgsz, args)
+    student_entry = benchmark("student", str(output), args.imgsz, args)
+    report = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "git_commit": git_commit(),
+        "training": {"epochs": args.epochs, "dis": args.dis,
+                     "wall_seconds": state["total_wall_seconds"] if state else None},
+        "image_count": len(load_images(args.images, args.max_images)),
+        "config": {"repeats": args.repeats, "warmup": args.warmup, "data": args.data},
+        "teacher": teacher_entry,
+        "student": {**student_entry, "description": description, "width": args.width, "run": str(run_dir)},
+    }
+
+    report_path = Path(args.report)
+    report_path.parent.mkdir(parents=True, exist_ok=True)
+    report_path.write_text(render_report(report))
+    report_path.with_suffix(".json").write_text(json.dumps(report, indent=2))
+    print(render_report(report))
+    print(f"✅ Distillation report saved to: {report_path}")
+
+
+if __name__ == "__main__":
+    main()
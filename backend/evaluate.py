@@ -0,0 +1,375 @@
+#!/usr/bin/env python3
+"""
+Standalone detection evaluator for any model Ultralytics can load.
+
+Works with .pt, TorchScript, ONNX (FP32/INT8) and OpenVINO artifacts: images
+are split into batches and predicted in a pool of spawned worker processes,
+then matched against the YOLO labels with vectorized NumPy IoU. Reports
+mAP50, mAP50-95 and per-class precision/recall (at the confidence that
+maximizes mean F1), using the same 101-point AP as val() in the pinned
+Ultralytics releases (8.0-8.3: precision slopes from the last recall point
+down to zero at recall 1; 8.4 drops it to zero right after that point).
+Boxes come from predict(), i.e. single-label NMS as in the serving path, so
+scores can read slightly below val(), which keeps several labels per box.
+
+Predictions are cached per model content hash and inference settings, and per
+image by size/mtime, so re-evaluating the same model (e.g. after changing
+matching or reporting code) skips inference entirely.
+
+Examples:
+    python evaluate.py --model best.pt
+    python evaluate.py --model best_int8.onnx --imgsz 640 --workers 4 --json eval.json
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+BACKEND_DIR = Path(__file__).resolve().parent
+DEFAULT_DATA = "../datasets/merged_food_dataset/data.yaml"
+DEFAULT_CACHE_DIR = BACKEND_DIR / ".eval_cache"
+CACHE_VERSION = 1
+IOU_THRESHOLDS = np.linspace(0.5, 0.95, 10)
+CONF_GRID = np.linspace(0, 1, 1000)
+
+Prediction = Tuple[np.ndarray, np.ndarray, np.ndarray]  # xyxyn (n, 4), conf (n,), cls (n,)
+
+_worker_model = None
+_worker_static_batch = False
+
+
+def model_hash(model_path: str) -> str:
+    """Content hash of a model file, or of every file in an exported model folder."""
+    path = Path(model_path)
+    files = sorted(p for p in path.rglob("*") if p.is_file()) if path.is_dir() else [path]
+    digest = hashlib.blake2b(digest_size=16)
+    for file in files:
+        digest.update(str(file.relative_to(path) if path.is_dir() else file.name).encode())
+        with open(file, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def load_ground_truth(data: str, split: str = "val") -> Tuple[List[str], List[np.ndarray], Dict[int, str]]:
+    """Image paths, per-image labels (cls, x1, y1, x2, y2 normalized) and class names."""
+    from ultralytics.data.utils import IMG_FORMATS, check_det_dataset, img2label_paths
+
+    from dataset_config import resolve_dataset_config
+
+    dataset = check_det_dataset(resolve_dataset_config(data))
+    sources = dataset[split] if isinstance(dataset[split], list) else [dataset[split]]
+    images = sorted(
+        path for source in sources for path in glob.glob(os.path.join(source, "*"))
+        if path.rsplit(".", 1)[-1].lower() in IMG_FORMATS
+    )
+
+    labels = []
+    for label_path in img2label_paths(images):
+        rows = np.zeros((0, 5), dtype=np.float32)
+        if os.path.exists(label_path):
+            values = np.loadtxt(label_path, ndmin=2, dtype=np.float32)
+            if values.size:
+                cls, xc, yc, w, h = values[:, :5].T
+                rows = np.stack([cls, xc - w / 2, yc - h / 2, xc + w / 2, yc + h / 2], axis=1)
+        labels.append(rows)
+    return images, labels, dataset["names"]
+
+
+def box_iou(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Pairwise IoU of xyxy boxes: (N, 4) x (M, 4) -> (N, M)."""
+    top_left = np.maximum(a[:, None, :2], b[None, :, :2])
+    bottom_right = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    inter = np.clip(bottom_right - top_left, 0, None).prod(axis=2)
+    area_a = (a[:, 2:] - a[:, :2]).prod(axis=1)
+    area_b = (b[:, 2:] - b[:, :2]).prod(axis=1)
+    return inter / (area_a[:, None] + area_b[None, :] - inter + 1e-9)
+
+
+def match_predictions(pred_boxes: np.ndarray, pred_cls: np.ndarray, gt_boxes: np.ndarray, gt_cls: np.ndarray,
+                      iou_thresholds: np.ndarray = IOU_THRESHOLDS) -> np.ndarray:
+    """(N, T) true-positive flags; greedy one-to-one matching by IoU, as in Ultralytics."""
+    correct = np.zeros((len(pred_boxes), len(iou_thresholds)), dtype=bool)
+    if len(pred_boxes) == 0 or len(gt_boxes) == 0:
+        return correct
+    iou = box_iou(gt_boxes, pred_boxes) * (gt_cls[:, None] == pred_cls[None, :])
+    for t, threshold in enumerate(iou_thresholds):
+        gt_idx, pred_idx = np.nonzero(iou >= threshold)
+        if len(gt_idx) == 0:
+            continue
+        order = np.argsort(-iou[gt_idx, pred_idx], kind="stable")
+        gt_idx, pred_idx = gt_idx[order], pred_idx[order]
+        _, first = np.unique(pred_idx, return_index=True)
+        gt_idx, pred_idx = gt_idx[first], pred_idx[first]
+        _, first = np.unique(gt_idx, return_index=True)
+        correct[pred_idx[first], t] = True
+    return correct
+
+
+def compute_ap(recall: np.ndarray, precision: np.ndarray) -> float:
+    """COCO 101-point interpolated AP of one precision/recall curve, with Ultralytics 8.0-8.3 sentinels."""
+    mrec = np.concatenate(([0.0], recall, [1.0]))
+    mpre = np.concatenate(([1.0], precision, [0.0]))
+    mpre = np.flip(np.maximum.accumulate(np.flip(mpre)))
+    x = np.linspace(0, 1, 101)
+    y = np.interp(x, mrec, mpre)
+    return float(((y[1:] + y[:-1]) / 2 * np.diff(x)).sum())
+
+
+def ap_per_class(tp: np.ndarray, conf: np.ndarray, pred_cls: np.ndarray, target_cls: np.ndarray,
+                 nc: int) -> Dict[str, np.ndarray]:
+    """
+    AP per class and IoU threshold, plus precision/recall curves over CONF_GRID
+    (rows are classes 0..nc-1; classes without labels stay zero).
+    """
+    order = np.argsort(-conf, kind="stable")
+    tp, conf, pred_cls = tp[order], conf[order], pred_cls[order]
+    n_labels = np.bincount(target_cls.astype(np.int64), minlength=nc)[:nc]
+
+    ap = np.zeros((nc, tp.shape[1]))
+    p_curve, r_curve = np.zeros((nc, len(CONF_GRID))), np.zeros((nc, len(CONF_GRID)))
+    for c in range(nc):
+        mask = pred_cls == c
+        if n_labels[c] == 0 or not mask.any():
+            continue
+        tpc = tp[mask].cumsum(0)
+        fpc = (~tp[mask]).cumsum(0)
+        recall = tpc / n_labels[c]
+        precision = tpc / (tpc + fpc)
+        # Confidences decrease along the curve; interpolate on negated values
+        r_curve[c] = np.interp(-CONF_GRID, -conf[mask], recall[:, 0], left=0)
+        p_curve[c] = np.interp(-CONF_GRID, -conf[mask], precision[:, 0], left=1)
+        ap[c] = [compute_ap(recall[:, t], precision[:, t]) for t in range(tp.shape[1])]
+    return {"ap": ap, "p_curve": p_curve, "r_curve": r_curve, "n_labels": n_labels}
+
+
+def _init_worker(model_path: str, threads: int):
+    global _worker_model
+    import torch
+    from ultralytics import YOLO
+
+    torch.set_num_threads(threads)
+    _worker_model = YOLO(model_path, task="detect")
+
+
+def _predict_batch(task: Tuple[List[str], int, float, float, int]) -> List[Prediction]:
+    global _worker_static_batch
+    paths, imgsz, conf, iou, max_det = task
+
+    def predict(chunk):
+        return _worker_model.predict(chunk, imgsz=imgsz, conf=conf, iou=iou, max_det=max_det,
+                                     batch=len(chunk), device="cpu", verbose=False)
+
+    if _worker_static_batch:
+        results = [result for path in paths for result in predict([path])]
+    else:
+        try:
+            results = predict(paths)
+        except Exception:
+            if len(paths) == 1:
+                raise
+            # Exports without a dynamic batch axis (e.g. export_onnx.py) only take one image
+            _worker_static_batch = True
+            results = [result for path in paths for result in predict([path])]
+
+    predictions = []
+    for result in results:
+        boxes = result.boxes
+        predictions.append((
+            boxes.xyxyn.cpu().numpy().astype(np.float32),
+            boxes.conf.cpu().numpy().astype(np.float32),
+            boxes.cls.cpu().numpy().astype(np.int64),
+        ))
+    return predictions
+
+
+def _image_stamp(path: str) -> str:
+    stat = os.stat(path)
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def cache_file(cache_dir: Path, model_path: str, settings: Dict) -> Path:
+    key = hashlib.blake2b(
+        json.dumps({"model": model_hash(model_path), "version": CACHE_VERSION, **settings}, sort_keys=True).encode(),
+        digest_size=12,
+    ).hexdigest()
+    return cache_dir / f"{Path(model_path).stem}_{key}.npz"
+
+
+def load_cache(path: Path) -> Dict[str, Tuple[str, Prediction]]:
+    """image path -> (stamp, prediction) from a cache file, or {} if there is none."""
+    if not path.exists():
+        return {}
+    with np.load(path) as cache:
+        offsets = cache["offsets"]
+        boxes, conf, cls = cache["boxes"], cache["conf"], cache["cls"]
+        return {
+            image: (stamp, (boxes[start:end], conf[start:end], cls[start:end]))
+            for image, stamp, start, end in zip(cache["images"].tolist(), cache["stamps"].tolist(),
+                                                offsets[:-1], offsets[1:])
+        }
+
+
+def save_cache(path: Path, entries: Dict[str, Tuple[str, Prediction]]):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    images = list(entries)
+    predictions = [entries[image][1] for image in images]
+    counts = [len(conf) for _, conf, _ in predictions]
+    tmp = path.with_suffix(".tmp.npz")
+    np.savez(
+        tmp,
+        images=np.array(images),
+        stamps=np.array([entries[image][0] for image in images]),
+        offsets=np.concatenate(([0], np.cumsum(counts))).astype(np.int64),
+        boxes=np.concatenate([p[0] for p in predictions] or [np.zeros((0, 4), np.float32)]).reshape(-1, 4),
+        conf=np.concatenate([p[1] for p in predictions] or [np.zeros(0, np.float32)]),
+        cls=np.concatenate([p[2] for p in predictions] or [np.zeros(0, np.int64)]),
+    )
+    os.replace(tmp, path)
+
+
+def predict_images(model_path: str, images: List[str], imgsz: int, conf: float, iou: float, max_det: int,
+                   batch: int, workers: int) -> List[Prediction]:
+    """Batched inference over a pool of spawned workers, each with its own model copy."""
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    tasks = [(images[i:i + batch], imgsz, conf, iou, max_det) for i in range(0, len(images), batch)]
+    with ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn"),
+                             initializer=_init_worker, initargs=(model_path, threads)) as pool:
+        return [prediction for chunk in pool.map(_predict_batch, tasks) for prediction in chunk]
+
+
+def collect_predictions(model_path: str, images: List[str], imgsz: int = 640, conf: float = 0.001,
+                        iou: float = 0.7, max_det: int = 300, batch: int = 8, workers: Optional[int] = None,
+                        cache_dir: Optional[Path] = DEFAULT_CACHE_DIR) -> Tuple[List[Prediction], int]:
+    """Predictions for every image, reusing the cache; returns (predictions, images inferred)."""
+    if not images:
+        return [], 0
+    settings = {"imgsz": imgsz, "conf": conf, "iou": iou, "max_det": max_det}
+    path = cache_file(cache_dir, model_path, settings) if cache_dir else None
+    cached = load_cache(path) if path else {}
+
+    stamps = {image: _image_stamp(image) for image in images}
+    missing = [image for image in images if cached.get(image, (None,))[0] != stamps[image]]
+    if missing:
+        workers = workers or min(4, os.cpu_count() or 1)
+        workers = max(1, min(workers, (len(missing) + batch - 1) // batch))
+        print(f"🔄 Predicting {len(missing)} image(s) with {Path(model_path).name} on {workers} worker(s)...")
+        for image, prediction in zip(missing, predict_images(model_path, missing, imgsz, conf, iou, max_det,
+                                                             batch, workers)):
+            cached[image] = (stamps[image], prediction)
+        if path:
+            save_cache(path, cached)
+    elif path:
+        print(f"✅ Reusing cached predictions: {path.name}")
+    return [cached[image][1] for image in images], len(missing)
+
+
+def evaluate(model_path: str, data: str = DEFAULT_DATA, split: str = "val", imgsz: int = 640,
+             conf: float = 0.001, iou: float = 0.7, max_det: int = 300, batch: int = 8,
+             workers: Optional[int] = None, cache_dir: Optional[Path] = DEFAULT_CACHE_DIR,
+             return_curves: bool = False) -> Dict:
+    """mAP50, mAP50-95 and per-class precision/recall for a model on a dataset split."""
+    started = time.perf_counter()
+    images, labels, names = load_ground_truth(data, split)
+    if not images:
+        raise ValueError(f"No images in the '{split}' split of {data}")
+    predictions, inferred = collect_predictions(model_path, images, imgsz, conf, iou, max_det, batch,
+                                                workers, cache_dir)
+
+    tp, confs, pred_cls, target_cls = [], [], [], []
+    for (boxes, scores, classes), gt in zip(predictions, labels):
+        gt_cls = gt[:, 0].astype(np.int64)
+        tp.append(match_predictions(boxes, classes, gt[:, 1:], gt_cls))
+        confs.append(scores)
+        pred_cls.append(classes)
+        target_cls.append(gt_cls)
+
+    nc = len(names)
+    stats = ap_per_class(np.concatenate(tp), np.concatenate(confs), np.concatenate(pred_cls),
+                         np.concatenate(target_cls), nc)
+    present = stats["n_labels"] > 0
+    f1 = 2 * stats["p_curve"] * stats["r_curve"] / (stats["p_curve"] + stats["r_curve"] + 1e-16)
+    best = int(f1[present].mean(0).argmax()) if present.any() else 0
+
+    per_class = []
+    for c in range(nc):
+        per_class.append({
+            "class": names[c],
+            "labels": int(stats["n_labels"][c]),
+            "precision": round(float(stats["p_curve"][c, best]), 4),
+            "recall": round(float(stats["r_curve"][c, best]), 4),
+            "map50": round(float(stats["ap"][c, 0]), 4),
+            "map50_95": round(float(stats["ap"][c].mean()), 4),
+        })
+    result = {
+        "model": str(model_path),
+        "split": split,
+        "images": len(images),
+        "images_inferred": inferred,
+        "imgsz": imgsz,
+        "map50": round(float(stats["ap"][present, 0].mean()), 4) if present.any() else 0.0,
+        "map50_95": round(float(stats["ap"][present].mean()), 4) if present.any() else 0.0,
+        "precision": round(float(stats["p_curve"][present, best].mean()), 4) if present.any() else 0.0,
+        "recall": round(float(stats["r_curve"][present, best].mean()), 4) if present.any() else 0.0,
+        "f1_conf": round(float(CONF_GRID[best]), 3),
+        "per_class": per_class,
+        "seconds": round(time.perf_counter() - started, 2),
+    }
+    if return_curves:
+        result["curves"] = {"conf": CONF_GRID, **stats}
+    return result
+
+
+def print_report(result: Dict):
+    print(f"📊 {Path(result['model']).name} on {result['split']} ({result['images']} images, "
+          f"{result['images_inferred']} inferred, {result['seconds']:.1f}s)")
+    print(f"   - mAP50: {result['map50']:.4f}")
+    print(f"   - mAP50-95: {result['map50_95']:.4f}")
+    print(f"   - P/R @ conf {result['f1_conf']:.3f}: {result['precision']:.4f}/{result['recall']:.4f}")
+    print(f"   {'class':<12}{'labels':>8}{'P':>8}{'R':>8}{'mAP50':>8}{'mAP50-95':>10}")
+    for row in result["per_class"]:
+        print(f"   {row['class']:<12}{row['labels']:>8}{row['precision']:>8.3f}{row['recall']:>8.3f}"
+              f"{row['map50']:>8.3f}{row['map50_95']:>10.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate any exported detector with cached, parallel inference")
+    parser.add_argument("--model", default="yolov8n_merged_food_cpu_aug_finetuned.pt",
+                        help=".pt, .torchscript, .onnx or *_openvino_model/")
+    parser.add_argument("--data", default=DEFAULT_DATA)
+    parser.add_argument("--split", default="val")
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--batch", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=None, help="Inference processes (default: min(4, CPUs))")
+    parser.add_argument("--conf", type=float, default=0.001)
+    parser.add_argument("--iou", type=float, default=0.7, help="NMS IoU")
+    parser.add_argument("--cache-dir", default=str(DEFAULT_CACHE_DIR))
+    parser.add_argument("--no-cache", action="store_true")
+    parser.add_argument("--json", default=None, help="Also write the result to this file")
+    args = parser.parse_args()
+
+    if not Path(args.model).exists():
+        print(f"❌ Model not found: {args.model}")
+        return
+
+    result = evaluate(
+        args.model, args.data, args.split, imgsz=args.imgsz, conf=args.conf, iou=args.iou,
+        batch=args.batch, workers=args.workers, cache_dir=None if args.no_cache else Path(args.cache_dir),
+    )
+    print_report(result)
+    if args.json:
+        Path(args.json).write_text(json.dumps(result, indent=2))
+        print(f"✅ Results saved to: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
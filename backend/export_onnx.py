@@ -1,19 +1,50 @@
 #!/usr/bin/env python3
 """
-Export YOLOv8 to ONNX format for iOS deployment.
+Export YOLOv8 to ONNX format for iOS deployment and CPU serving.
 ONNX can then be converted to CoreML using external tools.
+
+Variants (pick with --variants):
+- static:  fixed 1x3ximgszximgsz, opset 10 (the iOS/CoreML export)
+- dynamic: dynamic batch and input size, FP32
+- fp16:    the dynamic model with FP16 weights (FP32 inputs/outputs)
+- ort:     the dynamic model graph-optimized by ONNX Runtime, saved as .ort
+
+Every artifact is run with ONNX Runtime on sample images and its raw outputs
+compared with the .pt (dynamic variants also at a second batch size and
+resolution). Results go to manifest.json in the output folder, which
+`select_artifact` reads to pick an artifact for a given batch/imgsz.
+
+Examples:
+    python export_onnx.py --model best.pt
+    python export_onnx.py --model best.pt --variants dynamic ort --output-dir exports/best
 """
 
-from ultralytics import YOLO
+import argparse
+import glob
+import hashlib
+import json
+import shutil
+from datetime import datetime
 from pathlib import Path
+from typing import Dict, List, Optional
 
-def main():
-    model_path = "yolov8n_merged_food_cpu_aug_finetuned.pt"
+import numpy as np
+from ultralytics import YOLO
 
-    if not Path(model_path).exists():
-        print(f"❌ Model not found: {model_path}")
-        return
+BACKEND_DIR = Path(__file__).resolve().parent
+DEFAULT_MODEL = "yolov8n_merged_food_cpu_aug_finetuned.pt"
+DEFAULT_IMAGES = str(BACKEND_DIR.parent / "datasets" / "merged_food_dataset" / "val" / "images" / "*.jpg")
+MANIFEST_NAME = "manifest.json"
+VARIANTS = ("static", "dynamic", "fp16", "ort")
+# Max abs difference from the .pt on raw outputs: box coordinates in pixels, class scores
+PARITY_TOLERANCE = {
+    "fp32": {"box_px": 1.0, "score": 2e-3},
+    "fp16": {"box_px": 4.0, "score": 2e-2},
+}
 
+
+def export_onnx(model_path: str, imgsz: int = 640) -> Optional[str]:
+    """Export with the deployment settings; returns the .onnx path, or None on failure."""
     print(f"🔄 Loading model: {model_path}")
     model = YOLO(model_path)
 
@@ -22,34 +53,245 @@ def main():
         # Export to ONNX
         model.export(
             format='onnx',
-            imgsz=640,
-            optimize=True,
-            half=False,
+            imgsz=imgsz,
+            # optimize/half are TorchScript/GPU options; newer Ultralytics rejects them for ONNX
             dynamic=False,
             simplify=True,
             opset=10
         )
         print("✅ ONNX export completed!")
+    except Exception as e:
+        print(f"❌ ONNX export failed: {e}")
+        return None
 
-        # Look for the exported file
-        exported_file = model_path.replace('.pt', '.onnx')
-        if Path(exported_file).exists():
-            print(f"📁 Exported ONNX model: {exported_file}")
+    # Look for the exported file
+    exported_file = str(Path(model_path).with_suffix('.onnx'))
+    if not Path(exported_file).exists():
+        print("❌ ONNX file not found after export")
+        return None
 
-            # Show file size
-            size_mb = Path(exported_file).stat().st_size / (1024 * 1024)
-            print(f"📊 Model size: {size_mb:.1f} MB")
+    print(f"📁 Exported ONNX model: {exported_file}")
 
-            print("\n📝 Next steps:")
+    # Show file size
+    size_mb = Path(exported_file).stat().st_size / (1024 * 1024)
+    print(f"📊 Model size: {size_mb:.1f} MB")
+    return exported_file
 
-            print("2. Or use online converters like Netron to inspect the model")
-            print("3. For iOS, you can also use ONNX Runtime iOS framework directly")
 
-        else:
-            print("❌ ONNX file not found after export")
+def export_dynamic(model_path: str, imgsz: int, opset: Optional[int]) -> str:
+    """FP32 export with dynamic batch, height and width axes."""
+    return str(YOLO(model_path).export(format="onnx", imgsz=imgsz, dynamic=True, simplify=True,
+                                        opset=opset, device="cpu"))
 
-    except Exception as e:
-        print(f"❌ ONNX export failed: {e}")
+
+def convert_fp16(src: str, dst: str) -> str:
+    """FP16 weights and compute; inputs and outputs stay FP32 so preprocessing is unchanged."""
+    import onnx
+    from onnxruntime.transformers.float16 import convert_float_to_float16
+
+    onnx.save(convert_float_to_float16(onnx.load(src), keep_io_types=True), dst)
+    return dst
+
+
+def convert_ort(src: str, dst: str) -> str:
+    """Apply ONNX Runtime's graph optimizations once and save the result in .ort format."""
+    import onnxruntime as ort
+
+    options = ort.SessionOptions()
+    # Extended fusions are CPU-EP specific, which is what the service runs on
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED
+    options.optimized_model_filepath = dst
+    options.add_session_config_entry("session.save_model_format", "ORT")
+    ort.InferenceSession(src, options, providers=["CPUExecutionProvider"])
+    return dst
+
+
+def load_parity_inputs(image_paths: List[str], imgsz: int) -> np.ndarray:
+    """Letterboxed, RGB, CHW float32 batch as the exported graph expects it."""
+    import cv2
+    from ultralytics.data.augment import LetterBox
+
+    letterbox = LetterBox((imgsz, imgsz), auto=False)
+    images = [letterbox(image=cv2.imread(path))[:, :, ::-1].transpose(2, 0, 1) for path in image_paths]
+    return np.ascontiguousarray(np.stack(images), dtype=np.float32) / 255.0
+
+
+def reference_outputs(model_path: str, inputs: np.ndarray) -> np.ndarray:
+    """Raw (batch, 4 + nc, anchors) predictions of the .pt model."""
+    import torch
+
+    model = YOLO(model_path).model.float().eval()
+    with torch.no_grad():
+        outputs = model(torch.from_numpy(inputs))
+    return (outputs[0] if isinstance(outputs, (list, tuple)) else outputs).numpy()
+
+
+def check_parity(artifact: str, inputs: np.ndarray, reference: np.ndarray, precision: str,
+                 batched: bool) -> Dict:
+    """Max abs difference from the .pt on boxes (pixels) and class scores."""
+    import onnxruntime as ort
+    from cpu_config import ort_session_options
+
+    session = ort.InferenceSession(artifact, ort_session_options(), providers=["CPUExecutionProvider"])
+    name = session.get_inputs()[0].name
+    if batched:
+        outputs = session.run(None, {name: inputs})[0]
+    else:
+        outputs = np.concatenate([session.run(None, {name: inputs[i:i + 1]})[0] for i in range(len(inputs))])
+
+    diff = np.abs(outputs.astype(np.float32) - reference)
+    tolerance = PARITY_TOLERANCE[precision]
+    box_px, score = float(diff[:, :4].max()), float(diff[:, 4:].max())
+    return {
+        "images": len(inputs),
+        "imgsz": int(inputs.shape[-1]),
+        "batched": batched,
+        "max_box_px": round(box_px, 4),
+        "max_score": round(score, 5),
+        "passed": box_px <= tolerance["box_px"] and score <= tolerance["score"],
+    }
+
+
+def _onnx_opset(path: str) -> int:
+    import onnx
+
+    model = onnx.load(path, load_external_data=False)
+    return next(entry.version for entry in model.opset_import if entry.domain in ("", "ai.onnx"))
+
+
+def _sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def export_pipeline(model_path: str, out_dir: Path, variants: List[str], imgsz: int = 640,
+                    opset: Optional[int] = None, parity_images: Optional[List[str]] = None,
+                    alt_imgsz: int = 480) -> Dict:
+    """Export the requested variants into out_dir, check parity and write the manifest."""
+    out_dir.mkdir(parents=True, exist_ok=True)
+    source = out_dir / Path(model_path).name
+    if source.resolve() != Path(model_path).resolve():
+        shutil.copy2(model_path, source)  # exports land next to their source
+    stem = source.stem
+
+    artifacts = []  # (variant, path, precision, dynamic, opset)
+    if "static" in variants:
+        exported = export_onnx(str(source), imgsz)
+        if exported:
+            path = out_dir / f"{stem}_static{imgsz}.onnx"
+            Path(exported).replace(path)
+            artifacts.append(("static", str(path), "fp32", False, _onnx_opset(str(path))))
+
+    if any(v in variants for v in ("dynamic", "fp16", "ort")):
+        print("🔄 Exporting dynamic-shape ONNX...")
+        dynamic_path = str(out_dir / f"{stem}_dynamic.onnx")
+        Path(export_dynamic(str(source), imgsz, opset)).replace(dynamic_path)
+        dynamic_opset = _onnx_opset(dynamic_path)
+        if "dynamic" in variants:
+            artifacts.append(("dynamic", dynamic_path, "fp32", True, dynamic_opset))
+        if "fp16" in variants:
+            print("🔄 Converting to FP16...")
+            artifacts.append(("fp16", convert_fp16(dynamic_path, str(out_dir / f"{stem}_dynamic_fp16.onnx")),
+                              "fp16", True, dynamic_opset))
+        if "ort" in variants:
+            print("🔄 Optimizing graph with ONNX Runtime (.ort)...")
+            artifacts.append(("ort", convert_ort(dynamic_path, str(out_dir / f"{stem}_dynamic.ort")),
+                              "fp32", True, dynamic_opset))
+
+    parity_images = parity_images or []
+    inputs = {size: load_parity_inputs(parity_images, size) for size in {imgsz, alt_imgsz}} if parity_images else {}
+    references = {size: reference_outputs(str(source), batch) for size, batch in inputs.items()}
+
+    entries = []
+    for variant, path, precision, dynamic, artifact_opset in artifacts:
+        checks = []
+        if inputs:
+            checks.append(check_parity(path, inputs[imgsz], references[imgsz], precision, batched=dynamic))
+            if dynamic and alt_imgsz != imgsz:
+                checks.append(check_parity(path, inputs[alt_imgsz], references[alt_imgsz], precision, batched=True))
+        passed = bool(checks) and all(check["passed"] for check in checks)
+        status = "✅" if passed else ("⚠️" if not checks else "❌")
+        print(f"{status} {variant}: {Path(path).name}"
+              + "".join(f", @{c['imgsz']} box Δ{c['max_box_px']:.3f}px score Δ{c['max_score']:.4f}" for c in checks))
+        entries.append({
+            "variant": variant,
+            "file": Path(path).name,
+            "format": Path(path).suffix.lstrip("."),
+            "precision": precision,
+            "opset": artifact_opset,
+            "imgsz": imgsz,
+            "dynamic_batch": dynamic,
+            "dynamic_shape": dynamic,
+            "size_mb": round(Path(path).stat().st_size / (1024 * 1024), 2),
+            "sha256": _sha256(path),
+            "parity": checks,
+            "parity_passed": passed,
+        })
+
+    manifest = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "source_model": Path(model_path).name,
+        "source_sha256": _sha256(str(source)),
+        "tolerance": PARITY_TOLERANCE,
+        "artifacts": entries,
+    }
+    (out_dir / MANIFEST_NAME).write_text(json.dumps(manifest, indent=2))
+    return manifest
+
+
+def select_artifact(manifest_path: str, batch: int = 1, imgsz: int = 640, precision: str = "fp32",
+                    formats=("onnx", "ort")) -> Optional[str]:
+    """Path of the best parity-checked artifact that can serve this batch size and imgsz."""
+    manifest = json.loads(Path(manifest_path).read_text())
+    candidates = [
+        entry for entry in manifest["artifacts"]
+        if entry["parity_passed"] and entry["precision"] == precision and entry["format"] in formats
+        and (batch == 1 or entry["dynamic_batch"])
+        and (imgsz == entry["imgsz"] or entry["dynamic_shape"])
+    ]
+    if not candidates:
+        return None
+    # Fixed shapes are cheapest when they fit; among dynamic ones the pre-optimized .ort loads fastest
+    rank = {"static": 0, "ort": 1, "dynamic": 2, "fp16": 3}
+    best = min(candidates, key=lambda entry: rank.get(entry["variant"], len(rank)))
+    return str(Path(manifest_path).parent / best["file"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export a YOLOv8 model to ONNX variants with parity checks")
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    parser.add_argument("--imgsz", type=int, default=640, help="Use the size the model was trained at")
+    parser.add_argument("--variants", nargs="+", choices=VARIANTS, default=list(VARIANTS))
+    parser.add_argument("--opset", type=int, default=None, help="Opset for dynamic variants (default: exporter's)")
+    parser.add_argument("--output-dir", default=None, help="Default: exports/<model stem>")
+    parser.add_argument("--images", default=DEFAULT_IMAGES, help="Sample images for the parity check")
+    parser.add_argument("--parity-images", type=int, default=8)
+    parser.add_argument("--alt-imgsz", type=int, default=480, help="Second resolution for dynamic-shape parity")
+    args = parser.parse_args()
+
+    if not Path(args.model).exists():
+        print(f"❌ Model not found: {args.model}")
+        return
+
+    images = sorted(glob.glob(args.images))[:args.parity_images]
+    if not images:
+        print(f"⚠️ No sample images match {args.images}; skipping parity checks")
+
+    out_dir = Path(args.output_dir) if args.output_dir else BACKEND_DIR / "exports" / Path(args.model).stem
+    manifest = export_pipeline(args.model, out_dir, args.variants, args.imgsz, args.opset, images, args.alt_imgsz)
+    print(f"✅ Manifest saved to: {out_dir / MANIFEST_NAME}")
+
+    failed = [entry["variant"] for entry in manifest["artifacts"] if not entry["parity_passed"]]
+    if failed:
+        print(f"⚠️ Not parity-checked or outside tolerance: {', '.join(failed)}")
+
+    print("\n📝 Next steps:")
+
+    print("2. Or use online converters like Netron to inspect the model")
+    print("3. For iOS, you can also use ONNX Runtime iOS framework directly")
 
 if __name__ == "__main__":
     main()
@@ -5,7 +5,6 @@ Fine-tune YOLOv8n model on Food-101 dataset for kitchen assistant application.
 
 import os
 import torch
-from ultralytics import YOLO
 from pathlib import Path
 import shutil
 import yaml
@@ -13,6 +12,10 @@ import time
 from datetime import datetime
 import sys
 
+from dataset_config import resolve_dataset_config
+from evaluate import evaluate, print_report
+from train_orchestrator import run_training
+
 def setup_training_environment(use_tiny=True):
     """Setup the training environment and paths"""
     # Ensure we're in the backend directory
@@ -102,9 +105,6 @@ def fine_tune_model(dataset_config, pretrained_model, epochs=2, batch_size=16, i
     print(f"⏰ Training started at: {start_time.strftime('%Y-%m-%d %H:%M:%S')}")
     print("="*60)
 
-    # Load the pretrained YOLOv8n model
-    model = YOLO(pretrained_model)
-
     # Force CPU training for stability (MPS has validation bugs)
     device = 'cpu'
     print(f"🖥️  Training device: {device}")
@@ -140,15 +140,9 @@ def fine_tune_model(dataset_config, pretrained_model, epochs=2, batch_size=16, i
 
         print("-"*60)
 
-    # Add the callback to the model
-    model.add_callback("on_train_epoch_end", on_train_epoch_end)
-
-    # Start training
+    # Start training (resumes automatically from an unfinished run's checkpoint)
     try:
-        # Check if resuming from checkpoint
-        is_resuming = str(pretrained_model).endswith('best.pt') or str(pretrained_model).endswith('last.pt')
-
-        results = model.train(
+        state = run_training(pretrained_model, dict(
             data=dataset_config,
             epochs=epochs,
             batch=batch_size,
@@ -157,8 +151,7 @@ def fine_tune_model(dataset_config, pretrained_model, epochs=2, batch_size=16, i
             project=project_name,
             name=run_name,
             exist_ok=True,
-            resume=is_resuming,  # Resume if using checkpoint
-            pretrained=not is_resuming,  # Only use pretrained if not resuming
+            pretrained=True,
             optimizer='AdamW',
             lr0=0.001,  # Initial learning rate
             weight_decay=0.0005,
@@ -176,7 +169,7 @@ def fine_tune_model(dataset_config, pretrained_model, epochs=2, batch_size=16, i
             save_json=False,   # Disable JSON saving
             val=True,         # Enable validation with our train/val split!
             amp=False         # Disable AMP to avoid MPS validation bug
-        )
+        ), callbacks={"on_train_epoch_end": on_train_epoch_end})
 
         end_time = datetime.now()
         training_duration = end_time - start_time
@@ -185,7 +178,7 @@ def fine_tune_model(dataset_config, pretrained_model, epochs=2, batch_size=16, i
         print(f"⏰ Training finished at: {end_time.strftime('%Y-%m-%d %H:%M:%S')}")
         print(f"🕐 Total training time: {training_duration}")
         print("="*60)
-        return results
+        return state
 
     except Exception as e:
         print(f"❌ Training failed: {e}")
@@ -225,22 +218,9 @@ def validate_model(model_path, dataset_config):
     print(f"🔍 Validating model: {model_path}")
 
     try:
-        model = YOLO(model_path)
-
-        # Run validation
-        # Force CPU validation for stability on macOS/MPS
-        results = model.val(
-            data=dataset_config,
-            device='cpu',
-            workers=0,
-            plots=False,
-            save_json=False
-        )
-
-        print("📊 Validation Results:")
-        print(f"   - mAP50: {results.box.map50:.4f}")
-        print(f"   - mAP50-95: {results.box.map:.4f}")
-
+        # Standalone evaluator: parallel CPU inference, predictions cached per model hash
+        results = evaluate(model_path, dataset_config)
+        print_report(results)
         return results
 
     except Exception as e:
@@ -270,15 +250,8 @@ def main():
         project_name = "kitchen_assistant_training_full"
         run_name = "merged_food_yolov8n_20epochs"
 
-        # Check if we should resume from existing checkpoint
-        best_model_path = Path(f"{project_name}/{run_name}/weights/best.pt")
-        if best_model_path.exists():
-            print(f"🔄 Found existing checkpoint: {best_model_path}")
-            pretrained_model = str(best_model_path)
-            print(f"🚀 Resuming training from: {pretrained_model}")
-
-        # Use dataset path directly (already configured correctly)
-        dataset_config = dataset_path
+        # data.yaml uses a relative path; make it absolute for Ultralytics
+        dataset_config = resolve_dataset_config(dataset_path)
 
         # Full training with 20 epochs
         training_results = fine_tune_model(
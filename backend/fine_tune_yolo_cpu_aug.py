@@ -6,6 +6,8 @@ This script is a non-destructive variant of fine_tune_yolo.py with:
 - plots: True
 - explicit augmentations (hsv_h=0.01, hsv_s=0.3, hsv_v=0.2, fliplr=0.5, mosaic=0.3, mixup=0.0)
 - epochs: 30
+- images read from a pre-decoded memmap store (see image_cache.py) when one is built
+- automatic resume from the latest checkpoint; TRAIN_BUDGET_HOURS caps wall-clock time
 """
 
 import os
@@ -13,8 +15,39 @@ from pathlib import Path
 from datetime import datetime
 import shutil
 import yaml
-from ultralytics import YOLO
 
+from dataset_config import resolve_dataset_config
+from evaluate import evaluate, print_report
+from image_cache import build_store, cached_trainer, dataset_image_dirs, default_cache_dir
+from train_orchestrator import run_training
+
+# Shared with sweep.py, which searches around these values
+HYPERPARAMETERS = dict(
+    optimizer="AdamW",
+    lr0=0.0005,
+    weight_decay=0.0005,
+    warmup_epochs=2.0,
+    # loss gains (keep defaults reasonable)
+    box=7.5,
+    cls=0.5,
+    dfl=1.5,
+)
+
+# explicit moderate augmentations
+AUGMENTATIONS = dict(
+    hsv_h=0.01,
+    hsv_s=0.3,
+    hsv_v=0.2,
+    fliplr=0.5,
+    mosaic=0.3,
+    mixup=0.0,
+    degrees=0.0,
+    translate=0.05,
+    scale=0.2,
+    shear=0.0,
+    perspective=0.0,
+    flipud=0.0,
+)
 
 def fine_tune_model(
     dataset_config: str,
@@ -24,8 +57,13 @@ def fine_tune_model(
     img_size: int = 640,
     project_name: str = "kitchen_assistant_training_cpu_aug",
     run_name: str = "merged_food_yolov8n_cpu_aug_30epochs",
+    image_cache_dir: str | None = None,
+    budget_hours: float | None = None,
 ):
-    """Fine-tune YOLOv8n on CPU with explicit moderate augmentations."""
+    """
+    Fine-tune YOLOv8n on CPU with explicit moderate augmentations.
+    Resumes automatically if the run folder has an unfinished checkpoint.
+    """
 
     print("🚀 Starting YOLOv8n fine-tuning (CPU + Moderate Augmentations)...")
     print("📊 Training parameters:")
@@ -36,14 +74,13 @@ def fine_tune_model(
     print(f"   - Base model: {pretrained_model}")
     print(f"   - Project: {project_name}")
     print(f"   - Run name: {run_name}")
+    print(f"   - Image store: {image_cache_dir or 'disabled (decode JPEGs every epoch)'}")
+    print(f"   - Time budget: {f'{budget_hours} h' if budget_hours else 'none'}")
 
     start_time = datetime.now()
     print(f"⏰ Training started at: {start_time.strftime('%Y-%m-%d %H:%M:%S')}")
     print("=" * 60)
 
-    # Model
-    model = YOLO(pretrained_model)
-
     # Force CPU for stability and reproducibility
     device = "cpu"
     print(f"🖥️  Training device: {device}")
@@ -71,10 +108,7 @@ def fine_tune_model(
             print(f"🔮 Estimated finish: {estimated_finish.strftime('%H:%M:%S')}")
         print("-" * 60)
 
-    model.add_callback("on_train_epoch_end", on_train_epoch_end)
-
-    # Train
-    results = model.train(
+    train_args = dict(
         data=dataset_config,
         epochs=epochs,
         batch=batch_size,
@@ -83,16 +117,8 @@ def fine_tune_model(
         project=project_name,
         name=run_name,
         exist_ok=True,
-        resume=False,
         pretrained=True,
-        optimizer="AdamW",
-        lr0=0.0005,
-        weight_decay=0.0005,
-        warmup_epochs=2.0,
-        # loss gains (keep defaults reasonable)
-        box=7.5,
-        cls=0.5,
-        dfl=1.5,
+        **HYPERPARAMETERS,
         # saving/IO
         save=True,
         save_period=5,
@@ -104,28 +130,28 @@ def fine_tune_model(
         save_json=True,
         val=True,
         amp=False,
-        # explicit moderate augmentations
-        hsv_h=0.01,
-        hsv_s=0.3,
-        hsv_v=0.2,
-        fliplr=0.5,
-        mosaic=0.3,
-        mixup=0.0,
-        degrees=0.0,
-        translate=0.05,
-        scale=0.2,
-        shear=0.0,
-        perspective=0.0,
-        flipud=0.0,
+        **AUGMENTATIONS,
+    )
+
+    # Train (or resume), with per-epoch timings in epoch_timings.csv
+    state = run_training(
+        pretrained_model,
+        train_args,
+        budget_hours=budget_hours,
+        trainer=cached_trainer(image_cache_dir) if image_cache_dir else None,
+        callbacks={"on_train_epoch_end": on_train_epoch_end},
     )
 
     end_time = datetime.now()
     print("=" * 60)
-    print("✅ Training completed!")
+    if state["status"] == "budget_exhausted":
+        print(f"⏳ Time budget used up after {state['epochs_completed']}/{epochs} epochs; rerun to resume")
+    else:
+        print("✅ Training completed!")
     print(f"⏰ Finished at: {end_time.strftime('%Y-%m-%d %H:%M:%S')}")
     print(f"🕐 Total time: {end_time - start_time}")
     print("=" * 60)
-    return results
+    return state
 
 
 def copy_best_model(project_name: str, run_name: str) -> str | None:
@@ -142,19 +168,10 @@ def copy_best_model(project_name: str, run_name: str) -> str | None:
 
 
 def validate_model(model_path: str, dataset_config: str):
-    """Validate best model on CPU."""
+    """Validate best model on CPU (see evaluate.py; works for exported models too)."""
     print(f"🔍 Validating model: {model_path}")
-    model = YOLO(model_path)
-    results = model.val(
-        data=dataset_config,
-        device="cpu",
-        workers=2,
-        plots=True,
-        save_json=True,
-    )
-    print("📊 Validation Results:")
-    print(f"   - mAP50: {results.box.map50:.4f}")
-    print(f"   - mAP50-95: {results.box.map:.4f}")
+    results = evaluate(model_path, dataset_config, imgsz=640, workers=2)
+    print_report(results)
     return results
 
 
@@ -175,20 +192,34 @@ def main():
 
         project_name = "kitchen_assistant_training_cpu_aug"
         run_name = "merged_food_yolov8n_cpu_aug_30epochs"
+        img_size = 640
+
+        # data.yaml uses a relative path; make it absolute for Ultralytics
+        data_config = resolve_dataset_config(dataset_path)
+
+        # Decode train/val once; later runs reuse the store if images are unchanged
+        image_cache_dir = default_cache_dir(dataset_path)
+        for img_path in dataset_image_dirs(dataset_path):
+            build_store(img_path, img_size, image_cache_dir)
 
-        results = fine_tune_model(
-            dataset_config=dataset_path,
+        budget = os.getenv("TRAIN_BUDGET_HOURS")
+        state = fine_tune_model(
+            dataset_config=data_config,
             pretrained_model=pretrained_model,
             epochs=30,
             batch_size=8,
-            img_size=640,
+            img_size=img_size,
             project_name=project_name,
             run_name=run_name,
+            image_cache_dir=str(image_cache_dir),
+            budget_hours=float(budget) if budget else None,
         )
+        if state["status"] == "budget_exhausted":
+            return
 
         best_model = copy_best_model(project_name, run_name)
         if best_model:
-            validate_model(best_model, dataset_path)
+            validate_model(best_model, data_config)
 
         print("\n🎉 Process completed!")
         print(f"📁 Outputs: {project_name}/{run_name}")
@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+Pre-decoded, memory-mapped image store for CPU fine-tuning.
+
+Decoding and resizing thousands of JPEGs every epoch is a large share of CPU
+training time. This module decodes each split once into a uint8 memmap of
+fixed imgsz x imgsz slots (the image is resized exactly like Ultralytics'
+`load_image`, long side to imgsz, and stored top-left), plus a JSON index of
+file -> slot. `CachedDetectionTrainer` swaps in a dataset whose `load_image`
+reads from the store, so pages come from the OS cache instead of RAM caching
+the whole dataset.
+
+Build the store before training:
+    python image_cache.py --data ../datasets/merged_food_dataset/data.yaml --imgsz 640
+"""
+
+import argparse
+import hashlib
+import inspect
+import json
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+from ultralytics.data.dataset import YOLODataset
+from ultralytics.data.utils import IMG_FORMATS, check_det_dataset
+from ultralytics.models.yolo.detect import DetectionTrainer
+from ultralytics.utils import colorstr, torch_utils
+
+from dataset_config import resolve_dataset_config
+
+INDEX_VERSION = 1
+DEFAULT_CACHE_DIRNAME = ".image_cache"
+
+_worker_array: Optional[np.memmap] = None
+
+# Pinned Ultralytics releases differ: unwrap_model replaced de_parallel, and
+# load_image only takes resize_short from 8.4 on
+unwrap_model = getattr(torch_utils, "unwrap_model", None) or torch_utils.de_parallel
+LOAD_IMAGE_RESIZE_SHORT = "resize_short" in inspect.signature(YOLODataset.load_image).parameters
+
+
+def store_name(img_path: str, imgsz: int) -> str:
+    """Stable store name for an image folder (as the trainer sees it) and size."""
+    digest = hashlib.blake2b(str(Path(img_path).resolve()).encode(), digest_size=6).hexdigest()
+    return f"{Path(img_path).parent.name}_{digest}_{imgsz}"
+
+
+def list_images(img_path: str) -> List[str]:
+    return sorted(
+        str(path) for path in Path(img_path).resolve().iterdir()
+        if path.suffix.lower().lstrip(".") in IMG_FORMATS
+    )
+
+
+def resize_long_side(im: np.ndarray, imgsz: int) -> np.ndarray:
+    """Same resize as Ultralytics BaseDataset.load_image(rect_mode=True)."""
+    h0, w0 = im.shape[:2]
+    r = imgsz / max(h0, w0)
+    if r != 1:
+        w, h = min(math.ceil(w0 * r), imgsz), min(math.ceil(h0 * r), imgsz)
+        im = cv2.resize(im, (w, h), interpolation=cv2.INTER_LINEAR)
+    return im
+
+
+def _init_worker(data_path: str, shape: Tuple[int, ...]):
+    global _worker_array
+    _worker_array = np.memmap(data_path, dtype=np.uint8, mode="r+", shape=shape)
+
+
+def _decode_into_slot(task: Tuple[int, str, int]) -> Dict:
+    row, path, imgsz = task
+    im = cv2.imread(path, cv2.IMREAD_COLOR)
+    if im is None:
+        return {"row": row, "path": path, "error": "unreadable"}
+    h0, w0 = im.shape[:2]
+    im = resize_long_side(im, imgsz)
+    h, w = im.shape[:2]
+    _worker_array[row, :h, :w] = im
+    stat = os.stat(path)
+    return {"row": row, "path": path, "hw0": [h0, w0], "hw": [h, w],
+            "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def build_store(img_path: str, imgsz: int, cache_dir: Path, workers: Optional[int] = None,
+                force: bool = False) -> Path:
+    """Decode every image under `img_path` into a memmap store; returns the index path."""
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    name = store_name(img_path, imgsz)
+    index_path = cache_dir / f"{name}.json"
+    data_path = cache_dir / f"{name}.u8"
+    files = list_images(img_path)
+
+    if index_path.exists() and not force:
+        store = MemmapImageStore(index_path)
+        if store.is_fresh(files):
+            print(f"✅ Image store up to date: {index_path.name} ({len(files)} images)")
+            return index_path
+
+    shape = (len(files), imgsz, imgsz, 3)
+    size_gb = np.prod(shape) / 1024 ** 3
+    print(f"🔄 Decoding {len(files)} images from {img_path} into {data_path.name} ({size_gb:.2f} GB)...")
+    np.memmap(data_path, dtype=np.uint8, mode="w+", shape=shape).flush()
+
+    tasks = [(row, path, imgsz) for row, path in enumerate(files)]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(str(data_path), shape)) as pool:
+        entries = list(pool.map(_decode_into_slot, tasks, chunksize=16))
+
+    failed = [entry["path"] for entry in entries if "error" in entry]
+    if failed:
+        print(f"⚠️ {len(failed)} images could not be decoded and will be read from disk")
+    index = {
+        "version": INDEX_VERSION,
+        "imgsz": imgsz,
+        "shape": list(shape),
+        "data": data_path.name,
+        "files": {entry.pop("path"): entry for entry in entries if "error" not in entry},
+    }
+    index_path.write_text(json.dumps(index))
+    print(f"✅ Image store saved to: {index_path}")
+    return index_path
+
+
+class MemmapImageStore:
+    """Read side of the store; the memmap is opened lazily so it survives dataloader pickling."""
+
+    def __init__(self, index_path: Path):
+        self.index_path = Path(index_path)
+        index = json.loads(self.index_path.read_text())
+        if index.get("version") != INDEX_VERSION:
+            raise ValueError(f"Unsupported image store version in {index_path}")
+        self.imgsz = index["imgsz"]
+        self.shape = tuple(index["shape"])
+        self.data_path = self.index_path.parent / index["data"]
+        self.files = index["files"]
+        self._array: Optional[np.memmap] = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_array"] = None
+        return state
+
+    def __len__(self) -> int:
+        return len(self.files)
+
+    def is_fresh(self, files: List[str]) -> bool:
+        if set(files) != set(self.files):
+            return False
+        for path in files:
+            stat = os.stat(path)
+            entry = self.files[path]
+            if stat.st_size != entry["size"] or stat.st_mtime_ns != entry["mtime_ns"]:
+                return False
+        return True
+
+    def get(self, path: str) -> Optional[Tuple[np.ndarray, Tuple[int, int], Tuple[int, int]]]:
+        """(image, original hw, resized hw) like load_image, or None if not stored."""
+        entry = self.files.get(path)
+        if entry is None:
+            return None
+        if self._array is None:
+            self._array = np.memmap(self.data_path, dtype=np.uint8, mode="r", shape=self.shape)
+        h, w = entry["hw"]
+        # Copy out of the page cache: augmentations may write to the array
+        im = np.array(self._array[entry["row"], :h, :w])
+        return im, tuple(entry["hw0"]), (h, w)
+
+
+class CachedYOLODataset(YOLODataset):
+    """YOLODataset whose load_image reads pre-decoded images from a MemmapImageStore."""
+
+    def __init__(self, *args, image_store: Optional[MemmapImageStore] = None, **kwargs):
+        self.image_store = image_store
+        super().__init__(*args, **kwargs)
+
+    def _load_from_disk(self, i, rect_mode, resize_short):
+        if LOAD_IMAGE_RESIZE_SHORT:
+            return super().load_image(i, rect_mode=rect_mode, resize_short=resize_short)
+        return super().load_image(i, rect_mode=rect_mode)
+
+    def load_image(self, i, rect_mode=True, resize_short=False):
+        store = self.image_store
+        if (store is None or self.ims[i] is not None or not rect_mode or resize_short
+                or store.imgsz != self.imgsz or getattr(self, "channels", 3) != 3):
+            return self._load_from_disk(i, rect_mode, resize_short)
+
+        cached = store.get(os.path.realpath(self.im_files[i]))
+        if cached is None:
+            return self._load_from_disk(i, rect_mode, resize_short)
+
+        im, hw0, hw = cached
+        # Same mosaic buffer bookkeeping as BaseDataset.load_image
+        if self.augment:
+            self.ims[i], self.im_hw0[i], self.im_hw[i] = im, hw0, hw
+            self.buffer.append(i)
+            if 1 < len(self.buffer) >= self.max_buffer_length:
+                j = self.buffer.pop(0)
+                if self.cache != "ram":
+                    self.ims[j], self.im_hw0[j], self.im_hw[j] = None, None, None
+        return im, hw0, hw
+
+
+class CachedDetectionTrainer(DetectionTrainer):
+    """DetectionTrainer that reads images from the stores in `image_cache_dir`."""
+
+    image_cache_dir: Optional[str] = None
+
+    def build_dataset(self, img_path, mode="train", batch=None):
+        index_path = Path(self.image_cache_dir or "") / f"{store_name(img_path, self.args.imgsz)}.json"
+        if self.image_cache_dir is None or not index_path.exists():
+            print(f"⚠️ No image store for {img_path} at imgsz={self.args.imgsz}, decoding from disk")
+            return super().build_dataset(img_path, mode, batch)
+
+        store = MemmapImageStore(index_path)
+        print(f"🗄️ {mode}: reading {len(store)} pre-decoded images from {index_path.name}")
+        cfg = self.args
+        return CachedYOLODataset(
+            img_path=img_path,
+            imgsz=cfg.imgsz,
+            batch_size=batch,
+            augment=mode == "train",
+            hyp=cfg,
+            rect=cfg.rect or mode == "val",
+            cache=cfg.cache or None,
+            single_cls=cfg.single_cls or False,
+            stride=max(int(unwrap_model(self.model).stride.max()), 32),
+            pad=0.0 if mode == "train" else 0.5,
+            prefix=colorstr(f"{mode}: "),
+            task=cfg.task,
+            classes=cfg.classes,
+            data=self.data,
+            fraction=cfg.fraction if mode == "train" else 1.0,
+            image_store=store,
+        )
+
+
+def cached_trainer(cache_dir: str):
+    """CachedDetectionTrainer bound to a cache folder, for `model.train(trainer=...)`."""
+    return type("CachedDetectionTrainer", (CachedDetectionTrainer,), {"image_cache_dir": str(cache_dir)})
+
+
+def dataset_image_dirs(data: str) -> List[str]:
+    """Train/val image folders exactly as the trainer will resolve them."""
+    dataset = check_det_dataset(resolve_dataset_config(data))
+    return [dataset[split] for split in ("train", "val") if dataset.get(split)]
+
+
+def default_cache_dir(data: str) -> Path:
+    return Path(data).resolve().parent / DEFAULT_CACHE_DIRNAME
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-decode a dataset into memory-mapped image stores")
+    parser.add_argument("--data", default="../datasets/merged_food_dataset/data.yaml")
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--cache-dir", default=None, help="Default: <dataset>/.image_cache")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--force", action="store_true")
+    args = parser.parse_args()
+
+    cache_dir = Path(args.cache_dir) if args.cache_dir else default_cache_dir(args.data)
+    for img_path in dataset_image_dirs(args.data):
+        build_store(img_path, args.imgsz, cache_dir, workers=args.workers, force=args.force)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Upload quality gate that runs before YOLO.
+
+Blurry, black or blown-out photos still cost a full decode and an inference
+pass, only to come back empty. ImageQualityFilter looks at a small grayscale
+thumbnail instead (JPEG is decoded straight at reduced scale via PIL's draft
+mode, a few ms for a phone photo) and rejects:
+
+- too_dark / overexposed: most pixels in the bottom / top of the histogram
+- no_content: almost no contrast (lens cap, blank wall, solid fill)
+- blurry: variance of the Laplacian below MIN_SHARPNESS
+
+Defaults were calibrated on the training images at a 256px thumbnail: none of
+the originals is rejected, every frame blurred by a 6px (at 640) Gaussian is.
+The endpoint answers 422 with the reason and a hint for the user, and
+rejections are counted per reason in image_rejections_total.
+
+Settings: IMAGE_QUALITY=0 to disable, IMAGE_MIN_SHARPNESS,
+IMAGE_MAX_DARK_FRACTION, IMAGE_MAX_BRIGHT_FRACTION.
+
+Check images offline:
+    python image_quality.py photo1.jpg photo2.jpg
+"""
+
+import argparse
+import io
+import os
+import time
+from typing import Dict, Optional
+
+import numpy as np
+from PIL import Image
+
+THUMBNAIL_SIZE = 256
+MIN_SHARPNESS = 12.0
+MAX_DARK_FRACTION = 0.9  # share of pixels below DARK_LEVEL
+MAX_BRIGHT_FRACTION = 0.95  # share of pixels above BRIGHT_LEVEL
+MIN_CONTRAST = 6.0  # grayscale standard deviation
+DARK_LEVEL = 32
+BRIGHT_LEVEL = 224
+
+HINTS = {
+    "too_dark": "The photo is too dark. Turn on a light or open the fridge door fully and try again.",
+    "overexposed": "The photo is overexposed. Avoid pointing the camera at a light and try again.",
+    "no_content": "The photo looks blank. Point the camera at the fridge shelves and try again.",
+    "blurry": "The photo is blurry. Hold the phone steady, tap to focus and try again.",
+}
+
+
+class QualityRejection:
+    def __init__(self, reason: str, stats: Dict[str, float]):
+        self.reason = reason
+        self.stats = stats
+
+    @property
+    def hint(self) -> str:
+        return HINTS[self.reason]
+
+    def as_detail(self) -> Dict:
+        return {"reason": self.reason, "message": self.hint, "stats": self.stats}
+
+
+def thumbnail(image_data: bytes, size: int = THUMBNAIL_SIZE) -> np.ndarray:
+    """Grayscale uint8 thumbnail, decoded at reduced scale where the format allows it."""
+    with Image.open(io.BytesIO(image_data)) as image:
+        image.draft("L", (size, size))  # JPEG: DCT scaling, no full-size decode
+        gray = image.convert("L")
+    gray.thumbnail((size, size))
+    return np.asarray(gray)
+
+
+def image_stats(gray: np.ndarray) -> Dict[str, float]:
+    pixels = gray.astype(np.float32)
+    laplacian = (pixels[:-2, 1:-1] + pixels[2:, 1:-1] + pixels[1:-1, :-2] + pixels[1:-1, 2:]
+                 - 4 * pixels[1:-1, 1:-1])
+    histogram = np.bincount(gray.ravel(), minlength=256) / gray.size
+    return {
+        "sharpness": round(float(laplacian.var()), 2),
+        "brightness": round(float(pixels.mean()), 2),
+        "contrast": round(float(pixels.std()), 2),
+        "dark_fraction": round(float(histogram[:DARK_LEVEL].sum()), 4),
+        "bright_fraction": round(float(histogram[BRIGHT_LEVEL:].sum()), 4),
+    }
+
+
+class ImageQualityFilter:
+    def __init__(self, min_sharpness: float = MIN_SHARPNESS, max_dark_fraction: float = MAX_DARK_FRACTION,
+                 max_bright_fraction: float = MAX_BRIGHT_FRACTION, min_contrast: float = MIN_CONTRAST,
+                 size: int = THUMBNAIL_SIZE):
+        self.min_sharpness = min_sharpness
+        self.max_dark_fraction = max_dark_fraction
+        self.max_bright_fraction = max_bright_fraction
+        self.min_contrast = min_contrast
+        self.size = size
+
+    def check(self, image_data: bytes) -> Optional[QualityRejection]:
+        """None if the image is worth running through YOLO, else why not."""
+        stats = image_stats(thumbnail(image_data, self.size))
+        # Exposure first: a black frame is also "blurry", but the light is the fix
+        if stats["dark_fraction"] > self.max_dark_fraction:
+            return QualityRejection("too_dark", stats)
+        if stats["bright_fraction"] > self.max_bright_fraction:
+            return QualityRejection("overexposed", stats)
+        if stats["contrast"] < self.min_contrast:
+            return QualityRejection("no_content", stats)
+        if stats["sharpness"] < self.min_sharpness:
+            return QualityRejection("blurry", stats)
+        return None
+
+
+def load_quality_filter_from_env() -> Optional[ImageQualityFilter]:
+    if os.getenv("IMAGE_QUALITY", "1").lower() in ("0", "false", "no"):
+        return None
+    quality_filter = ImageQualityFilter(
+        min_sharpness=float(os.getenv("IMAGE_MIN_SHARPNESS", MIN_SHARPNESS)),
+        max_dark_fraction=float(os.getenv("IMAGE_MAX_DARK_FRACTION", MAX_DARK_FRACTION)),
+        max_bright_fraction=float(os.getenv("IMAGE_MAX_BRIGHT_FRACTION", MAX_BRIGHT_FRACTION)),
+    )
+    print(f"✅ Image quality gate: sharpness >= {quality_filter.min_sharpness}, "
+          f"dark <= {quality_filter.max_dark_fraction}, bright <= {quality_filter.max_bright_fraction}")
+    return quality_filter
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the upload quality gate on image files")
+    parser.add_argument("images", nargs="+")
+    args = parser.parse_args()
+
+    quality_filter = ImageQualityFilter()
+    for path in args.images:
+        with open(path, "rb") as f:
+            data = f.read()
+        start = time.perf_counter()
+        rejection = quality_filter.check(data)
+        elapsed_ms = (time.perf_counter() - start) * 1000.0
+        stats = rejection.stats if rejection else image_stats(thumbnail(data))
+        verdict = f"❌ {rejection.reason}" if rejection else "✅ ok"
+        print(f"{verdict:<16} {elapsed_ms:6.2f}ms {os.path.basename(path)} {stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Ingredient vocabulary shared by detection and recipe requests.
+
+Detections come back as the fine-tuned model's class names, but recipe
+requests carry whatever the user typed: "tomatoes", "Tomato", "cherry
+tomatoes", "brocolli". canonicalize() maps all of those to one name so the
+recipe index keys, the prompt and the mock recipes see the same ingredient:
+
+1. exact alias lookup on the lowercased, singularized words
+2. the same without descriptors ("fresh", "diced", "baby", ...)
+3. the longest known suffix, since the head noun comes last
+   ("roma tomato" -> Tomato, "peanut butter" stays Peanut Butter), unless a
+   dropped word is a flavor ("chocolate milk" is not Milk)
+4. a character-trigram index for typos, accepted above FUZZY_MIN_SIMILARITY
+   and only between names of similar length ("cheesecake" is not Cheese)
+
+Anything still unknown is kept, singularized and title-cased without
+descriptors, so "beans" and "bean" share one name as known ones do. Aliases are
+compiled once at import and results are memoized, so a request's ingredients
+are canonicalized in microseconds.
+
+    python ingredients.py "cherry tomatoes" "Brocolli" "fresh basil"
+"""
+
+import argparse
+import re
+import time
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+# Classes of the fine-tuned detection model (best.pt)
+DETECTABLE = ("Beef", "Pork", "Chicken", "Butter", "Cheese", "Milk",
+              "Broccoli", "Carrot", "Cucumber", "Lettuce", "Tomato")
+
+# Canonical name -> other ways users write it (plurals are handled separately)
+SYNONYMS = {
+    "Beef": ["ground beef", "minced beef", "beef mince", "steak", "beef steak", "sirloin", "brisket"],
+    "Pork": ["pork chop", "pork loin", "pork shoulder", "pork belly", "ground pork"],
+    "Chicken": ["chicken meat", "poultry", "rotisserie chicken", "chicken thigh", "chicken drumstick"],
+    "Butter": ["salted butter", "unsalted butter"],
+    "Cheese": ["cheddar", "mozzarella", "parmesan", "parmigiano", "gouda", "swiss"],
+    "Milk": ["whole milk", "skim milk", "skimmed milk", "dairy milk"],
+    "Broccoli": ["broccoli floret", "brocoli", "calabrese"],
+    "Carrot": [],
+    "Cucumber": ["english cucumber", "persian cucumber"],
+    "Lettuce": ["romaine", "iceberg", "butter lettuce", "cos"],
+    "Tomato": ["cherry tomato", "grape tomato", "roma tomato", "plum tomato", "heirloom tomato"],
+    "Bell Pepper": ["capsicum", "red pepper", "green pepper", "yellow pepper", "sweet pepper"],
+    "Onion": ["yellow onion", "red onion", "white onion", "sweet onion"],
+    "Egg": [],
+    "Chicken Breast": [],
+    "Garlic": ["garlic clove", "clove of garlic"],
+    "Spinach": [],
+    "Potato": ["russet", "yukon gold", "spud"],
+    "Mushroom": ["button mushroom", "cremini", "portobello", "champignon"],
+    # Own ingredients, listed so suffix matching does not fold them into the ones above
+    "Peanut Butter": [],
+    "Cream Cheese": [],
+    "Cottage Cheese": [],
+    "Coconut Milk": [],
+    "Almond Milk": [],
+    "Oat Milk": [],
+    "Buttermilk": [],
+    "Tomato Sauce": ["tomato puree", "passata"],
+    "Tomato Paste": [],
+    "Chicken Broth": ["chicken stock"],
+    "Beef Broth": ["beef stock"],
+    "Green Onion": ["scallion", "spring onion"],
+    "Sweet Potato": ["yam"],
+    "Black Pepper": [],
+    "Chili Pepper": ["chili", "chile", "hot pepper", "jalapeno", "jalapeño"],
+}
+
+DESCRIPTORS = {
+    "fresh", "frozen", "organic", "raw", "cooked", "chopped", "diced", "sliced", "minced", "grated",
+    "shredded", "large", "small", "medium", "ripe", "whole", "baby", "boneless", "skinless", "lean",
+    "some", "a", "an", "of", "the", "few", "leftover", "local", "homemade",
+}
+
+# Leading words that make a different product of the head noun
+FLAVORS = {
+    "chocolate", "strawberry", "vanilla", "banana", "coffee", "caramel", "honey", "garlic", "herb", "cinnamon",
+}
+
+FUZZY_MIN_SIMILARITY = 0.6
+FUZZY_MIN_LENGTH = 4
+FUZZY_MIN_LENGTH_RATIO = 0.8  # shorter / longer name; typos barely change the length
+
+_WORD = re.compile(r"[a-zà-ÿ]+")
+
+
+def normalize_word(word: str) -> str:
+    """Crude singular form so 'tomatoes' and 'tomato' meet in the index."""
+    if len(word) > 4 and word.endswith("oes"):
+        return word[:-2]
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("s") and not word.endswith(("ss", "us")):  # hummus, asparagus
+        return word[:-1]
+    return word
+
+
+def _key(words: Iterable[str]) -> str:
+    return " ".join(normalize_word(word) for word in words)
+
+
+def _trigrams(text: str) -> Set[str]:
+    padded = f"^{text}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _compile() -> Tuple[Dict[str, str], Dict[str, Set[str]]]:
+    """Alias key -> canonical name, and trigram -> alias keys for fuzzy lookup."""
+    aliases: Dict[str, str] = {}
+    for canonical, synonyms in SYNONYMS.items():
+        for alias in (canonical, *synonyms):
+            aliases.setdefault(_key(_WORD.findall(alias.lower())), canonical)
+    grams: Dict[str, Set[str]] = {}
+    for key in aliases:
+        if len(key) >= FUZZY_MIN_LENGTH:
+            for gram in _trigrams(key):
+                grams.setdefault(gram, set()).add(key)
+    return aliases, grams
+
+
+ALIASES, _TRIGRAM_INDEX = _compile()
+
+# Fine-tuned class name -> display name, as used by postprocess.extract_ingredients
+YOLO_TO_FOOD_MAPPING = {name.lower(): name for name in DETECTABLE}
+
+
+def _fuzzy(key: str) -> Optional[str]:
+    if len(key) < FUZZY_MIN_LENGTH:
+        return None
+    query = _trigrams(key)
+    shared: Dict[str, int] = {}
+    for gram in query:
+        for candidate in _TRIGRAM_INDEX.get(gram, ()):
+            shared[candidate] = shared.get(candidate, 0) + 1
+    best, best_score = None, FUZZY_MIN_SIMILARITY
+    for candidate, count in shared.items():
+        if candidate.count(" ") != key.count(" "):
+            continue  # "pepper" is not a typo of "red pepper"
+        if min(len(candidate), len(key)) < FUZZY_MIN_LENGTH_RATIO * max(len(candidate), len(key)):
+            continue  # "cheesecake" shares most of "cheese" but is not a typo of it
+        score = 2 * count / (len(query) + len(_trigrams(candidate)))  # Dice coefficient
+        if score >= best_score:
+            best, best_score = candidate, score
+    return ALIASES[best] if best else None
+
+
+@lru_cache(maxsize=4096)
+def canonicalize(name: str) -> str:
+    """Canonical ingredient name for free-form user or detector text."""
+    words = _WORD.findall(name.lower())
+    core = [word for word in words if word not in DESCRIPTORS] or words
+    if not core:
+        return name.strip()
+
+    for candidate in (words, core):
+        match = ALIASES.get(_key(candidate))
+        if match:
+            return match
+    for start in range(1, len(core)):
+        if FLAVORS & set(core[:start]):
+            break
+        match = ALIASES.get(_key(core[start:]))
+        if match:
+            return match
+    flavored = len(core) > 1 and bool(FLAVORS & set(core[:-1]))
+    match = (_fuzzy(_key(core)) or _fuzzy(" ".join(core))  # "chees" is a typo, not a plural
+             or (_fuzzy(normalize_word(core[-1])) if len(core) > 1 and not flavored else None))
+    if match:
+        return match
+    return _key(core).title()
+
+
+def canonicalize_all(names: Iterable[str]) -> List[str]:
+    """Canonical names in request order, without duplicates or blanks."""
+    seen = set()
+    result = []
+    for name in names:
+        canonical = canonicalize(name)
+        if canonical and canonical not in seen:
+            seen.add(canonical)
+            result.append(canonical)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Canonicalize ingredient names")
+    parser.add_argument("names", nargs="+")
+    args = parser.parse_args()
+
+    for name in args.names:
+        print(f"   {name!r} -> {canonicalize(name)!r}")
+    canonicalize.cache_clear()
+    start = time.perf_counter()
+    canonicalize_all(args.names)
+    cold_us = (time.perf_counter() - start) * 1e6
+    start = time.perf_counter()
+    canonicalize_all(args.names)
+    warm_us = (time.perf_counter() - start) * 1e6
+    print(f"⏱️  {len(args.names)} name(s): {cold_us:.1f}µs uncached, {warm_us:.1f}µs cached "
+          f"({len(ALIASES)} aliases)")
+
+
+if __name__ == "__main__":
+    main()
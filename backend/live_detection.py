@@ -0,0 +1,129 @@
+"""
+Live-camera detection over a WebSocket.
+
+The client streams binary JPEG frames; the server answers each processed frame
+with a JSON detection message. Frames that arrive while the model is busy
+replace each other in a single slot, so the newest frame is always next and
+stale ones are dropped instead of queueing up.
+"""
+
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+from starlette.websockets import WebSocket, WebSocketDisconnect
+
+DetectFrame = Callable[[bytes], Awaitable[Tuple[List[str], List[float], int]]]
+
+
+class LatestFrameSlot:
+    """Single-frame mailbox; putting a frame overwrites one not yet taken."""
+
+    def __init__(self):
+        self.received = 0
+        self.dropped = 0
+        self._frame: Optional[Tuple[int, bytes]] = None
+        self._closed = False
+        self._ready = asyncio.Event()
+
+    def put(self, data: bytes):
+        self.received += 1
+        if self._frame is not None:
+            self.dropped += 1
+        self._frame = (self.received, data)
+        self._ready.set()
+
+    def close(self):
+        self._closed = True
+        self._ready.set()
+
+    async def get(self) -> Optional[Tuple[int, bytes]]:
+        """Wait for the newest frame; None once the client is gone."""
+        while self._frame is None:
+            if self._closed:
+                return None
+            self._ready.clear()
+            await self._ready.wait()
+        frame, self._frame = self._frame, None
+        return frame
+
+
+class IngredientTracker:
+    """Smooths per-frame detections with an EMA and enter/exit hysteresis."""
+
+    def __init__(self, alpha: float = 0.5, enter: float = 0.3, exit: float = 0.1):
+        self.alpha = alpha
+        self.enter = enter
+        self.exit = exit
+        self._scores: Dict[str, float] = {}
+        self._visible: set = set()
+
+    def update(self, ingredients: List[str], confidences: List[float]) -> Tuple[List[str], List[float]]:
+        observed = dict(zip(ingredients, confidences))
+
+        for name in set(self._scores) | set(observed):
+            previous = self._scores.get(name, 0.0)
+            score = (1 - self.alpha) * previous + self.alpha * observed.get(name, 0.0)
+            if score < self.exit:
+                self._scores.pop(name, None)
+                self._visible.discard(name)
+                continue
+            self._scores[name] = score
+            if score >= self.enter:
+                self._visible.add(name)
+
+        stable = sorted(self._visible, key=lambda name: (-self._scores[name], name))
+        return stable, [round(self._scores[name], 2) for name in stable]
+
+
+def decode_frame(data: bytes) -> np.ndarray:
+    """Decode a JPEG/PNG frame to a BGR array."""
+    frame = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if frame is None:
+        raise ValueError("Frame is not a valid image")
+    return frame
+
+
+async def run_live_session(websocket: WebSocket, detect_frame: DetectFrame):
+    """Pump frames from the socket through `detect_frame` until the client disconnects."""
+    slot = LatestFrameSlot()
+    tracker = IngredientTracker()
+
+    async def receive_frames():
+        try:
+            while True:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+                if message.get("bytes"):
+                    slot.put(message["bytes"])
+        finally:
+            slot.close()
+
+    receiver = asyncio.create_task(receive_frames())
+    try:
+        while (item := await slot.get()) is not None:
+            frame_id, data = item
+            start_time = time.time()
+            try:
+                ingredients, confidences, imgsz = await detect_frame(data)
+            except ValueError as e:
+                await websocket.send_json({"frame": frame_id, "error": str(e)})
+                continue
+
+            stable, stable_confidence = tracker.update(ingredients, confidences)
+            await websocket.send_json({
+                "frame": frame_id,
+                "ingredients": stable,
+                "confidence": stable_confidence,
+                "frame_ingredients": ingredients,
+                "processing_time": time.time() - start_time,
+                "imgsz": imgsz,
+                "dropped_frames": slot.dropped,
+            })
+    except WebSocketDisconnect:
+        pass
+    finally:
+        receiver.cancel()
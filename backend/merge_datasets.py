@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""
+Build merged_food_dataset from the per-source Roboflow exports in datasets/ALL.
+
+Driven by datasets/merge_config.yaml, which maps each source's class names onto
+the merged class list. Images are hashed and their labels remapped in a process
+pool; images are hardlinked (copied only across filesystems), exact duplicates
+across sources are kept once, and the train/val split is derived from the image
+hash so it is stable between runs.
+
+A manifest in the output folder records a fingerprint per source, so a rebuild
+only re-reads sources whose files or mapping changed and only touches output
+files whose content or split changed.
+
+Examples:
+    python merge_datasets.py
+    python merge_datasets.py --config ../datasets/merge_config.yaml --workers 8
+    python merge_datasets.py --force
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import yaml
+
+DEFAULT_CONFIG = Path(__file__).resolve().parent.parent / "datasets" / "merge_config.yaml"
+MANIFEST_NAME = ".merge_manifest.json"
+MANIFEST_VERSION = 1
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp", ".webp"}
+SOURCE_SPLITS = ("train", "valid", "test")
+OUTPUT_SPLITS = ("train", "val")
+
+
+def load_config(path: Path) -> Dict:
+    with open(path, "r") as f:
+        config = yaml.safe_load(f)
+
+    names = config["names"]
+    if len(set(names)) != len(names):
+        raise ValueError("Merged class names must be unique")
+    for source, entry in config["sources"].items():
+        unknown = {target for target in entry.get("classes", {}).values() if target is not None} - set(names)
+        if unknown:
+            raise ValueError(f"Source '{source}' maps to unknown classes: {sorted(unknown)}")
+    return config
+
+
+def source_class_map(source_dir: Path, classes: Dict[str, Optional[str]], names: List[str]) -> Dict[int, int]:
+    """Map the source's class ids to merged ids using the source's own data.yaml names."""
+    with open(source_dir / "data.yaml", "r") as f:
+        source_names = yaml.safe_load(f)["names"]
+    if isinstance(source_names, dict):
+        source_names = [source_names[i] for i in sorted(source_names)]
+
+    merged_index = {name: i for i, name in enumerate(names)}
+    return {
+        i: merged_index[classes[name]]
+        for i, name in enumerate(source_names)
+        if classes.get(name) is not None
+    }
+
+
+def list_source_files(source_dir: Path) -> List[Tuple[str, Path, Path]]:
+    """(split, image, label) for every image in the source, in a stable order."""
+    files = []
+    for split in SOURCE_SPLITS:
+        image_dir = source_dir / split / "images"
+        if not image_dir.is_dir():
+            continue
+        for image in sorted(image_dir.iterdir()):
+            if image.suffix.lower() in IMAGE_EXTENSIONS:
+                files.append((split, image, source_dir / split / "labels" / f"{image.stem}.txt"))
+    return files
+
+
+def source_fingerprint(entry: Dict, names: List[str], files: List[Tuple[str, Path, Path]]) -> str:
+    """Changes when the mapping, the merged names or any image/label file (size, mtime) changes."""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(json.dumps([entry, names], sort_keys=True).encode())
+    for _, image, label in files:
+        for path in (image, label):
+            try:
+                stat = path.stat()
+                digest.update(f"{path}|{stat.st_size}|{stat.st_mtime_ns}\n".encode())
+            except FileNotFoundError:
+                digest.update(f"{path}|missing\n".encode())
+    return digest.hexdigest()
+
+
+def remap_label(text: str, class_map: Dict[int, int]) -> Tuple[str, int]:
+    """Rewrite class ids in a YOLO label file; returns (new text, dropped line count)."""
+    lines, dropped = [], 0
+    for line in text.splitlines():
+        parts = line.split()
+        if not parts:
+            continue
+        try:
+            target = class_map.get(int(float(parts[0])))
+        except ValueError:
+            target = None
+        if target is None:
+            dropped += 1
+            continue
+        lines.append(" ".join([str(target), *parts[1:]]))
+    return ("\n".join(lines) + "\n") if lines else "", dropped
+
+
+def process_image(task: Tuple[str, str, str, str, Dict[int, int]]) -> Dict:
+    """Worker: hash one image and remap its label."""
+    source, split, image, label, class_map = task
+    with open(image, "rb") as f:
+        sha = hashlib.blake2b(f.read(), digest_size=16).hexdigest()
+    try:
+        with open(label, "r") as f:
+            text, dropped = remap_label(f.read(), class_map)
+    except FileNotFoundError:
+        text, dropped = "", 0
+    return {
+        "source": source,
+        "name": f"{source}_{split}_{Path(image).name}",
+        "image": image,
+        "sha": sha,
+        "label": text,
+        "dropped_boxes": dropped,
+    }
+
+
+def output_split(sha: str, val_fraction: float) -> str:
+    """Deterministic split from the image hash, so rebuilds never reshuffle."""
+    return "val" if int(sha[:8], 16) / 0xFFFFFFFF < val_fraction else "train"
+
+
+def label_digest(text: str) -> str:
+    return hashlib.blake2b(text.encode(), digest_size=8).hexdigest()
+
+
+def link_or_copy(src: str, dst: Path):
+    if dst.exists() or dst.is_symlink():
+        dst.unlink()
+    try:
+        os.link(src, dst)
+    except OSError:
+        # Different filesystem (or no hardlink support)
+        shutil.copy2(src, dst)
+
+
+def write_text(path: Path, text: str):
+    if path.exists():
+        path.unlink()  # don't write through a hardlink shared with another file
+    path.write_text(text)
+
+
+def select_outputs(config: Dict, records: Dict[str, List[Dict]]) -> Tuple[Dict[str, Dict], Dict[str, int]]:
+    """Apply drop_empty and cross-source dedup; returns (name -> record with split, stats)."""
+    selected: Dict[str, Dict] = {}
+    seen: Dict[str, str] = {}
+    stats = {"images": 0, "duplicates": 0, "empty": 0, "dropped_boxes": 0}
+
+    for source in config["sources"]:
+        for record in records[source]:
+            stats["images"] += 1
+            stats["dropped_boxes"] += record["dropped_boxes"]
+            if config.get("drop_empty", True) and not record["label"]:
+                stats["empty"] += 1
+                continue
+            if record["sha"] in seen:
+                stats["duplicates"] += 1
+                continue
+            seen[record["sha"]] = record["name"]
+            selected[record["name"]] = {**record, "split": output_split(record["sha"], config["val_fraction"])}
+    return selected, stats
+
+
+def write_outputs(output: Path, selected: Dict[str, Dict], previous: Dict[str, Dict]) -> Dict[str, int]:
+    """Bring the output folders in line with `selected`, touching only what changed."""
+    for folder in ("images", "labels", *(f"{split}/{kind}" for split in OUTPUT_SPLITS for kind in ("images", "labels"))):
+        (output / folder).mkdir(parents=True, exist_ok=True)
+
+    written = 0
+    for name, record in selected.items():
+        state = {"sha": record["sha"], "label": label_digest(record["label"]), "split": record["split"]}
+        stem = Path(name).stem
+        paths = [
+            output / "images" / name,
+            output / record["split"] / "images" / name,
+            output / "labels" / f"{stem}.txt",
+            output / record["split"] / "labels" / f"{stem}.txt",
+        ]
+        if previous.get(name) == state and all(path.exists() for path in paths):
+            continue
+
+        link_or_copy(record["image"], paths[0])
+        link_or_copy(str(paths[0]), paths[1])
+        write_text(paths[2], record["label"])
+        link_or_copy(str(paths[2]), paths[3])
+        written += 1
+
+    # Anything not in the selection is stale: removed sources, old splits, duplicates
+    expected = {
+        "images": set(selected),
+        "labels": {f"{Path(name).stem}.txt" for name in selected},
+    }
+    removed = 0
+    for split in (None, *OUTPUT_SPLITS):
+        for kind in ("images", "labels"):
+            folder = output / kind if split is None else output / split / kind
+            wanted = expected[kind] if split is None else {
+                (name if kind == "images" else f"{Path(name).stem}.txt")
+                for name, record in selected.items() if record["split"] == split
+            }
+            for path in folder.iterdir():
+                if path.name not in wanted:
+                    path.unlink()
+                    removed += 1
+
+    if written or removed:
+        # Ultralytics would rebuild these anyway; drop them so nothing stale lingers
+        for cache in (output / "labels.cache", *(output / split / "labels.cache" for split in OUTPUT_SPLITS)):
+            cache.unlink(missing_ok=True)
+    return {"written": written, "removed": removed}
+
+
+def write_data_yaml(output: Path, names: List[str]):
+    data = {
+        "path": ".",  # relative to this file; see dataset_config.resolve_dataset_config
+        "train": "train/images",
+        "val": "val/images",
+        "nc": len(names),
+        "names": dict(enumerate(names)),
+    }
+    with open(output / "data.yaml", "w") as f:
+        f.write("# Generated by backend/merge_datasets.py from merge_config.yaml\n")
+        yaml.safe_dump(data, f, sort_keys=False)
+
+
+def merge(config_path: Path, workers: Optional[int] = None, force: bool = False) -> Dict:
+    config = load_config(config_path)
+    root = config_path.resolve().parent
+    output = root / config["output"]
+    names = config["names"]
+
+    manifest_path = output / MANIFEST_NAME
+    manifest = {}
+    if manifest_path.exists() and not force:
+        manifest = json.loads(manifest_path.read_text())
+        if manifest.get("version") != MANIFEST_VERSION:
+            manifest = {}
+    previous_sources = manifest.get("sources", {})
+
+    records: Dict[str, List[Dict]] = {}
+    sources_state = {}
+    tasks = []
+    for source, entry in config["sources"].items():
+        source_dir = root / entry["path"]
+        files = list_source_files(source_dir)
+        fingerprint = source_fingerprint(entry, names, files)
+        cached = previous_sources.get(source)
+        if cached and cached["fingerprint"] == fingerprint:
+            print(f"✅ {source}: unchanged ({len(cached['records'])} images)")
+            records[source] = cached["records"]
+        else:
+            print(f"🔄 {source}: processing {len(files)} images")
+            class_map = source_class_map(source_dir, entry.get("classes", {}), names)
+            tasks.extend((source, split, str(image), str(label), class_map) for split, image, label in files)
+            records[source] = []
+        sources_state[source] = fingerprint
+
+    if tasks:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for record in pool.map(process_image, tasks, chunksize=32):
+                records[record["source"]].append(record)
+
+    selected, stats = select_outputs(config, records)
+    changes = write_outputs(output, selected, manifest.get("outputs", {}))
+    write_data_yaml(output, names)
+
+    splits = {split: sum(1 for r in selected.values() if r["split"] == split) for split in OUTPUT_SPLITS}
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "sources": {
+            source: {"fingerprint": sources_state[source], "records": records[source]}
+            for source in config["sources"]
+        },
+        "outputs": {
+            name: {"sha": r["sha"], "label": label_digest(r["label"]), "split": r["split"]}
+            for name, r in selected.items()
+        },
+    }
+    manifest_path.write_text(json.dumps(manifest))
+    return {**stats, **changes, **splits, "output": str(output)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Merge the per-source datasets into merged_food_dataset")
+    parser.add_argument("--config", default=str(DEFAULT_CONFIG))
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--force", action="store_true", help="Ignore the manifest and reprocess every source")
+    args = parser.parse_args()
+
+    summary = merge(Path(args.config), workers=args.workers, force=args.force)
+    print("📊 Merge summary:")
+    print(f"   - Source images: {summary['images']}")
+    print(f"   - Duplicates skipped: {summary['duplicates']}")
+    print(f"   - Empty after remap: {summary['empty']}")
+    print(f"   - Boxes dropped by remap: {summary['dropped_boxes']}")
+    print(f"   - Train/val: {summary['train']}/{summary['val']}")
+    print(f"   - Files written/removed: {summary['written']}/{summary['removed']}")
+    print(f"✅ Merged dataset: {summary['output']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Prometheus metrics for the detection and recipe pipelines.
+
+Every metric child is bound once at import time, so recording a value on the
+request path is a dict lookup plus a lock-protected add. If prometheus_client
+is not installed the recorders are no-ops and /metrics says so.
+"""
+
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict
+
+# Try to import prometheus_client, but don't fail if it's not available
+try:
+    from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+    METRICS_AVAILABLE = True
+except ImportError:
+    METRICS_AVAILABLE = False
+    print("⚠️ prometheus_client not available - /metrics will be disabled")
+
+DETECT_STAGES = ("upload_read", "quality", "decode", "preprocess", "inference", "postprocess", "serialization")
+
+# 1ms .. 10s, tuned for CPU YOLO stages
+STAGE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LLM_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+TOKEN_RATE_BUCKETS = (1, 2, 5, 10, 15, 20, 30, 40, 60, 80, 120)
+PROMPT_TOKEN_BUCKETS = (128, 256, 384, 512, 640, 768, 1024, 1536, 2048, 4096)
+
+
+class _NoopMetric:
+    """Stand-in used when prometheus_client is missing."""
+
+    def labels(self, *args, **kwargs):
+        return self
+
+    def observe(self, value):
+        pass
+
+    def inc(self, amount=1):
+        pass
+
+    def set_function(self, fn):
+        pass
+
+
+if METRICS_AVAILABLE:
+    DETECT_STAGE_SECONDS = Histogram(
+        "detect_stage_seconds", "Time spent in each /api/detect stage", ["stage"], buckets=STAGE_BUCKETS
+    )
+    DETECT_REQUESTS = Counter("detect_requests_total", "Detection requests by outcome", ["outcome"])
+    IMAGE_REJECTIONS = Counter(
+        "image_rejections_total", "Uploads rejected by the quality gate before YOLO", ["reason"]
+    )
+    QUEUE_DEPTH = Gauge("queue_depth", "Requests waiting or running per queue", ["queue"])
+    CACHE_REQUESTS = Counter("cache_requests_total", "Cache lookups by cache and result", ["cache", "result"])
+    LLM_PHASE_SECONDS = Histogram(
+        "llm_phase_seconds", "LLM prefill (prompt eval) and decode time", ["phase"], buckets=LLM_BUCKETS
+    )
+    LLM_TOKENS = Counter("llm_tokens_total", "Prompt and completion tokens processed", ["kind"])
+    LLM_TOKENS_PER_SECOND = Histogram(
+        "llm_decode_tokens_per_second", "LLM decode throughput", buckets=TOKEN_RATE_BUCKETS
+    )
+    LLM_PROMPT_TOKENS = Histogram(
+        "llm_prompt_tokens", "Prompt tokens per LLM request by exemplar source", ["exemplar"],
+        buckets=PROMPT_TOKEN_BUCKETS
+    )
+else:
+    DETECT_STAGE_SECONDS = DETECT_REQUESTS = IMAGE_REJECTIONS = QUEUE_DEPTH = CACHE_REQUESTS = _NoopMetric()
+    LLM_PHASE_SECONDS = LLM_TOKENS = LLM_TOKENS_PER_SECOND = LLM_PROMPT_TOKENS = _NoopMetric()
+
+_STAGE_CHILDREN = {stage: DETECT_STAGE_SECONDS.labels(stage=stage) for stage in DETECT_STAGES}
+
+
+@contextmanager
+def stage_timer(stage: str):
+    """Time a block of /api/detect into the stage histogram."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _STAGE_CHILDREN[stage].observe(time.perf_counter() - start)
+
+
+def observe_inference_speed(speed: Dict[str, float], extra_postprocess: float = 0.0):
+    """
+    Record the preprocess/inference/postprocess split Ultralytics already
+    measures (ms); `extra_postprocess` adds our own ingredient mapping (s).
+    """
+    _STAGE_CHILDREN["preprocess"].observe((speed.get("preprocess") or 0.0) / 1000.0)
+    _STAGE_CHILDREN["inference"].observe((speed.get("inference") or 0.0) / 1000.0)
+    _STAGE_CHILDREN["postprocess"].observe((speed.get("postprocess") or 0.0) / 1000.0 + extra_postprocess)
+
+
+def record_detection(outcome: str):
+    DETECT_REQUESTS.labels(outcome=outcome).inc()
+
+
+def record_rejection(reason: str):
+    """A quality-gate rejection; also counted as a `rejected` detection."""
+    IMAGE_REJECTIONS.labels(reason=reason).inc()
+    DETECT_REQUESTS.labels(outcome="rejected").inc()
+
+
+def record_cache(cache: str, hit: bool):
+    CACHE_REQUESTS.labels(cache=cache, result="hit" if hit else "miss").inc()
+
+
+def track_queue_depth(queue: str, depth: Callable[[], float]):
+    """Report a queue's depth lazily at scrape time."""
+    QUEUE_DEPTH.labels(queue=queue).set_function(depth)
+
+
+def observe_llm_response(response, exemplar: str = "none") -> Dict[str, float]:
+    """Record Ollama's timing fields (nanoseconds) and return a summary."""
+    prompt_tokens = response.get("prompt_eval_count") or 0
+    completion_tokens = response.get("eval_count") or 0
+    prefill_seconds = (response.get("prompt_eval_duration") or 0) / 1e9
+    decode_seconds = (response.get("eval_duration") or 0) / 1e9
+    tokens_per_second = completion_tokens / decode_seconds if decode_seconds > 0 else 0.0
+
+    LLM_PHASE_SECONDS.labels(phase="prefill").observe(prefill_seconds)
+    LLM_PHASE_SECONDS.labels(phase="decode").observe(decode_seconds)
+    LLM_TOKENS.labels(kind="prompt").inc(prompt_tokens)
+    LLM_TOKENS.labels(kind="completion").inc(completion_tokens)
+    if prompt_tokens:
+        LLM_PROMPT_TOKENS.labels(exemplar=exemplar).observe(prompt_tokens)
+    if tokens_per_second:
+        LLM_TOKENS_PER_SECOND.observe(tokens_per_second)
+
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "prefill_seconds": prefill_seconds,
+        "decode_seconds": decode_seconds,
+        "tokens_per_second": tokens_per_second,
+    }
+
+
+def render_metrics():
+    """Body and content type for the /metrics endpoint."""
+    if not METRICS_AVAILABLE:
+        return b"# prometheus_client not installed\n", "text/plain; charset=utf-8"
+    return generate_latest(), CONTENT_TYPE_LATEST
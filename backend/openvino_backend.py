@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+OpenVINO inference backend for the detection service on Intel CPUs.
+
+The fine-tuned weights are exported to OpenVINO IR once; the service compiles
+the IR with the THROUGHPUT hint (several CPU streams) and submits requests
+through an AsyncInferQueue, so concurrent /api/detect calls run in parallel
+instead of queueing behind one torch call. Letterboxing happens on the
+request side; u8 -> f32, BGR -> RGB and the 1/255 scale are folded into the
+compiled graph. NMS matches Ultralytics' single-label predict path and only
+class ids and confidences are returned, which is all the service uses.
+
+Enable with DETECTION_BACKEND=openvino (OPENVINO_MODEL, OPENVINO_STREAMS).
+
+Export the IR from the served weights:
+    python openvino_backend.py --model best.pt --imgsz 640
+"""
+
+import argparse
+import asyncio
+import os
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple, Union
+
+import numpy as np
+
+try:
+    import openvino as ov
+    OPENVINO_AVAILABLE = True
+except ImportError:
+    OPENVINO_AVAILABLE = False
+
+DEFAULT_MODEL_DIR = os.path.join(os.path.dirname(__file__), "best_openvino_model")
+
+
+def letterbox(image: np.ndarray, imgsz: int) -> Tuple[np.ndarray, float]:
+    """Resize the long side to imgsz and pad to a square with 114, like Ultralytics."""
+    import cv2
+
+    h, w = image.shape[:2]
+    r = min(imgsz / h, imgsz / w)
+    new_w, new_h = round(w * r), round(h * r)
+    if (new_w, new_h) != (w, h):
+        image = cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    top, left = (imgsz - new_h) // 2, (imgsz - new_w) // 2
+    canvas = np.full((imgsz, imgsz, 3), 114, dtype=np.uint8)
+    canvas[top:top + new_h, left:left + new_w] = image
+    return canvas, r
+
+
+def postprocess(output: np.ndarray, conf: float, iou: float = 0.7, max_det: int = 300) -> Tuple[np.ndarray, np.ndarray]:
+    """Single-label NMS on a raw (4 + nc, anchors) output; returns (class ids, confidences)."""
+    import torch
+    from torchvision.ops import batched_nms
+
+    scores = output[4:].T
+    class_ids = scores.argmax(1)
+    confidences = scores[np.arange(len(scores)), class_ids]
+    keep = confidences > conf
+    if not keep.any():
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+    xywh, class_ids, confidences = output[:4, keep].T, class_ids[keep], confidences[keep]
+    boxes = np.concatenate([xywh[:, :2] - xywh[:, 2:] / 2, xywh[:, :2] + xywh[:, 2:] / 2], axis=1)
+    kept = batched_nms(torch.from_numpy(boxes), torch.from_numpy(confidences),
+                       torch.from_numpy(class_ids), iou).numpy()[:max_det]
+    return class_ids[kept].astype(np.int64), confidences[kept].astype(np.float32)
+
+
+def _read_names(model_dir: Path) -> Dict[int, str]:
+    import yaml
+
+    metadata = model_dir / "metadata.yaml"
+    if not metadata.exists():
+        return {}
+    with open(metadata, "r") as f:
+        names = yaml.safe_load(f).get("names", {})
+    return {int(k): v for k, v in names.items()} if isinstance(names, dict) else dict(enumerate(names))
+
+
+class OpenVINODetector:
+    """Compiled IR plus an AsyncInferQueue; `detect` is awaitable and safe to call concurrently."""
+
+    def __init__(self, model_dir: str, streams: Union[int, str] = "AUTO", names: Optional[Dict[int, str]] = None,
+                 threads: Optional[int] = None):
+        if not OPENVINO_AVAILABLE:
+            raise RuntimeError("openvino is not installed")
+        model_dir = Path(model_dir)
+        xml = model_dir if model_dir.suffix == ".xml" else next(model_dir.glob("*.xml"))
+
+        core = ov.Core()
+        model = core.read_model(xml)
+        shape = model.input(0).get_partial_shape()
+        if shape.is_dynamic:
+            raise ValueError(f"{xml.name} has a dynamic input; export it with a fixed imgsz")
+        self.imgsz = int(shape[2].get_length())
+
+        # Fold input conversion into the graph: u8 NHWC BGR in, f32 NCHW RGB / 255 to the model
+        ppp = ov.preprocess.PrePostProcessor(model)
+        ppp.input().tensor().set_element_type(ov.Type.u8).set_layout(ov.Layout("NHWC")) \
+            .set_color_format(ov.preprocess.ColorFormat.BGR)
+        ppp.input().preprocess().convert_element_type(ov.Type.f32) \
+            .convert_color(ov.preprocess.ColorFormat.RGB).scale(255.0)
+        ppp.input().model().set_layout(ov.Layout("NCHW"))
+        model = ppp.build()
+
+        config = {"PERFORMANCE_HINT": "THROUGHPUT"}
+        if str(streams).upper() != "AUTO":
+            config["NUM_STREAMS"] = str(int(streams))
+        if threads:
+            config["INFERENCE_NUM_THREADS"] = str(threads)  # streams share this budget
+        self.compiled = core.compile_model(model, "CPU", config)
+        self.streams = int(self.compiled.get_property("NUM_STREAMS"))
+        self.infer_queue = ov.AsyncInferQueue(self.compiled)  # optimal number of requests
+        self.num_requests = len(self.infer_queue)
+        self.infer_queue.set_callback(self._on_done)
+        self.names = names or _read_names(xml.parent)
+        postprocess(np.zeros((4 + max(len(self.names), 1), 1), dtype=np.float32), 1.0)  # import NMS before serving
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    def _on_done(self, request, userdata):
+        # Runs on an OpenVINO thread; hand the result back to the event loop
+        loop, future, conf, submitted = userdata
+        try:
+            inference_ms = (time.perf_counter() - submitted) * 1000.0
+            started = time.perf_counter()
+            output = request.get_output_tensor(0).data[0].copy()
+            class_ids, confidences = postprocess(output, conf)
+            result = (class_ids, confidences, inference_ms, (time.perf_counter() - started) * 1000.0)
+            loop.call_soon_threadsafe(_resolve, future, result, None)
+        except Exception as e:
+            loop.call_soon_threadsafe(_resolve, future, None, e)
+
+    async def detect(self, image, conf: float = 0.1) -> Tuple[np.ndarray, np.ndarray, Dict[str, float]]:
+        """(class ids, confidences, speed ms) for a PIL image or BGR array."""
+        loop = asyncio.get_running_loop()
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.num_requests)
+
+        started = time.perf_counter()
+        if not isinstance(image, np.ndarray):
+            image = np.asarray(image.convert("RGB"))[:, :, ::-1]
+        batch = (await loop.run_in_executor(None, letterbox, image, self.imgsz))[0][None]
+        preprocess_ms = (time.perf_counter() - started) * 1000.0
+
+        # Never let start_async block the loop waiting for a free request
+        async with self._slots:
+            future = loop.create_future()
+            self.infer_queue.start_async({0: batch}, (loop, future, conf, time.perf_counter()))
+            class_ids, confidences, inference_ms, postprocess_ms = await future
+        speed = {"preprocess": preprocess_ms, "inference": inference_ms, "postprocess": postprocess_ms}
+        return class_ids, confidences, speed
+
+
+def _resolve(future: asyncio.Future, result, error: Optional[Exception]):
+    if future.cancelled():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+
+
+def load_detector_from_env(names: Optional[Dict[int, str]] = None,
+                           threads: Optional[int] = None) -> Optional[OpenVINODetector]:
+    """Build the OpenVINO detector if DETECTION_BACKEND=openvino and the IR exists."""
+    if os.getenv("DETECTION_BACKEND", "torch").lower() != "openvino":
+        return None
+    if not OPENVINO_AVAILABLE:
+        print("⚠️ DETECTION_BACKEND=openvino but openvino is not installed, using torch")
+        return None
+
+    model_dir = os.getenv("OPENVINO_MODEL", DEFAULT_MODEL_DIR)
+    if not os.path.exists(model_dir):
+        print(f"⚠️ OpenVINO model not found: {model_dir} (export it with openvino_backend.py), using torch")
+        return None
+
+    try:
+        detector = OpenVINODetector(model_dir, streams=os.getenv("OPENVINO_STREAMS", "AUTO"), names=names,
+                                    threads=threads)
+    except Exception as e:
+        print(f"❌ Failed to load OpenVINO model: {e}")
+        return None
+
+    print(f"✅ OpenVINO backend: {detector.streams} stream(s), {detector.num_requests} infer request(s), "
+          f"imgsz {detector.imgsz}")
+    return detector
+
+
+def export_ir(model_path: str, imgsz: int = 640) -> str:
+    """Export the fine-tuned .pt to a fixed-shape OpenVINO IR folder."""
+    from ultralytics import YOLO
+
+    return str(YOLO(model_path).export(format="openvino", imgsz=imgsz, dynamic=False, half=False, device="cpu"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the detector to OpenVINO IR for the service")
+    parser.add_argument("--model", default="best.pt")
+    parser.add_argument("--imgsz", type=int, default=640)
+    args = parser.parse_args()
+
+    if not Path(args.model).exists():
+        print(f"❌ Model not found: {args.model}")
+        return
+    if not OPENVINO_AVAILABLE:
+        print("❌ openvino is not installed (pip install openvino)")
+        return
+
+    print(f"🔄 Exporting {args.model} to OpenVINO IR at imgsz={args.imgsz}...")
+    print(f"✅ OpenVINO model saved to: {export_ir(args.model, args.imgsz)}")
+
+
+if __name__ == "__main__":
+    main()
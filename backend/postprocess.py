@@ -0,0 +1,58 @@
+"""
+Vectorized post-processing of YOLO detections into ingredient lists.
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+def result_arrays(result) -> Tuple[np.ndarray, np.ndarray]:
+    """Pull class ids and confidences out of an Ultralytics result in one transfer."""
+    boxes = result.boxes
+    if boxes is None or boxes.cls is None or boxes.conf is None or len(boxes) == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+    return boxes.cls.cpu().numpy().astype(np.int64), boxes.conf.cpu().numpy().astype(np.float32)
+
+
+def extract_ingredients(
+    class_ids: np.ndarray,
+    confidences: np.ndarray,
+    names: Dict[int, str],
+    mapping: Dict[str, str],
+    thresholds: Optional[np.ndarray] = None,
+) -> Tuple[List[str], List[float]]:
+    """
+    Map detections to ingredient names, keeping the highest confidence per
+    ingredient, ordered by confidence. `thresholds` holds a per-class cutoff
+    indexed by class id (see class_thresholds.py).
+    """
+    if thresholds is not None and len(class_ids):
+        known = class_ids < len(thresholds)
+        cutoffs = thresholds[np.where(known, class_ids, 0)]
+        passed = ~known | (confidences >= cutoffs)
+        class_ids, confidences = class_ids[passed], confidences[passed]
+
+    if len(class_ids) == 0:
+        return [], []
+
+    # Highest confidence first, then the first occurrence of each class wins
+    order = np.argsort(-confidences, kind="stable")
+    _, first = np.unique(class_ids[order], return_index=True)
+    keep = order[np.sort(first)]
+
+    ingredients = []
+    scores = []
+    for class_id, confidence in zip(class_ids[keep].tolist(), confidences[keep].tolist()):
+        food_name = _food_name(names, mapping, class_id)
+        if food_name is not None and food_name not in ingredients:
+            ingredients.append(food_name)
+            scores.append(round(confidence, 2))
+    return ingredients, scores
+
+
+def _food_name(names: Dict[int, str], mapping: Dict[str, str], class_id: int) -> Optional[str]:
+    class_name = names.get(class_id)
+    if class_name is None:
+        return None
+    return mapping.get(class_name.lower())
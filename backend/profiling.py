@@ -0,0 +1,373 @@
+"""
+Opt-in request profiling for the detection endpoints.
+
+An admin arms the profiler for the next N requests (optionally only those
+carrying a given header). Armed requests are captured with one of:
+- cprofile: deterministic cProfile, exported as speedscope JSON (+ .pstats)
+- sampling: a low-overhead stack sampler, exported as speedscope JSON
+- torch:    torch.profiler around the model call, exported as Chrome trace JSON
+
+One request is captured at a time: cProfile and the sampler hook the event-loop
+thread, so an armed request arriving while another is being captured runs
+unprofiled and the armed count waits for the next one.
+
+The admin surface is disabled unless ADMIN_TOKEN is set; requests must send it
+in the X-Admin-Token header. Profiles are written to PROFILE_DIR.
+"""
+
+import contextvars
+import cProfile
+import hmac
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Request
+from fastapi.responses import FileResponse
+from pydantic import BaseModel, Field
+
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(os.path.dirname(__file__), "profiles"))
+PROFILED_PATHS = ("/api/detect",)
+PROFILE_MODES = ("cprofile", "sampling", "torch")
+SAMPLE_INTERVAL = 0.002  # Seconds between stack samples
+MAX_STACK_DEPTH = 128
+
+_current_session: contextvars.ContextVar = contextvars.ContextVar("profile_session", default=None)
+
+
+class ArmRequest(BaseModel):
+    mode: str = "cprofile"
+    count: int = Field(default=1, ge=1, le=100)
+    header_name: Optional[str] = None   # Only profile requests carrying this header...
+    header_value: Optional[str] = None  # ...optionally with this exact value
+
+
+class StackSampler:
+    """Samples the Python stacks of registered threads from a background thread."""
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._threads = set()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def add_thread(self, thread_id: int):
+        self._threads.add(thread_id)
+
+    def remove_thread(self, thread_id: int):
+        self._threads.discard(thread_id)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            for thread_id in list(self._threads):
+                frame = frames.get(thread_id)
+                if frame is None:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                    code = frame.f_code
+                    stack.append((code.co_name, code.co_filename, code.co_firstlineno))
+                    frame = frame.f_back
+                self.stacks[tuple(reversed(stack))] += 1
+                self.samples += 1
+
+
+class ProfileSession:
+    """One captured request; collects the event-loop part and the model call."""
+
+    def __init__(self, mode: str, label: str):
+        self.mode = mode
+        self.label = label
+        self.started = time.time()
+        self._profiles: List[cProfile.Profile] = []
+        self._sampler = StackSampler() if mode == "sampling" else None
+        self._torch_trace: Optional[str] = None
+
+    def start(self):
+        if self.mode == "cprofile":
+            self._enable_cprofile()
+        elif self._sampler is not None:
+            self._sampler.add_thread(threading.get_ident())
+            self._sampler.start()
+
+    def _enable_cprofile(self) -> Optional[cProfile.Profile]:
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Python 3.12+ profiles every thread from the first enable()
+            return None
+        self._profiles.append(profile)
+        return profile
+
+    def call_model(self, fn, *args, **kwargs):
+        """Run the model call (in a worker thread) under this session."""
+        if self.mode == "cprofile":
+            profile = self._enable_cprofile()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                if profile is not None:
+                    profile.disable()
+
+        if self.mode == "sampling":
+            thread_id = threading.get_ident()
+            self._sampler.add_thread(thread_id)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self._sampler.remove_thread(thread_id)
+
+        from torch.profiler import ProfilerActivity, profile
+
+        with profile(activities=[ProfilerActivity.CPU], record_shapes=True) as prof:
+            result = fn(*args, **kwargs)
+        self._torch_trace = os.path.join(PROFILE_DIR, f"{self._basename()}.trace.json")
+        prof.export_chrome_trace(self._torch_trace)
+        return result
+
+    def finish(self) -> List[str]:
+        """Stop capturing and write the profile files; returns their names."""
+        if self.mode == "cprofile":
+            if not self._profiles:
+                return []  # Python 3.12+: another profiler already held the hook
+            self._profiles[0].disable()
+            stats = pstats.Stats(self._profiles[0])
+            for profile in self._profiles[1:]:
+                stats.add(profile)
+            base = os.path.join(PROFILE_DIR, self._basename())
+            stats.dump_stats(f"{base}.pstats")
+            _write_json(f"{base}.speedscope.json", pstats_to_speedscope(stats, self._basename()))
+            return [f"{self._basename()}.speedscope.json", f"{self._basename()}.pstats"]
+
+        if self.mode == "sampling":
+            self._sampler.stop()
+            path = os.path.join(PROFILE_DIR, f"{self._basename()}.speedscope.json")
+            _write_json(path, samples_to_speedscope(self._sampler.stacks, self._sampler.interval, self._basename()))
+            return [os.path.basename(path)]
+
+        return [os.path.basename(self._torch_trace)] if self._torch_trace else []
+
+    def _basename(self) -> str:
+        stamp = datetime.fromtimestamp(self.started).strftime("%Y%m%d-%H%M%S-%f")
+        return f"{stamp}_{self.mode}_{self.label}"
+
+
+class Profiler:
+    """Holds the armed state; thread-safe since model calls run in a threadpool."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._armed: Optional[ArmRequest] = None
+        self._remaining = 0
+        self._active = False  # A session is capturing right now
+
+    def arm(self, request: ArmRequest):
+        with self._lock:
+            self._armed = request
+            self._remaining = request.count
+
+    def disarm(self):
+        with self._lock:
+            self._armed = None
+            self._remaining = 0
+
+    def state(self) -> Dict:
+        with self._lock:
+            return {
+                "armed": self._armed.model_dump() if self._armed else None,
+                "remaining": self._remaining,
+                "active": self._active,
+            }
+
+    def claim(self, headers) -> Optional[str]:
+        """Return the capture mode if this request should be profiled; release() when done."""
+        with self._lock:
+            armed = self._armed
+            if armed is None or self._remaining <= 0 or self._active:
+                return None
+            if armed.header_name:
+                value = headers.get(armed.header_name)
+                if value is None or (armed.header_value is not None and value != armed.header_value):
+                    return None
+            self._remaining -= 1
+            if self._remaining == 0:
+                self._armed = None
+            self._active = True
+            return armed.mode
+
+    def release(self):
+        with self._lock:
+            self._active = False
+
+
+profiler = Profiler()
+
+
+def profile_model_call(fn, *args, **kwargs):
+    """Call the model, under the current request's profile session if there is one."""
+    session = _current_session.get()
+    if session is None:
+        return fn(*args, **kwargs)
+    return session.call_model(fn, *args, **kwargs)
+
+
+async def profiling_middleware(request: Request, call_next):
+    """Starts a session for armed requests on the profiled paths."""
+    if request.url.path not in PROFILED_PATHS:
+        return await call_next(request)
+
+    mode = profiler.claim(request.headers)
+    if mode is None:
+        return await call_next(request)
+
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    session = ProfileSession(mode, request.url.path.strip("/").replace("/", "-"))
+    token = _current_session.set(session)
+    # The event-loop part is captured on the loop thread, so concurrent
+    # requests interleaved with this one may show up in the profile too.
+    session.start()
+    try:
+        response = await call_next(request)
+    finally:
+        try:
+            files = session.finish()
+        finally:
+            _current_session.reset(token)
+            profiler.release()
+        print(f"🧪 Captured {mode} profile for {request.url.path}: {files}")
+    return response
+
+
+def pstats_to_speedscope(stats: pstats.Stats, name: str) -> Dict:
+    """
+    Approximate a flame graph from cProfile: each function's self time is
+    attributed to its most expensive caller chain.
+    """
+    entries = stats.stats
+    frames: List[Dict] = []
+    frame_index: Dict = {}
+
+    def index_of(func) -> int:
+        if func not in frame_index:
+            filename, line, function = func
+            frame_index[func] = len(frames)
+            frames.append({"name": function, "file": filename, "line": line})
+        return frame_index[func]
+
+    samples, weights = [], []
+    for func, (_, _, tottime, _, callers) in entries.items():
+        if tottime <= 0:
+            continue
+        chain = [func]
+        seen = {func}
+        while callers and len(chain) < MAX_STACK_DEPTH:
+            caller = max(callers, key=lambda c: entries.get(c, (0, 0, 0, 0))[3])
+            if caller in seen:
+                break
+            chain.append(caller)
+            seen.add(caller)
+            callers = entries.get(caller, (0, 0, 0, 0, {}))[4]
+        samples.append([index_of(f) for f in reversed(chain)])
+        weights.append(tottime)
+
+    return _speedscope_document(name, frames, samples, weights)
+
+
+def samples_to_speedscope(stacks: Counter, interval: float, name: str) -> Dict:
+    frames: List[Dict] = []
+    frame_index: Dict = {}
+    samples, weights = [], []
+
+    for stack, count in stacks.items():
+        indices = []
+        for function, filename, line in stack:
+            key = (function, filename, line)
+            if key not in frame_index:
+                frame_index[key] = len(frames)
+                frames.append({"name": function, "file": filename, "line": line})
+            indices.append(frame_index[key])
+        samples.append(indices)
+        weights.append(count * interval)
+
+    return _speedscope_document(name, frames, samples, weights)
+
+
+def _speedscope_document(name: str, frames: List[Dict], samples: List[List[int]], weights: List[float]) -> Dict:
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "name": name,
+        "exporter": "kitchen-assistant-profiler",
+        "shared": {"frames": frames},
+        "profiles": [{
+            "type": "sampled",
+            "name": name,
+            "unit": "seconds",
+            "startValue": 0,
+            "endValue": sum(weights),
+            "samples": samples,
+            "weights": weights,
+        }],
+    }
+
+
+def _write_json(path: str, document: Dict):
+    with open(path, "w") as f:
+        json.dump(document, f)
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    expected = os.getenv("ADMIN_TOKEN")
+    if not expected:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if x_admin_token is None or not hmac.compare_digest(x_admin_token, expected):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+router = APIRouter(prefix="/admin/profiling", dependencies=[Depends(require_admin)])
+
+
+@router.get("")
+async def profiling_status():
+    profiles = sorted(os.listdir(PROFILE_DIR)) if os.path.isdir(PROFILE_DIR) else []
+    return {**profiler.state(), "profiles": profiles}
+
+
+@router.post("/arm")
+async def arm_profiler(request: ArmRequest):
+    if request.mode not in PROFILE_MODES:
+        raise HTTPException(status_code=400, detail=f"mode must be one of {list(PROFILE_MODES)}")
+    profiler.arm(request)
+    print(f"🧪 Profiler armed: {request.mode} for {request.count} request(s)")
+    return profiler.state()
+
+
+@router.delete("/arm")
+async def disarm_profiler():
+    profiler.disarm()
+    return profiler.state()
+
+
+@router.get("/profiles/{name}")
+async def download_profile(name: str):
+    available = os.listdir(PROFILE_DIR) if os.path.isdir(PROFILE_DIR) else []
+    if name not in available:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    media_type = "application/octet-stream" if name.endswith(".pstats") else "application/json"
+    return FileResponse(os.path.join(PROFILE_DIR, name), media_type=media_type, filename=name)
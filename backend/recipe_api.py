@@ -0,0 +1,504 @@
+"""
+Recipe endpoints for the full profile: /api/recipes, /api/recipes/variants and
+the /api/recipes/jobs queue, backed by Qwen2.5:3b through Ollama with the
+stored-recipe index in front and mock recipes as the fallback.
+
+Only app_factory's `full` profile imports this module, so the detection-only
+image never loads ollama or the recipe stack.
+"""
+
+import asyncio
+import json
+import os
+import random
+import time
+from typing import List, Optional, Tuple
+
+from fastapi import APIRouter, HTTPException, Response
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter, ValidationError, field_validator
+from starlette.concurrency import run_in_threadpool
+
+from ingredients import canonicalize_all
+from metrics import observe_llm_response, record_cache, track_queue_depth
+from recipe_index import load_index_from_env
+from recipe_jobs import load_job_queue_from_env
+from recipe_prompts import select_exemplar
+
+# Try to import ollama, but don't fail if it's not available (for CI/testing)
+try:
+    import ollama
+    OLLAMA_AVAILABLE = True
+except ImportError:
+    OLLAMA_AVAILABLE = False
+    print("⚠️ Ollama not available - recipe generation will be disabled")
+
+router = APIRouter()
+
+class RecipeRequest(BaseModel):
+    ingredients: List[str]
+    mealCraving: str  # Changed to camelCase to match iOS
+    dietaryRestrictions: List[str] = []  # Changed to camelCase
+    preferredCuisine: str = "Any"  # Changed to camelCase
+
+    # "cherry tomatoes", "Tomato" and "tomatoe" all become "Tomato" (see ingredients.py)
+    @field_validator("ingredients")
+    @classmethod
+    def canonical_ingredients(cls, ingredients: List[str]) -> List[str]:
+        return canonicalize_all(ingredients)
+    
+    # Alias for backward compatibility
+    model_config = ConfigDict(
+        populate_by_name=True,
+        json_schema_extra={
+            "example": {
+                "ingredients": ["tomato", "cheese", "basil"],
+                "mealCraving": "pasta",
+                "dietaryRestrictions": [],
+                "preferredCuisine": "Italian"
+            }
+        }
+    )
+
+MAX_RECIPE_VARIANTS = 5
+
+class RecipeVariantsRequest(RecipeRequest):
+    count: int = Field(3, ge=2, le=MAX_RECIPE_VARIANTS)  # Variants generated in one LLM call
+
+class Ingredient(BaseModel):
+    name: str
+    amount: str
+    unit: Optional[str] = None
+    notes: Optional[str] = None
+
+class Instruction(BaseModel):
+    step: int
+    text: str
+    time: Optional[int] = None
+    temperature: Optional[str] = None
+    tips: Optional[str] = None
+
+class NutritionInfo(BaseModel):
+    calories: Optional[int] = None
+    protein: Optional[str] = None
+    carbs: Optional[str] = None
+    fat: Optional[str] = None
+    fiber: Optional[str] = None
+    sugar: Optional[str] = None
+    sodium: Optional[str] = None
+
+class Recipe(BaseModel):
+    title: str
+    description: str
+    prep_time: int
+    cook_time: int
+    servings: int
+    difficulty: str
+    ingredients: List[Ingredient]
+    instructions: List[Instruction]
+    tags: List[str]
+    nutrition_info: Optional[NutritionInfo] = None
+
+class LLMRecipe(Recipe):
+    """Recipe as parsed from LLM output: fields the model left out get defaults."""
+    title: str = "Generated Recipe"
+    description: str = ""
+    prep_time: int = 15
+    cook_time: int = 30
+    servings: int = 4
+    difficulty: str = "Medium"
+    ingredients: List[Ingredient] = []
+    instructions: List[Instruction] = []
+    tags: List[str] = []
+
+    @field_validator("nutrition_info", mode="before")
+    @classmethod
+    def empty_nutrition(cls, nutrition_info):
+        return nutrition_info or None
+
+# Built once, so validating LLM text and serializing responses skips per-call schema setup
+LLM_RECIPE_LIST = TypeAdapter(List[LLMRecipe])
+RECIPE_LIST = TypeAdapter(List[Recipe])
+
+def json_response(body, headers: Optional[dict] = None) -> Response:
+    """Serialized, already-validated models; FastAPI does not re-validate a returned Response."""
+    return Response(content=body, media_type="application/json", headers=headers)
+
+def _ollama_embed(text: str) -> List[float]:
+    return ollama.embeddings(model=os.environ["RECIPE_EMBED_MODEL"], prompt=text)["embedding"]
+
+# Validated LLM recipes, served again for matching requests (see recipe_index.py)
+recipe_index = load_index_from_env(
+    _ollama_embed if OLLAMA_AVAILABLE and os.getenv("RECIPE_EMBED_MODEL") else None
+)
+
+def _indexed_recipe(request: RecipeRequest) -> Optional[Recipe]:
+    """A stored recipe that matches the request well enough to skip the LLM; blocking, may embed."""
+    if recipe_index is None:
+        return None
+    match = recipe_index.lookup(request.model_dump())
+    record_cache("recipe_index", match is not None)
+    if match is None:
+        return None
+    print(f"📚 Serving stored recipe '{match.recipe['title']}' (score {match.score:.2f})")
+    return Recipe.model_validate(match.recipe)
+
+def build_recipe_prompt(request: RecipeRequest, exemplar: str, exemplar_title: str, count: int = 1) -> str:
+    """Recipe prompt for one recipe, or a JSON array of `count` distinct variants."""
+    ingredients_str = ", ".join(request.ingredients)
+    dietary_str = ", ".join(request.dietaryRestrictions) if request.dietaryRestrictions else "None"
+    if count == 1:
+        task, target, answer = "Create a detailed recipe for", "RECIPE", "JSON response"
+        output_rules = "- Return ONLY valid JSON, no extra text"
+    else:
+        task, target, answer = f"Create {count} DIFFERENT detailed recipes for", f"{count} RECIPES", "JSON array response"
+        output_rules = (f"- Make each recipe distinct: different title, technique and flavor\n"
+                        f"- Return ONLY a JSON array of {count} recipe objects in the example's format, no extra text")
+
+    return f"""You are a professional chef AI. {task} "{request.mealCraving}" using these ingredients: {ingredients_str}
+
+CRITICAL RULES - FOLLOW STRICTLY:
+
+1. INGREDIENT UNITS (use CORRECT units for each ingredient type):
+   - Cheese: "cup", "oz", "g" (NEVER "clove" - that's for garlic!)
+   - Garlic: "clove", "tsp", "tbsp"
+   - Vegetables: "cup", "whole", "pieces"
+   - Liquids: "cup", "ml", "tbsp", "tsp"
+   - Meat: "lb", "oz", "g", "pieces"
+   - Spices: "tsp", "tbsp", "pinch"
+
+2. DISH TYPE VALIDATION:
+   - If dish is "{request.mealCraving.lower()}":
+     * For DESSERTS (cake, cookies, pie): Use SWEET ingredients (sugar, vanilla, chocolate, butter, eggs, flour)
+     * For SAVORY dishes (pasta, stir-fry, soup): Use SAVORY ingredients (salt, pepper, garlic, oil, herbs)
+     * NEVER mix sweet/savory incorrectly (e.g., NO salt in cheesecake!)
+
+3. COOKING INSTRUCTIONS:
+   - Must match the dish type exactly
+   - Pasta: boil water, cook pasta, make sauce, combine
+   - Cake: mix dry, mix wet, combine, bake
+   - Stir-fry: prep ingredients, heat wok, stir-fry, season
+   - Each step must be specific, not generic
+
+4. REALISTIC AMOUNTS:
+   - Servings: 2-6 people
+   - Prep time: 5-30 minutes
+   - Cook time: 10-60 minutes (0 for salads/no-cook)
+
+EXAMPLE - {exemplar_title} (CORRECT FORMAT, do not copy its content):
+{exemplar}
+
+NOW CREATE YOUR {target}:
+- Dish Type: {request.mealCraving}
+- Available Ingredients: {ingredients_str}
+- Dietary Restrictions: {dietary_str}
+- Preferred Cuisine: {request.preferredCuisine}
+
+REMEMBER:
+- Use CORRECT units for each ingredient (cheese = cups/oz, NOT cloves!)
+- Match ingredients to dish type (sweet for desserts, savory for mains)
+- Write specific instructions, not generic ones
+{output_rules}
+
+{answer}:"""
+
+def _call_recipe_llm(prompt: str, exemplar_source: str, num_predict: int = 2048):
+    """One Ollama chat call; returns the raw text and the timing summary."""
+    response = ollama.chat(
+        model='qwen2.5:3b',
+        messages=[{
+            'role': 'user',
+            'content': prompt
+        }],
+        options={
+            'temperature': 0.7,  # Creative but not too random
+            'num_predict': num_predict,  # Max tokens to generate
+        }
+    )
+
+    llm_stats = observe_llm_response(response, exemplar=exemplar_source)
+    print(f"⏱️  LLM prefill: {llm_stats['prefill_seconds']:.2f}s ({llm_stats['prompt_tokens']} prompt tokens), "
+          f"decode: {llm_stats['decode_seconds']:.2f}s ({llm_stats['tokens_per_second']:.1f} tokens/s)")
+    return response['message']['content'], llm_stats
+
+def _json_span(llm_output: str, open_char: str = '{', close_char: str = '}') -> str:
+    """The outermost JSON object (or array) in the LLM text, unparsed."""
+    start_idx = llm_output.find(open_char)
+    end_idx = llm_output.rfind(close_char) + 1
+    if start_idx != -1 and end_idx > start_idx:
+        return llm_output[start_idx:end_idx]
+    print(f"Raw LLM output: {llm_output[:500]}...")
+    raise ValueError("No JSON found in LLM response")
+
+def _recipe_from_llm(llm_output: str) -> Recipe:
+    """Parse and validate the LLM's recipe JSON in one pass (pydantic-core, no json.loads)."""
+    try:
+        return LLMRecipe.model_validate_json(_json_span(llm_output))
+    except ValidationError as e:
+        print(f"⚠️ Failed to convert to Recipe model: {e}")
+        print(f"Raw LLM output: {llm_output[:500]}...")
+        raise ValueError(f"Invalid recipe structure: {e}")
+
+def _require_ollama():
+    if not OLLAMA_AVAILABLE:
+        raise HTTPException(
+            status_code=503,
+            detail="Recipe generation service unavailable (Ollama not installed)"
+        )
+
+async def generate_recipe_with_llm(request: RecipeRequest) -> Recipe:
+    """
+    Generate recipe using Qwen2.5:3b LLM via Ollama.
+    """
+    _require_ollama()
+
+    # Create prompt for LLM, with one short exemplar matching the requested dish
+    exemplar, exemplar_source = select_exemplar(request.mealCraving, recipe_index)
+    exemplar_title = json.loads(exemplar)["title"]
+    prompt = build_recipe_prompt(request, exemplar, exemplar_title)
+
+    print(f"🤖 Generating recipe with Qwen2.5:3b for: {request.mealCraving} "
+          f"({exemplar_source} exemplar '{exemplar_title}')")
+    llm_output, _ = _call_recipe_llm(prompt, exemplar_source)
+
+    recipe = _recipe_from_llm(llm_output)
+    print(f"✅ Successfully generated recipe: {recipe.title}")
+
+    if recipe_index is not None:
+        await run_in_threadpool(recipe_index.add, request.model_dump(), recipe.model_dump())
+    return recipe
+
+def _parse_recipe_variants(llm_output: str, count: int) -> List[Recipe]:
+    """Valid, distinct recipes from a JSON array answer (a lone object counts as one)."""
+    array_start, object_start = llm_output.find('['), llm_output.find('{')
+    if array_start != -1 and (object_start == -1 or array_start < object_start):
+        span = _json_span(llm_output, '[', ']')
+        try:
+            candidates = LLM_RECIPE_LIST.validate_json(span)
+        except ValidationError:
+            # Slow path: validate item by item and keep the variants that pass
+            try:
+                items = json.loads(span)
+            except ValueError as e:
+                print(f"Raw LLM output: {llm_output[:500]}...")
+                raise ValueError(f"LLM did not return valid JSON: {e}")
+            candidates = []
+            for item in items if isinstance(items, list) else [items]:
+                try:
+                    candidates.append(LLMRecipe.model_validate(item))
+                except ValidationError:
+                    continue
+    else:
+        candidates = [_recipe_from_llm(llm_output)]
+
+    recipes, titles = [], set()
+    for recipe in candidates[:count]:
+        if recipe.title.lower() not in titles:
+            titles.add(recipe.title.lower())
+            recipes.append(recipe)
+    if not recipes:
+        raise ValueError("No valid recipe in LLM response")
+    return recipes
+
+async def generate_recipe_variants_with_llm(request: RecipeVariantsRequest) -> Tuple[List[Recipe], dict]:
+    """
+    Generate `request.count` recipe variants with a single Qwen2.5:3b call, so
+    the prompt prefill is paid once; returns the recipes and per-recipe cost.
+    """
+    _require_ollama()
+
+    exemplar, exemplar_source = select_exemplar(request.mealCraving, recipe_index)
+    exemplar_title = json.loads(exemplar)["title"]
+    prompt = build_recipe_prompt(request, exemplar, exemplar_title, count=request.count)
+
+    print(f"🤖 Generating {request.count} recipe variants with Qwen2.5:3b for: {request.mealCraving}")
+    start = time.perf_counter()
+    llm_output, llm_stats = _call_recipe_llm(prompt, exemplar_source, num_predict=1024 * request.count + 1024)
+    recipes = _parse_recipe_variants(llm_output, request.count)
+    elapsed = time.perf_counter() - start
+
+    cost = {
+        "recipes": len(recipes),
+        "seconds_per_recipe": elapsed / len(recipes),
+        "prompt_tokens_per_recipe": llm_stats["prompt_tokens"] / len(recipes),
+        "completion_tokens_per_recipe": llm_stats["completion_tokens"] / len(recipes),
+    }
+    print(f"✅ Generated {len(recipes)}/{request.count} variants: {cost['seconds_per_recipe']:.2f}s, "
+          f"{cost['prompt_tokens_per_recipe']:.0f} prompt tokens per recipe")
+
+    if recipe_index is not None:
+        stored_request = request.model_dump(exclude={"count"})
+        await run_in_threadpool(recipe_index.add, stored_request, recipes[0].model_dump())
+    return recipes, cost
+
+@router.post("/api/recipes", response_model=Recipe)
+async def generate_recipe(request: RecipeRequest):
+    """
+    Generate recipe based on ingredients and user preferences using Qwen2.5:3b LLM.
+    """
+    recipe = await run_in_threadpool(_indexed_recipe, request)
+    if recipe is not None:
+        return json_response(recipe.model_dump_json())
+
+    try:
+        # Generate recipe using Qwen2.5
+        recipe = await generate_recipe_with_llm(request)
+
+    except Exception as e:
+        print(f"❌ LLM recipe generation failed: {e}")
+        # Fallback to mock recipe on error
+        print("🔄 Using fallback mock recipe")
+        recipe = generate_mock_recipe(request)
+    # Validated already; serialize directly instead of through response_model
+    return json_response(recipe.model_dump_json())
+
+@router.post("/api/recipes/variants", response_model=List[Recipe])
+async def generate_recipe_variants(request: RecipeVariantsRequest):
+    """
+    Generate several recipe ideas for the same ingredients in one LLM call.
+    Amortized cost per recipe is returned in X-Recipe-* headers.
+    """
+    try:
+        recipes, cost = await generate_recipe_variants_with_llm(request)
+    except Exception as e:
+        print(f"❌ LLM variant generation failed: {e}")
+        print("🔄 Using fallback mock recipes")
+        return json_response(RECIPE_LIST.dump_json([generate_mock_recipe(request) for _ in range(request.count)]))
+
+    return json_response(RECIPE_LIST.dump_json(recipes), headers={
+        "X-Recipe-Seconds-Per-Recipe": f"{cost['seconds_per_recipe']:.3f}",
+        "X-Recipe-Prompt-Tokens-Per-Recipe": f"{cost['prompt_tokens_per_recipe']:.1f}",
+        "X-Recipe-Completion-Tokens-Per-Recipe": f"{cost['completion_tokens_per_recipe']:.1f}",
+    })
+
+class RecipeJob(BaseModel):
+    id: str
+    status: str  # queued, running, completed or failed
+    created_at: float
+    updated_at: float
+    result: Optional[Recipe] = None
+    error: Optional[str] = None
+
+def _run_recipe_job(payload: dict) -> dict:
+    """Worker-thread body of a recipe job; same LLM-then-mock fallback as /api/recipes."""
+    request = RecipeRequest(**payload)
+    recipe = _indexed_recipe(request)
+    if recipe is not None:
+        return recipe.model_dump()
+    try:
+        recipe = asyncio.run(generate_recipe_with_llm(request))
+    except Exception as e:
+        print(f"❌ LLM recipe job failed: {e}")
+        recipe = generate_mock_recipe(request)
+    return recipe.model_dump()
+
+# Durable queue so long generations do not hold the HTTP request open
+recipe_jobs = load_job_queue_from_env(_run_recipe_job)
+track_queue_depth("recipe_jobs", lambda: recipe_jobs.store.count("queued"))
+
+@router.post("/api/recipes/jobs", response_model=RecipeJob, status_code=202)
+async def submit_recipe_job(request: RecipeRequest):
+    """
+    Queue a recipe generation and return its job id immediately.
+    """
+    job_id = await run_in_threadpool(recipe_jobs.submit, request.model_dump())
+    return await run_in_threadpool(recipe_jobs.store.get, job_id)
+
+@router.get("/api/recipes/jobs/{job_id}", response_model=RecipeJob)
+async def get_recipe_job(job_id: str):
+    """
+    Poll a recipe job; `result` is set once the status is completed.
+    """
+    job = await run_in_threadpool(recipe_jobs.store.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Recipe job not found or expired")
+    return job
+
+def generate_mock_recipe(request: RecipeRequest) -> Recipe:
+    """Generate a mock recipe based on the request parameters."""
+    
+    # Create recipe title
+    main_ingredient = request.ingredients[0] if request.ingredients else "Vegetable"
+    title = f"{main_ingredient} {request.mealCraving.title()}"
+    
+    # Create ingredients list from detected items
+    recipe_ingredients = []
+    for i, ingredient in enumerate(request.ingredients[:6]):  # Use first 6 ingredients
+        recipe_ingredients.append(Ingredient(
+            name=ingredient,
+            amount=str(random.randint(1, 3)),
+            unit=random.choice(["cup", "tbsp", "piece", "clove", "oz"]),
+            notes="fresh" if random.random() > 0.7 else None
+        ))
+    
+    # Add common ingredients
+    recipe_ingredients.extend([
+        Ingredient(name="Salt", amount="1", unit="tsp"),
+        Ingredient(name="Black pepper", amount="1/2", unit="tsp"),
+        Ingredient(name="Olive oil", amount="2", unit="tbsp")
+    ])
+    
+    # Create instructions
+    instructions = [
+        Instruction(
+            step=1, 
+            text="Prepare all ingredients by washing, chopping, and measuring as needed.",
+            time=10,
+            tips="Having everything ready makes cooking smoother"
+        ),
+        Instruction(
+            step=2,
+            text="Heat olive oil in a large pan over medium-high heat.",
+            time=3,
+            temperature="Medium-high heat"
+        ),
+        Instruction(
+            step=3,
+            text=f"Add {main_ingredient.lower()} and other main ingredients to the pan.",
+            time=8,
+            tips="Don't overcrowd the pan"
+        ),
+        Instruction(
+            step=4,
+            text="Season with salt and pepper, cook until tender and flavorful.",
+            time=12,
+            tips="Taste and adjust seasoning as needed"
+        ),
+        Instruction(
+            step=5,
+            text="Serve hot and enjoy your homemade dish!",
+            tips="Best enjoyed fresh and warm"
+        )
+    ]
+    
+    # Generate tags
+    tags = ["Homemade", "Fresh Ingredients"]
+    if "salad" in request.mealCraving.lower():
+        tags.extend(["Healthy", "Light"])
+    elif "pasta" in request.mealCraving.lower():
+        tags.extend(["Italian", "Comfort Food"])
+    elif "stir" in request.mealCraving.lower():
+        tags.extend(["Asian", "Quick"])
+    
+    if request.preferredCuisine != "Any":
+        tags.append(request.preferredCuisine)
+    
+    return Recipe(
+        title=title,
+        description=f"A delicious {request.mealCraving.lower()} made with fresh ingredients from your fridge.",
+        prep_time=random.randint(10, 25),
+        cook_time=random.randint(15, 35),
+        servings=random.randint(2, 6),
+        difficulty=random.choice(["Easy", "Medium", "Hard"]),
+        ingredients=recipe_ingredients,
+        instructions=instructions,
+        tags=tags,
+        nutrition_info=NutritionInfo(
+            calories=random.randint(200, 500),
+            protein=f"{random.randint(10, 30)}g",
+            carbs=f"{random.randint(20, 50)}g",
+            fat=f"{random.randint(5, 20)}g",
+            fiber=f"{random.randint(3, 10)}g",
+            sugar=f"{random.randint(5, 15)}g",
+            sodium=f"{random.randint(300, 800)}mg"
+        )
+    )
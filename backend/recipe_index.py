@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+Local recipe store that answers common /api/recipes requests without the LLM.
+
+Most requests are for everyday dishes built from the 11 detectable
+ingredients, so a validated recipe generated once can be served again. Each
+stored recipe keeps the request that produced it; an inverted index maps
+ingredient words to recipes, and candidates are scored on
+
+- craving: how much of `mealCraving` the recipe's dish/title/tags cover
+  (or cosine similarity of embeddings when an embedding model is configured)
+- ingredients: share of the requested ingredients the recipe uses
+- cuisine: matches `preferredCuisine` (always true for "Any")
+
+Dietary restrictions are a hard filter: a recipe is only served to requests
+whose restrictions it was generated under. A match at or above min_score is
+returned directly; anything else goes to the LLM, whose validated output is
+added to the store.
+
+add and lookup block (a full-store JSON write, and an Ollama embeddings call
+when configured), so async callers run them in the threadpool.
+
+Settings: RECIPE_STORE (JSON file), RECIPE_INDEX_MIN_SCORE, RECIPE_INDEX=0 to
+disable, RECIPE_EMBED_MODEL for Ollama embeddings (e.g. nomic-embed-text).
+
+Seed or query the store:
+    python recipe_index.py --seed generated_recipes.jsonl
+    python recipe_index.py --query "pasta" --ingredients tomato cheese
+"""
+
+import argparse
+import json
+import os
+import re
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Set
+
+import numpy as np
+
+from ingredients import canonicalize, normalize_word
+
+DEFAULT_STORE_PATH = os.path.join(os.path.dirname(__file__), "recipe_store.json")
+DEFAULT_MIN_SCORE = 0.7
+WEIGHTS = {"craving": 0.45, "ingredients": 0.4, "cuisine": 0.15}
+MIN_INGREDIENTS = 3
+MIN_INSTRUCTIONS = 3
+
+_WORD = re.compile(r"[a-z]+")
+STOPWORDS = {"a", "an", "and", "the", "with", "of", "in", "on", "style", "easy", "quick"}
+
+
+def tokens(text: str) -> Set[str]:
+    return {normalize_word(word) for word in _WORD.findall(text.lower())}
+
+
+class RecipeMatch:
+    def __init__(self, recipe: Dict, score: float, parts: Dict[str, float], entry_id: str):
+        self.recipe = recipe
+        self.score = score
+        self.parts = parts
+        self.entry_id = entry_id
+
+
+class RecipeIndex:
+    """In-memory recipe entries plus an ingredient-word -> entry id index, persisted to JSON."""
+
+    def __init__(self, path: Optional[str] = None, min_score: float = DEFAULT_MIN_SCORE,
+                 embed: Optional[Callable[[str], List[float]]] = None):
+        self.path = path
+        self.min_score = min_score
+        self.embed = embed
+        self.entries: Dict[str, Dict] = {}
+        self.by_ingredient: Dict[str, Set[str]] = {}
+        self.by_dish: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        if path and os.path.exists(path):
+            with open(path, "r") as f:
+                for entry in json.load(f).get("recipes", []):
+                    self._insert(entry)
+
+    def _embed(self, text: str) -> Optional[List[float]]:
+        if self.embed is None:
+            return None
+        try:
+            return list(self.embed(text))
+        except Exception as e:
+            print(f"⚠️ Recipe embedding failed, using word overlap: {e}")
+            return None
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def _insert(self, entry: Dict):
+        self.entries[entry["id"]] = entry
+        for word in entry["ingredient_words"]:
+            self.by_ingredient.setdefault(word, set()).add(entry["id"])
+        for word in entry["dish_words"]:
+            self.by_dish.setdefault(word, set()).add(entry["id"])
+
+    def _remove(self, entry_id: str):
+        entry = self.entries.pop(entry_id)
+        for word in entry["ingredient_words"]:
+            self.by_ingredient[word].discard(entry_id)
+        for word in entry["dish_words"]:
+            self.by_dish[word].discard(entry_id)
+
+    @staticmethod
+    def entry_key(request: Dict) -> str:
+        ingredients = sorted({" ".join(sorted(tokens(name))) for name in request.get("ingredients", [])})
+        dietary = sorted(d.lower() for d in request.get("dietaryRestrictions", []))
+        return "|".join([" ".join(sorted(tokens(request["mealCraving"]))), ",".join(ingredients),
+                         request.get("preferredCuisine", "Any").lower(), ",".join(dietary)])
+
+    def add(self, request: Dict, recipe: Dict, source: str = "llm", save: bool = True) -> bool:
+        """Store a validated recipe under the request that produced it; returns False if too thin.
+
+        With save=False the caller batches writes and calls save() itself.
+        """
+        if (len(recipe.get("ingredients", [])) < MIN_INGREDIENTS
+                or len(recipe.get("instructions", [])) < MIN_INSTRUCTIONS):
+            return False
+
+        dish = f"{request['mealCraving']} {recipe.get('title', '')} {' '.join(recipe.get('tags', []))}"
+        entry = {
+            "id": self.entry_key(request),
+            "request": request,
+            "recipe": recipe,
+            "source": source,
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "dish_words": sorted(tokens(dish)),
+            # Canonical names too, so a recipe using "Mozzarella" is found for "Cheese"
+            "ingredient_words": sorted(set().union(*(tokens(i["name"]) | tokens(canonicalize(i["name"]))
+                                                     for i in recipe["ingredients"]))),
+            "cuisine": request.get("preferredCuisine", "Any").lower(),
+            "dietary": sorted(d.lower() for d in request.get("dietaryRestrictions", [])),
+        }
+        embedding = self._embed(dish)
+        if embedding is not None:
+            entry["embedding"] = embedding
+
+        with self._lock:
+            if entry["id"] in self.entries:
+                self._remove(entry["id"])  # newest generation for the same request wins
+            self._insert(entry)
+        if save:
+            self.save()
+        return True
+
+    def save(self):
+        if not self.path:
+            return
+        # Writers take turns, each dumping the latest snapshot; lookups only wait for the copy
+        with self._save_lock:
+            with self._lock:
+                recipes = list(self.entries.values())
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "w") as f:
+                json.dump({"recipes": recipes}, f)
+            os.replace(tmp, self.path)
+
+    def search(self, request: Dict, limit: int = 5) -> List[RecipeMatch]:
+        """Candidates sharing an ingredient word with the request, best first."""
+        requested = [tokens(name) for name in request.get("ingredients", [])]
+        requested = [words for words in requested if words]
+        if not requested:
+            return []
+
+        craving = tokens(request["mealCraving"])
+        cuisine = request.get("preferredCuisine", "Any").lower()
+        dietary = {d.lower() for d in request.get("dietaryRestrictions", [])}
+        query_embedding = self._embed(request["mealCraving"])
+        if query_embedding is not None:
+            query_embedding = np.asarray(query_embedding, dtype=np.float32)
+
+        matches = []
+        with self._lock:  # job workers add recipes concurrently
+            candidates = set().union(*(self.by_ingredient.get(word, set()) for words in requested for word in words))
+            for entry_id in candidates:
+                entry = self.entries[entry_id]
+                if not dietary <= set(entry["dietary"]):
+                    continue
+                if query_embedding is not None and "embedding" in entry:
+                    stored = np.asarray(entry["embedding"], dtype=np.float32)
+                    craving_score = float(stored @ query_embedding /
+                                          (np.linalg.norm(stored) * np.linalg.norm(query_embedding) + 1e-9))
+                else:
+                    craving_score = len(craving & set(entry["dish_words"])) / len(craving) if craving else 0.0
+                if craving_score <= 0:
+                    continue
+
+                ingredient_words = set(entry["ingredient_words"])
+                used = sum(1 for words in requested if words <= ingredient_words)
+                parts = {
+                    "craving": round(craving_score, 4),
+                    "ingredients": round(used / len(requested), 4),
+                    "cuisine": 1.0 if cuisine == "any" or cuisine in (entry["cuisine"], *entry["dish_words"]) else 0.0,
+                }
+                score = sum(WEIGHTS[name] * value for name, value in parts.items())
+                matches.append(RecipeMatch(entry["recipe"], round(score, 4), parts, entry_id))
+
+        matches.sort(key=lambda match: match.score, reverse=True)
+        return matches[:limit]
+
+    def closest_dish(self, craving: str) -> Optional[Dict]:
+        """Stored recipe sharing most dish words with `craving` (shortest on ties), for prompt exemplars."""
+        words = tokens(craving) - STOPWORDS
+        if not words:
+            return None
+        with self._lock:
+            overlap: Dict[str, int] = {}
+            for word in words:
+                for entry_id in self.by_dish.get(word, ()):
+                    overlap[entry_id] = overlap.get(entry_id, 0) + 1
+            if not overlap:
+                return None
+
+            def rank(entry_id: str):
+                recipe = self.entries[entry_id]["recipe"]
+                return overlap[entry_id], -len(recipe["ingredients"]) - len(recipe["instructions"])
+
+            best = max(overlap, key=rank)
+            if overlap[best] * 2 < len(words):
+                return None
+            return self.entries[best]["recipe"]
+
+    def lookup(self, request: Dict) -> Optional[RecipeMatch]:
+        """Best match at or above min_score, or None to fall through to the LLM."""
+        matches = self.search(request, limit=1)
+        return matches[0] if matches and matches[0].score >= self.min_score else None
+
+
+def load_index_from_env(embed: Optional[Callable[[str], List[float]]] = None) -> Optional[RecipeIndex]:
+    if os.getenv("RECIPE_INDEX", "1").lower() in ("0", "false", "no"):
+        return None
+
+    path = os.getenv("RECIPE_STORE", DEFAULT_STORE_PATH)
+    try:
+        index = RecipeIndex(path, min_score=float(os.getenv("RECIPE_INDEX_MIN_SCORE", DEFAULT_MIN_SCORE)),
+                            embed=embed)
+    except Exception as e:
+        print(f"❌ Failed to load recipe store: {e}")
+        return None
+
+    print(f"✅ Recipe index: {len(index)} stored recipe(s), min score {index.min_score}"
+          + (" (embeddings)" if embed else ""))
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed or query the local recipe store")
+    parser.add_argument("--store", default=DEFAULT_STORE_PATH)
+    parser.add_argument("--seed", nargs="+", default=[],
+                        help="JSONL files of {\"request\": RecipeRequest, \"recipe\": Recipe} lines")
+    parser.add_argument("--query", default=None, help="mealCraving to look up")
+    parser.add_argument("--ingredients", nargs="*", default=[])
+    parser.add_argument("--cuisine", default="Any")
+    parser.add_argument("--dietary", nargs="*", default=[])
+    args = parser.parse_args()
+
+    index = RecipeIndex(args.store)
+    for path in args.seed:
+        added = skipped = 0
+        with open(path, "r") as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    if index.add(record["request"], record["recipe"], source=f"seed:{os.path.basename(path)}",
+                                 save=False):
+                        added += 1
+                    else:
+                        skipped += 1
+        index.save()  # once per seed file
+        print(f"✅ Seeded {added} recipe(s) from {path} ({skipped} too short to keep)")
+
+    if args.query:
+        request = {"ingredients": args.ingredients, "mealCraving": args.query,
+                   "dietaryRestrictions": args.dietary, "preferredCuisine": args.cuisine}
+        start = time.perf_counter()
+        matches = index.search(request)
+        elapsed_ms = (time.perf_counter() - start) * 1000.0
+        for match in matches:
+            print(f"   - {match.score:.3f} {match.recipe['title']} {match.parts}")
+        print(f"🔍 {len(matches)} match(es) from {len(index)} recipe(s) in {elapsed_ms:.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
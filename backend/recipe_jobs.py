@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Durable job queue for recipe generation.
+
+POST /api/recipes/jobs stores the request in a local SQLite database and
+returns a job id at once; a small pool of worker threads claims queued jobs,
+runs the recipe handler and writes the result back, where it stays readable
+through GET /api/recipes/jobs/{id} until its TTL runs out. The HTTP request
+no longer waits on the LLM, and a client that disconnects can poll later.
+
+Jobs survive restarts, and several processes can share one database. A
+claimed job carries its owner and a lease that the owner's heartbeat keeps
+extending; only a job whose lease ran out (its process died or hung) is put
+back in the queue, so a job another live process is running never runs twice.
+Settings: RECIPE_JOBS_DB, RECIPE_JOB_WORKERS, RECIPE_JOB_TTL and
+RECIPE_JOB_LEASE (seconds).
+"""
+
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import closing
+from typing import Callable, Dict, List, Optional
+
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(__file__), "recipe_jobs.sqlite3")
+DEFAULT_WORKERS = 2
+DEFAULT_TTL_SECONDS = 3600
+DEFAULT_LEASE_SECONDS = 60.0  # Renewed every third of this while the job runs
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    request TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    expires_at REAL,
+    owner TEXT,
+    lease_expires_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_queued ON jobs (status, created_at);
+"""
+LEASE_COLUMNS = {"owner": "TEXT", "lease_expires_at": "REAL"}
+
+
+class JobStore:
+    """SQLite-backed job table; every call opens its own connection, so it is thread-safe."""
+
+    def __init__(self, path: str = DEFAULT_DB_PATH, lease_seconds: float = DEFAULT_LEASE_SECONDS):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            # Databases created before leases existed
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+            for name, kind in LEASE_COLUMNS.items():
+                if name not in columns:
+                    conn.execute(f"ALTER TABLE jobs ADD COLUMN {name} {kind}")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def create(self, request: Dict) -> str:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, status, request, created_at, updated_at) VALUES (?, 'queued', ?, ?, ?)",
+                (job_id, json.dumps(request), now, now),
+            )
+        return job_id
+
+    def claim(self) -> Optional[Dict]:
+        """Move the oldest queued job to `running` under a lease held by this store, or None."""
+        now = time.time()
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")  # one claimer at a time, across processes too
+            row = conn.execute(
+                "SELECT id, request FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE jobs SET status = 'running', owner = ?, lease_expires_at = ?, updated_at = ? WHERE id = ?",
+                    (self.owner, now + self.lease_seconds, now, row["id"]),
+                )
+            conn.execute("COMMIT")
+        return {"id": row["id"], "request": json.loads(row["request"])} if row else None
+
+    def finish(self, job_id: str, ttl: float, result: Optional[Dict] = None, error: Optional[str] = None) -> bool:
+        """Record the outcome; False if the lease was lost and the job re-queued meanwhile."""
+        now = time.time()
+        with closing(self._connect()) as conn:
+            return conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, updated_at = ?, expires_at = ?, "
+                "owner = NULL, lease_expires_at = NULL WHERE id = ? AND status = 'running' AND owner = ?",
+                ("failed" if error else "completed", json.dumps(result) if result is not None else None,
+                 error, now, now + ttl, job_id, self.owner),
+            ).rowcount == 1
+
+    def heartbeat(self) -> int:
+        """Extend the leases of every job this store is running."""
+        with closing(self._connect()) as conn:
+            return conn.execute(
+                "UPDATE jobs SET lease_expires_at = ? WHERE status = 'running' AND owner = ?",
+                (time.time() + self.lease_seconds, self.owner),
+            ).rowcount
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None or (row["expires_at"] is not None and row["expires_at"] < time.time()):
+            return None
+        return {
+            "id": row["id"],
+            "status": row["status"],
+            "created_at": row["created_at"],
+            "updated_at": row["updated_at"],
+            "result": json.loads(row["result"]) if row["result"] else None,
+            "error": row["error"],
+        }
+
+    def count(self, status: str) -> int:
+        with closing(self._connect()) as conn:
+            return conn.execute("SELECT COUNT(*) FROM jobs WHERE status = ?", (status,)).fetchone()[0]
+
+    def requeue_stale(self) -> int:
+        """Running jobs whose lease ran out (their process stopped or hung) go back to the queue."""
+        now = time.time()
+        with closing(self._connect()) as conn:
+            return conn.execute(
+                "UPDATE jobs SET status = 'queued', owner = NULL, lease_expires_at = NULL, updated_at = ? "
+                "WHERE status = 'running' AND (lease_expires_at IS NULL OR lease_expires_at < ?)",
+                (now, now),
+            ).rowcount
+
+    def purge_expired(self) -> int:
+        with closing(self._connect()) as conn:
+            return conn.execute("DELETE FROM jobs WHERE expires_at < ?", (time.time(),)).rowcount
+
+
+class RecipeJobQueue:
+    """Worker threads that drain a JobStore through `handler(request) -> result`."""
+
+    def __init__(self, store: JobStore, handler: Callable[[Dict], Dict], workers: int = DEFAULT_WORKERS,
+                 ttl: float = DEFAULT_TTL_SECONDS, poll_interval: float = 5.0):
+        self.store = store
+        self.handler = handler
+        self.workers = workers
+        self.ttl = ttl
+        self.poll_interval = poll_interval
+        self._wakeup = threading.Condition()
+        self._threads: List[threading.Thread] = []
+        self._stopping = False
+        self._stopped = threading.Event()  # Stops the heartbeat; separate so notify() only wakes workers
+        self._pending = 0
+
+    def start(self):
+        """Start the workers once; safe to call on every submit."""
+        with self._wakeup:
+            if self._threads:
+                return
+            self._requeue_stale()
+            self._stopping = False
+            self._stopped.clear()
+            self._threads = [
+                threading.Thread(target=self._work, name=f"recipe-job-{i}", daemon=True)
+                for i in range(self.workers)
+            ] + [threading.Thread(target=self._heartbeat, name="recipe-job-heartbeat", daemon=True)]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        with self._wakeup:
+            self._stopping = True
+            self._wakeup.notify_all()
+        self._stopped.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def submit(self, request: Dict) -> str:
+        job_id = self.store.create(request)
+        self.start()
+        with self._wakeup:
+            self._pending += 1
+            self._wakeup.notify()
+        return job_id
+
+    def _requeue_stale(self):
+        requeued = self.store.requeue_stale()
+        if requeued:
+            print(f"🔄 Re-queued {requeued} recipe job(s) whose worker stopped")
+
+    def _heartbeat(self):
+        while not self._stopped.wait(self.store.lease_seconds / 3):
+            self.store.heartbeat()
+
+    def _work(self):
+        while not self._stopping:
+            job = self.store.claim()
+            if job is None:
+                self._requeue_stale()
+                self.store.purge_expired()
+                with self._wakeup:
+                    # A submit between claim() and here must not be slept through
+                    if not self._stopping and not self._pending:
+                        self._wakeup.wait(self.poll_interval)
+                    self._pending = 0
+                continue
+
+            try:
+                finished = self.store.finish(job["id"], self.ttl, result=self.handler(job["request"]))
+            except Exception as e:
+                print(f"❌ Recipe job {job['id']} failed: {e}")
+                finished = self.store.finish(job["id"], self.ttl, error=str(e))
+            if not finished:
+                print(f"⚠️ Recipe job {job['id']} lost its lease; result dropped")
+
+
+def load_job_queue_from_env(handler: Callable[[Dict], Dict]) -> RecipeJobQueue:
+    store = JobStore(os.getenv("RECIPE_JOBS_DB", DEFAULT_DB_PATH),
+                     lease_seconds=float(os.getenv("RECIPE_JOB_LEASE", DEFAULT_LEASE_SECONDS)))
+    return RecipeJobQueue(
+        store,
+        handler,
+        workers=int(os.getenv("RECIPE_JOB_WORKERS", DEFAULT_WORKERS)),
+        ttl=float(os.getenv("RECIPE_JOB_TTL", DEFAULT_TTL_SECONDS)),
+    )
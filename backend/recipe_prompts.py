@@ -0,0 +1,184 @@
+"""
+Few-shot exemplar selection for the recipe prompt.
+
+The prompt used to embed the same long cheesecake example in every request,
+whatever the dish. select_exemplar picks one short exemplar that matches the
+requested dish instead: the closest validated recipe in the local store
+(recipe_index.py) by dish words, else a built-in exemplar for the dish type.
+Exemplars are trimmed and serialized compactly, so prefill shrinks and the
+model copies the structure of a recipe it is actually asked for.
+"""
+
+import json
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+from recipe_index import RecipeIndex, tokens
+
+MAX_EXEMPLAR_INGREDIENTS = 4
+MAX_EXEMPLAR_STEPS = 3
+
+# The type sharing most keywords with the craving wins; on a tie the earlier
+# one does, so cooking techniques come first ("noodle stir-fry" is a stir-fry)
+DISH_TYPES = {
+    "stir_fry": {"stir", "wok", "teriyaki", "fried", "asian"},
+    "dessert": {"cake", "cheesecake", "cookie", "pie", "brownie", "pudding", "dessert", "muffin", "tart",
+                "sweet", "cupcake", "custard"},
+    "pasta": {"pasta", "spaghetti", "lasagna", "noodle", "penne", "fettuccine", "carbonara", "mac", "macaroni"},
+    "salad": {"salad", "slaw", "coleslaw"},
+    "soup": {"soup", "stew", "chowder", "broth", "chili", "curry"},
+}
+
+BUILTIN_EXEMPLARS = {
+    "dessert": {
+        "title": "Classic New York Cheesecake",
+        "description": "Rich and creamy cheesecake with graham cracker crust",
+        "prep_time": 20, "cook_time": 60, "servings": 8, "difficulty": "Medium",
+        "ingredients": [
+            {"name": "Cream cheese", "amount": "16", "unit": "oz", "notes": "softened"},
+            {"name": "Sugar", "amount": "3/4", "unit": "cup"},
+            {"name": "Eggs", "amount": "3", "unit": "whole"},
+            {"name": "Graham crackers", "amount": "1.5", "unit": "cups", "notes": "crushed"},
+        ],
+        "instructions": [
+            {"step": 1, "text": "Mix crushed graham crackers with melted butter and press into a pan.", "time": 5},
+            {"step": 2, "text": "Beat cream cheese and sugar until fluffy, then beat in eggs one at a time.",
+             "time": 8},
+            {"step": 3, "text": "Pour over the crust and bake until the center just jiggles.", "time": 60,
+             "temperature": "325°F", "tips": "Chill 4 hours before serving"},
+        ],
+        "tags": ["Dessert", "Baked"],
+        "nutrition_info": {"calories": 380, "protein": "7g", "carbs": "32g", "fat": "26g"},
+    },
+    "pasta": {
+        "title": "Tomato Basil Spaghetti",
+        "description": "Simple spaghetti in a fresh garlicky tomato sauce",
+        "prep_time": 10, "cook_time": 20, "servings": 4, "difficulty": "Easy",
+        "ingredients": [
+            {"name": "Spaghetti", "amount": "12", "unit": "oz"},
+            {"name": "Tomatoes", "amount": "4", "unit": "whole", "notes": "diced"},
+            {"name": "Garlic", "amount": "3", "unit": "clove", "notes": "minced"},
+            {"name": "Parmesan cheese", "amount": "1/2", "unit": "cup", "notes": "grated"},
+        ],
+        "instructions": [
+            {"step": 1, "text": "Boil the spaghetti in salted water until al dente.", "time": 10},
+            {"step": 2, "text": "Sauté garlic in olive oil, add tomatoes and simmer into a sauce.", "time": 12,
+             "temperature": "Medium heat"},
+            {"step": 3, "text": "Toss the drained pasta with the sauce and top with parmesan.", "time": 2},
+        ],
+        "tags": ["Italian", "Pasta"],
+        "nutrition_info": {"calories": 420, "protein": "14g", "carbs": "68g", "fat": "9g"},
+    },
+    "stir_fry": {
+        "title": "Chicken Broccoli Stir-Fry",
+        "description": "Quick savory stir-fry with tender chicken and crisp broccoli",
+        "prep_time": 15, "cook_time": 10, "servings": 2, "difficulty": "Easy",
+        "ingredients": [
+            {"name": "Chicken breast", "amount": "1", "unit": "lb", "notes": "sliced thin"},
+            {"name": "Broccoli", "amount": "2", "unit": "cup", "notes": "florets"},
+            {"name": "Soy sauce", "amount": "3", "unit": "tbsp"},
+            {"name": "Garlic", "amount": "2", "unit": "clove", "notes": "minced"},
+        ],
+        "instructions": [
+            {"step": 1, "text": "Heat oil in a wok and stir-fry the chicken until browned.", "time": 5,
+             "temperature": "High heat"},
+            {"step": 2, "text": "Add garlic and broccoli and stir-fry until crisp-tender.", "time": 4},
+            {"step": 3, "text": "Add soy sauce, toss to coat and serve over rice.", "time": 1},
+        ],
+        "tags": ["Asian", "Quick"],
+        "nutrition_info": {"calories": 310, "protein": "36g", "carbs": "12g", "fat": "12g"},
+    },
+    "salad": {
+        "title": "Crisp Cucumber Tomato Salad",
+        "description": "Fresh no-cook salad with a lemon vinaigrette",
+        "prep_time": 10, "cook_time": 0, "servings": 2, "difficulty": "Easy",
+        "ingredients": [
+            {"name": "Cucumber", "amount": "1", "unit": "whole", "notes": "sliced"},
+            {"name": "Tomatoes", "amount": "2", "unit": "whole", "notes": "wedged"},
+            {"name": "Lettuce", "amount": "2", "unit": "cup", "notes": "torn"},
+            {"name": "Olive oil", "amount": "2", "unit": "tbsp"},
+        ],
+        "instructions": [
+            {"step": 1, "text": "Whisk olive oil, lemon juice, salt and pepper into a dressing."},
+            {"step": 2, "text": "Combine lettuce, cucumber and tomatoes in a bowl."},
+            {"step": 3, "text": "Toss with the dressing just before serving.", "tips": "Dress late to keep it crisp"},
+        ],
+        "tags": ["Salad", "No-cook"],
+        "nutrition_info": {"calories": 150, "protein": "2g", "carbs": "9g", "fat": "12g"},
+    },
+    "soup": {
+        "title": "Creamy Carrot Soup",
+        "description": "Smooth, lightly spiced carrot soup",
+        "prep_time": 10, "cook_time": 30, "servings": 4, "difficulty": "Easy",
+        "ingredients": [
+            {"name": "Carrots", "amount": "6", "unit": "whole", "notes": "chopped"},
+            {"name": "Onion", "amount": "1", "unit": "whole", "notes": "diced"},
+            {"name": "Vegetable broth", "amount": "4", "unit": "cup"},
+            {"name": "Milk", "amount": "1/2", "unit": "cup"},
+        ],
+        "instructions": [
+            {"step": 1, "text": "Soften the onion in butter, add carrots and broth.", "time": 5},
+            {"step": 2, "text": "Simmer until the carrots are very tender.", "time": 25, "temperature": "Low heat"},
+            {"step": 3, "text": "Blend until smooth, stir in milk and season.", "time": 3},
+        ],
+        "tags": ["Soup", "Comfort Food"],
+        "nutrition_info": {"calories": 140, "protein": "3g", "carbs": "20g", "fat": "5g"},
+    },
+    "main": {
+        "title": "Garlic Butter Pork Chops",
+        "description": "Pan-seared pork chops finished in garlic butter",
+        "prep_time": 5, "cook_time": 15, "servings": 2, "difficulty": "Easy",
+        "ingredients": [
+            {"name": "Pork chops", "amount": "2", "unit": "pieces", "notes": "bone-in"},
+            {"name": "Butter", "amount": "2", "unit": "tbsp"},
+            {"name": "Garlic", "amount": "3", "unit": "clove", "notes": "smashed"},
+            {"name": "Salt", "amount": "1", "unit": "tsp"},
+        ],
+        "instructions": [
+            {"step": 1, "text": "Season the chops and sear in a hot skillet.", "time": 4,
+             "temperature": "Medium-high heat"},
+            {"step": 2, "text": "Flip, add butter and garlic, and baste until cooked through.", "time": 8},
+            {"step": 3, "text": "Rest 5 minutes before serving.", "time": 5},
+        ],
+        "tags": ["Main", "Skillet"],
+        "nutrition_info": {"calories": 450, "protein": "38g", "carbs": "1g", "fat": "32g"},
+    },
+}
+
+
+def dish_type(craving: str) -> str:
+    words = tokens(craving)
+    best, best_overlap = "main", 0
+    for kind, keywords in DISH_TYPES.items():
+        overlap = len(words & keywords)
+        if overlap > best_overlap:
+            best, best_overlap = kind, overlap
+    return best
+
+
+def compact_exemplar(recipe: Dict) -> str:
+    """Trimmed recipe JSON without null fields or whitespace."""
+    def strip(item: Dict) -> Dict:
+        return {key: value for key, value in item.items() if value is not None}
+
+    trimmed = strip({
+        **recipe,
+        "ingredients": [strip(i) for i in recipe["ingredients"][:MAX_EXEMPLAR_INGREDIENTS]],
+        "instructions": [strip(i) for i in recipe["instructions"][:MAX_EXEMPLAR_STEPS]],
+        "nutrition_info": strip(recipe["nutrition_info"]) if recipe.get("nutrition_info") else None,
+    })
+    return json.dumps(trimmed, ensure_ascii=False, separators=(",", ":"))
+
+
+@lru_cache(maxsize=len(BUILTIN_EXEMPLARS))
+def _builtin(kind: str) -> str:
+    return compact_exemplar(BUILTIN_EXEMPLARS[kind])
+
+
+def select_exemplar(craving: str, index: Optional[RecipeIndex] = None) -> Tuple[str, str]:
+    """(compact exemplar JSON, source) for the requested dish."""
+    if index is not None:
+        stored = index.closest_dish(craving)
+        if stored is not None:
+            return compact_exemplar(stored), "stored"
+    return _builtin(dish_type(craving)), "builtin"
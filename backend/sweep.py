@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+Parallel hyperparameter / augmentation sweep for CPU fine-tuning.
+
+Starts from the settings in fine_tune_yolo_cpu_aug.py and explores a grid or a
+random sample of the search space. Several short trainings run at once, each in
+its own process pinned to a disjoint set of cores with matching thread limits.
+After every epoch a trial compares its mAP50 with the other trials at the same
+epoch and stops itself if it is below the median (median stopping rule).
+When all trials are done the sweep writes a ranked leaderboard.
+
+Everything runs offline: YOLO_OFFLINE is set, plots are off, and only local
+weights and the local dataset are used.
+
+Examples:
+    python sweep.py --model yolov8n.pt --trials 12 --parallel 4 --epochs 5
+    python sweep.py --mode grid --space sweep_space.yaml --parallel 2 --fraction 0.5
+"""
+
+import argparse
+import itertools
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import yaml
+
+BACKEND_DIR = Path(__file__).resolve().parent
+DEFAULT_SWEEP_DIR = BACKEND_DIR / "sweeps"
+MAP50_KEY = "metrics/mAP50(B)"
+MAP50_95_KEY = "metrics/mAP50-95(B)"
+PROGRESS_FILE = "progress.jsonl"
+RESULT_FILE = "result.json"
+
+# Lists are discrete choices (grid or random); {low, high[, log]} ranges are random-only
+DEFAULT_SPACE = {
+    "hsv_h": [0.0, 0.01, 0.02],
+    "hsv_s": [0.2, 0.3, 0.5],
+    "hsv_v": [0.1, 0.2, 0.4],
+    "mosaic": [0.0, 0.3, 0.6, 1.0],
+    "scale": [0.1, 0.2, 0.4],
+    "translate": [0.0, 0.05, 0.1],
+    "lr0": {"low": 0.0002, "high": 0.002, "log": True},
+}
+
+
+def grid_trials(space: Dict) -> List[Dict]:
+    ranges = [name for name, values in space.items() if not isinstance(values, list)]
+    if ranges:
+        raise ValueError(f"Grid search needs discrete values, got ranges for: {ranges}")
+    names = list(space)
+    return [dict(zip(names, values)) for values in itertools.product(*(space[name] for name in names))]
+
+
+def random_trials(space: Dict, count: int, seed: int) -> List[Dict]:
+    rng = random.Random(seed)
+    trials = []
+    for _ in range(count):
+        params = {}
+        for name, values in space.items():
+            if isinstance(values, list):
+                params[name] = rng.choice(values)
+            elif values.get("log"):
+                params[name] = round(math.exp(rng.uniform(math.log(values["low"]), math.log(values["high"]))), 6)
+            else:
+                params[name] = round(rng.uniform(values["low"], values["high"]), 6)
+        trials.append(params)
+    return trials
+
+
+def should_prune(value: float, peers: List[float], epoch: int, warmup_epochs: int, min_peers: int) -> bool:
+    """Median stopping rule: prune when below the median of peers at the same epoch."""
+    if epoch <= warmup_epochs or len(peers) < min_peers:
+        return False
+    ordered = sorted(peers)
+    middle = len(ordered) // 2
+    median = ordered[middle] if len(ordered) % 2 else (ordered[middle - 1] + ordered[middle]) / 2
+    return value < median
+
+
+def read_progress(trial_dir: Path) -> List[Dict]:
+    path = trial_dir / PROGRESS_FILE
+    if not path.exists():
+        return []
+    return [json.loads(line) for line in path.read_text().splitlines() if line.strip()]
+
+
+def core_slots(parallel: int, threads: Optional[int]) -> List[List[int]]:
+    """Split the usable cores into `parallel` disjoint sets."""
+    cores = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else list(range(os.cpu_count() or 1))
+    per_slot = threads or max(1, len(cores) // parallel)
+    if per_slot * parallel > len(cores):
+        print(f"⚠️ {parallel} x {per_slot} threads exceeds {len(cores)} cores; slots will share cores")
+    return [[cores[(slot * per_slot + i) % len(cores)] for i in range(per_slot)] for slot in range(parallel)]
+
+
+def run_trial(config_path: Path):
+    """Entry point of a trial process."""
+    config = json.loads(config_path.read_text())
+    trial_dir = config_path.parent
+    threads = len(config["cores"])
+
+    import torch
+
+    torch.set_num_threads(threads)
+    from dataset_config import resolve_dataset_config
+    from fine_tune_yolo_cpu_aug import AUGMENTATIONS, HYPERPARAMETERS
+    from train_orchestrator import run_training
+
+    trainer_class = None
+    if config.get("image_cache_dir"):
+        from image_cache import cached_trainer
+        trainer_class = cached_trainer(config["image_cache_dir"])
+
+    sweep_dir = trial_dir.parent
+    pruned = {"epoch": None}
+    pending = {"epoch": False}
+
+    def on_train_epoch_end(trainer):
+        pending["epoch"] = True
+
+    def on_fit_epoch_end(trainer):
+        if not pending["epoch"]:  # final validation after training
+            return
+        pending["epoch"] = False
+        epoch = trainer.epoch + 1
+        map50 = float(trainer.metrics.get(MAP50_KEY, 0.0))
+        with open(trial_dir / PROGRESS_FILE, "a") as f:
+            f.write(json.dumps({"epoch": epoch, "map50": map50,
+                                "map50_95": float(trainer.metrics.get(MAP50_95_KEY, 0.0))}) + "\n")
+
+        peers = [
+            entry["map50"]
+            for other in sweep_dir.glob("trial_*") if other != trial_dir
+            for entry in read_progress(other) if entry["epoch"] == epoch
+        ]
+        if should_prune(map50, peers, epoch, config["warmup_epochs"], config["min_peers"]):
+            print(f"✂️ Pruning {trial_dir.name} at epoch {epoch}: mAP50 {map50:.4f} below peer median")
+            pruned["epoch"] = epoch
+            trainer.stop = True
+
+    started = time.time()
+    train_args = {
+        "data": resolve_dataset_config(config["data"]),
+        "epochs": config["epochs"],
+        "batch": config["batch"],
+        "imgsz": config["imgsz"],
+        "fraction": config["fraction"],
+        "device": "cpu",
+        "workers": min(2, threads),
+        "project": str(sweep_dir),
+        "name": trial_dir.name,
+        "exist_ok": True,
+        "pretrained": True,
+        "amp": False,
+        "plots": False,
+        "verbose": False,
+        "seed": config["seed"],
+        **HYPERPARAMETERS,
+        **AUGMENTATIONS,
+        **config["params"],
+    }
+    run_training(
+        config["model"], train_args, trainer=trainer_class,
+        callbacks={"on_train_epoch_end": on_train_epoch_end, "on_fit_epoch_end": on_fit_epoch_end},
+    )
+
+    progress = read_progress(trial_dir)
+    best = max(progress, key=lambda entry: (entry["map50_95"], entry["map50"]), default={})
+    result = {
+        "trial": trial_dir.name,
+        "params": config["params"],
+        "status": "pruned" if pruned["epoch"] else "completed",
+        "epochs_run": len(progress),
+        "map50": best.get("map50", 0.0),
+        "map50_95": best.get("map50_95", 0.0),
+        "best_epoch": best.get("epoch"),
+        "wall_seconds": round(time.time() - started, 1),
+        "cores": config["cores"],
+    }
+    (trial_dir / RESULT_FILE).write_text(json.dumps(result, indent=2))
+
+
+def launch_trial(config_path: Path, cores: List[int]) -> subprocess.Popen:
+    threads = str(len(cores))
+    env = {
+        **os.environ,
+        "YOLO_OFFLINE": "1",
+        "OMP_NUM_THREADS": threads,
+        "MKL_NUM_THREADS": threads,
+        "OPENBLAS_NUM_THREADS": threads,
+        "PYTHONUNBUFFERED": "1",
+    }
+    preexec = (lambda: os.sched_setaffinity(0, cores)) if hasattr(os, "sched_setaffinity") else None
+    # The child keeps its own copy of the log fd; ours is closed once it is spawned
+    with open(config_path.parent / "trial.log", "w") as log:
+        return subprocess.Popen(
+            [sys.executable, str(Path(__file__).resolve()), "--run-trial", str(config_path)],
+            cwd=BACKEND_DIR, env=env, stdout=log, stderr=subprocess.STDOUT, preexec_fn=preexec,
+        )
+
+
+def write_leaderboard(sweep_dir: Path) -> List[Dict]:
+    results = [json.loads(path.read_text()) for path in sorted(sweep_dir.glob(f"trial_*/{RESULT_FILE}"))]
+    failed = [path.parent.name for path in sorted(sweep_dir.glob("trial_*/trial.json"))
+              if not (path.parent / RESULT_FILE).exists()]
+    ranked = sorted(results, key=lambda r: (r["status"] == "completed", r["map50_95"], r["map50"]), reverse=True)
+
+    param_names = sorted({name for r in ranked for name in r["params"]})
+    lines = [
+        f"# Sweep leaderboard — {sweep_dir.name}",
+        "",
+        "| Rank | Trial | Status | mAP50-95 | mAP50 | Best epoch | Epochs | Wall (min) | "
+        + " | ".join(param_names) + " |",
+        "|" + "---|" * (8 + len(param_names)),
+    ]
+    for rank, r in enumerate(ranked, 1):
+        lines.append(
+            f"| {rank} | {r['trial']} | {r['status']} | {r['map50_95']:.4f} | {r['map50']:.4f} | "
+            f"{r['best_epoch']} | {r['epochs_run']} | {r['wall_seconds'] / 60:.1f} | "
+            + " | ".join(str(r["params"].get(name, "")) for name in param_names) + " |"
+        )
+    if failed:
+        lines += ["", f"Failed trials (see trial.log): {', '.join(failed)}"]
+
+    (sweep_dir / "leaderboard.md").write_text("\n".join(lines) + "\n")
+    (sweep_dir / "leaderboard.json").write_text(json.dumps({"ranked": ranked, "failed": failed}, indent=2))
+    return ranked
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parallel hyperparameter/augmentation sweep (CPU, offline)")
+    parser.add_argument("--run-trial", help=argparse.SUPPRESS)
+    parser.add_argument("--model", default="yolov8n.pt", help="Local starting weights")
+    parser.add_argument("--data", default="../datasets/merged_food_dataset/data.yaml")
+    parser.add_argument("--space", help="YAML search space (default: DEFAULT_SPACE)")
+    parser.add_argument("--mode", choices=["random", "grid"], default="random")
+    parser.add_argument("--trials", type=int, default=12, help="Random-search trial count")
+    parser.add_argument("--parallel", type=int, default=2, help="Trials running at once")
+    parser.add_argument("--threads", type=int, default=None, help="Cores per trial (default: cores / parallel)")
+    parser.add_argument("--epochs", type=int, default=5)
+    parser.add_argument("--batch", type=int, default=8)
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--fraction", type=float, default=1.0, help="Fraction of the train split per trial")
+    parser.add_argument("--warmup-epochs", type=int, default=1, help="Never prune before this many epochs")
+    parser.add_argument("--min-peers", type=int, default=2, help="Peers needed at an epoch before pruning")
+    parser.add_argument("--image-cache", action="store_true", help="Read images from the memmap store")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--name", default=None, help="Sweep folder name (reuse to continue a sweep)")
+    args = parser.parse_args()
+
+    if args.run_trial:
+        run_trial(Path(args.run_trial))
+        return
+
+    if not Path(args.model).exists():
+        print(f"❌ Model not found: {args.model} (sweeps run offline and never download weights)")
+        sys.exit(1)
+
+    space = DEFAULT_SPACE
+    if args.space:
+        with open(args.space, "r") as f:
+            space = yaml.safe_load(f)
+    params_list = grid_trials(space) if args.mode == "grid" else random_trials(space, args.trials, args.seed)
+
+    sweep_dir = DEFAULT_SWEEP_DIR / (args.name or datetime.now().strftime("sweep_%Y%m%d-%H%M%S"))
+    sweep_dir.mkdir(parents=True, exist_ok=True)
+
+    image_cache_dir = None
+    if args.image_cache:
+        from image_cache import build_store, dataset_image_dirs, default_cache_dir
+
+        image_cache_dir = default_cache_dir(args.data)
+        for img_path in dataset_image_dirs(args.data):
+            build_store(img_path, args.imgsz, image_cache_dir)
+
+    pending = []
+    for index, params in enumerate(params_list):
+        trial_dir = sweep_dir / f"trial_{index:03d}"
+        if (trial_dir / RESULT_FILE).exists():
+            continue  # finished in an earlier invocation of this sweep
+        trial_dir.mkdir(exist_ok=True)
+        pending.append((trial_dir, params))
+
+    slots = core_slots(args.parallel, args.threads)
+    print(f"🧪 Sweep {sweep_dir.name}: {len(pending)} trial(s) to run, {args.parallel} at a time, "
+          f"{len(slots[0])} core(s) each")
+
+    running: Dict[int, tuple] = {}
+    while pending or running:
+        for slot, cores in enumerate(slots):
+            if slot in running or not pending:
+                continue
+            trial_dir, params = pending.pop(0)
+            config = {
+                "model": str(Path(args.model).resolve()),
+                "data": str(Path(args.data).resolve()),
+                "epochs": args.epochs,
+                "batch": args.batch,
+                "imgsz": args.imgsz,
+                "fraction": args.fraction,
+                "warmup_epochs": args.warmup_epochs,
+                "min_peers": args.min_peers,
+                "seed": args.seed,
+                "image_cache_dir": str(image_cache_dir) if image_cache_dir else None,
+                "params": params,
+                "cores": cores,
+            }
+            config_path = trial_dir / "trial.json"
+            config_path.write_text(json.dumps(config, indent=2))
+            running[slot] = (launch_trial(config_path, cores), trial_dir)
+            print(f"🚀 {trial_dir.name} on cores {cores}: {params}")
+
+        time.sleep(1.0)
+        for slot, (process, trial_dir) in list(running.items()):
+            if process.poll() is None:
+                continue
+            del running[slot]
+            result_path = trial_dir / RESULT_FILE
+            if process.returncode != 0 or not result_path.exists():
+                print(f"❌ {trial_dir.name} failed (exit {process.returncode}), see {trial_dir / 'trial.log'}")
+                continue
+            result = json.loads(result_path.read_text())
+            print(f"✅ {trial_dir.name} {result['status']}: mAP50 {result['map50']:.4f}, "
+                  f"mAP50-95 {result['map50_95']:.4f} after {result['epochs_run']} epoch(s)")
+
+    ranked = write_leaderboard(sweep_dir)
+    print(f"🏆 Leaderboard: {sweep_dir / 'leaderboard.md'}")
+    for rank, result in enumerate(ranked[:5], 1):
+        print(f"   {rank}. {result['trial']} mAP50-95 {result['map50_95']:.4f} ({result['status']}) {result['params']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,18 @@ from fastapi.testclient import TestClient
 from PIL import Image
 import io
 
+
+def textured_jpeg(size=(640, 640)):
+    """A JPEG with enough detail and contrast to pass the upload quality gate"""
+    import numpy as np
+
+    rng = np.random.default_rng(0)
+    blocks = rng.integers(40, 220, (size[1] // 20, size[0] // 20, 3))
+    img_bytes = io.BytesIO()
+    Image.fromarray(np.kron(blocks, np.ones((20, 20, 1))).astype(np.uint8)).save(img_bytes, format='JPEG')
+    img_bytes.seek(0)
+    return img_bytes
+
 def test_root_endpoint(client):
     """Test root endpoint returns correct info"""
     response = client.get("/")
@@ -25,12 +37,9 @@ def test_health_endpoint(client):
 
 def test_detect_endpoint_with_valid_image(client):
     """Test detection endpoint with valid image"""
-    # Create a simple test image
-    img = Image.new('RGB', (640, 640), color='white')
-    img_bytes = io.BytesIO()
-    img.save(img_bytes, format='JPEG')
-    img_bytes.seek(0)
-    
+    # A textured image, so a loaded model gets past the quality gate
+    img_bytes = textured_jpeg()
+
     response = client.post(
         "/api/detect",
         files={"image": ("test.jpg", img_bytes, "image/jpeg")}
@@ -45,6 +54,31 @@ def test_detect_endpoint_with_valid_image(client):
     assert isinstance(data["confidence"], list)
     assert isinstance(data["processing_time"], float)
 
+def test_detect_endpoint_rejects_low_quality_image():
+    """Test a loaded model never sees a blank upload: 422 with reason, hint and stats"""
+    from fastapi import FastAPI
+    from detection_api import create_detection_router
+    from detection_pipeline import DetectionPipeline
+    from image_quality import ImageQualityFilter
+
+    # Only the state detect() needs before inference; the model must not be called
+    pipeline = DetectionPipeline.__new__(DetectionPipeline)
+    pipeline.yolo_model = object()
+    pipeline.quality_filter = ImageQualityFilter()
+    app = FastAPI()
+    app.include_router(create_detection_router(pipeline, mock_fallback=True))
+
+    img_bytes = io.BytesIO()
+    Image.new('RGB', (640, 640), color='white').save(img_bytes, format='JPEG')
+    img_bytes.seek(0)
+    response = TestClient(app).post("/api/detect", files={"image": ("test.jpg", img_bytes, "image/jpeg")})
+
+    assert response.status_code == 422
+    detail = response.json()["detail"]
+    assert detail["reason"] == "overexposed"
+    assert detail["message"]
+    assert detail["stats"]["bright_fraction"] > 0.95
+
 def test_detect_endpoint_without_image(client):
     """Test detection endpoint without image"""
     response = client.post("/api/detect")
@@ -94,3 +128,151 @@ def test_recipe_endpoint_without_ingredients(client):
     response = client.post("/api/recipes", json=request_data)
     assert response.status_code == 422  # Validation error
 
+
+def test_detect_burst_endpoint_with_frames(client):
+    """Test burst detection endpoint with a few frames"""
+    files = []
+    for color in ['white', 'gray', 'black']:
+        img = Image.new('RGB', (320, 240), color=color)
+        img_bytes = io.BytesIO()
+        img.save(img_bytes, format='JPEG')
+        img_bytes.seek(0)
+        files.append(("frames", (f"{color}.jpg", img_bytes, "image/jpeg")))
+
+    response = client.post("/api/detect/burst", files=files)
+
+    assert response.status_code == 200
+    data = response.json()
+    assert len(data["ingredients"]) == len(data["confidence"]) == len(data["frame_counts"])
+    assert "keyframes" in data
+    assert "frames_received" in data
+
+def test_detect_burst_endpoint_without_frames(client):
+    """Test burst detection endpoint without frames or video"""
+    response = client.post("/api/detect/burst")
+    assert response.status_code == 400
+
+def test_live_detection_websocket_without_model(client):
+    """Test live detection channel reports an error when no model is loaded"""
+    from main import yolo_model
+
+    if yolo_model is not None:
+        pytest.skip("YOLO model is loaded")
+
+    with client.websocket_connect("/ws/detect") as websocket:
+        message = websocket.receive_json()
+        assert "error" in message
+
+def test_metrics_endpoint(client):
+    """Test Prometheus metrics endpoint exposes detection stage histograms"""
+    from metrics import METRICS_AVAILABLE
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    if METRICS_AVAILABLE:
+        assert "detect_stage_seconds" in response.text
+        assert 'queue_depth{queue="inference"}' in response.text
+
+def test_profiling_admin_disabled_without_token(client, monkeypatch):
+    """Test profiling surface is hidden unless ADMIN_TOKEN is configured"""
+    monkeypatch.delenv("ADMIN_TOKEN", raising=False)
+    response = client.get("/admin/profiling")
+    assert response.status_code == 404
+
+def test_profiling_captures_armed_request(client, monkeypatch, tmp_path):
+    """Test arming the profiler captures a detect request as speedscope JSON"""
+    import profiling
+
+    monkeypatch.setenv("ADMIN_TOKEN", "secret")
+    monkeypatch.setattr(profiling, "PROFILE_DIR", str(tmp_path))
+    headers = {"X-Admin-Token": "secret"}
+
+    assert client.post("/admin/profiling/arm", json={"mode": "cprofile"}).status_code == 403
+    response = client.post("/admin/profiling/arm", json={"mode": "cprofile", "count": 1}, headers=headers)
+    assert response.status_code == 200
+
+    client.post("/api/detect", files={"image": ("test.jpg", textured_jpeg((64, 64)), "image/jpeg")})
+
+    status = client.get("/admin/profiling", headers=headers).json()
+    assert status["armed"] is None
+    speedscope = [name for name in status["profiles"] if name.endswith(".speedscope.json")]
+    assert len(speedscope) == 1
+
+    download = client.get(f"/admin/profiling/profiles/{speedscope[0]}", headers=headers)
+    assert download.status_code == 200
+    assert download.json()["profiles"][0]["type"] == "sampled"
+
+
+def test_recipe_job_returns_id_then_result(client):
+    """Test the async recipe job API: submit returns at once, polling yields the recipe"""
+    import time
+
+    request_data = {
+        "ingredients": ["chicken", "tomato"],
+        "mealCraving": "stir fry",
+        "dietaryRestrictions": [],
+        "preferredCuisine": "Any"
+    }
+    response = client.post("/api/recipes/jobs", json=request_data)
+    assert response.status_code == 202
+    job_id = response.json()["id"]
+    assert response.json()["status"] in ["queued", "running", "completed"]
+
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        job = client.get(f"/api/recipes/jobs/{job_id}").json()
+        if job["status"] in ["completed", "failed"]:
+            break
+        time.sleep(0.1)
+    assert job["status"] == "completed"
+    assert job["result"]["title"]
+
+    assert client.get("/api/recipes/jobs/does-not-exist").status_code == 404
+
+def test_recipe_job_workers_follow_app_lifespan():
+    """Test the full app starts recipe job workers on startup and stops them on shutdown"""
+    from main import app
+    import recipe_api
+
+    recipe_api.recipe_jobs.stop()
+    with TestClient(app):
+        assert recipe_api.recipe_jobs._threads
+    assert not recipe_api.recipe_jobs._threads
+
+
+def test_recipe_variants_endpoint(client):
+    """Test the multi-variant recipe endpoint returns a list and bounds the count"""
+    request_data = {
+        "ingredients": ["chicken", "broccoli"],
+        "mealCraving": "stir fry",
+        "count": 3
+    }
+    response = client.post("/api/recipes/variants", json=request_data)
+    assert response.status_code == 200
+    data = response.json()
+    assert isinstance(data, list) and len(data) >= 1
+    assert all("title" in recipe and "instructions" in recipe for recipe in data)
+
+    response = client.post("/api/recipes/variants", json={**request_data, "count": 50})
+    assert response.status_code == 422
+
+
+def test_detect_only_profile_skips_recipe_stack():
+    """Test the detect-only app serves detection without importing ollama or the recipe routes"""
+    import os
+    import subprocess
+    import sys
+
+    script = (
+        "import sys\n"
+        "from fastapi.testclient import TestClient\n"
+        "from app_factory import create_app\n"
+        "client = TestClient(create_app('detect-only'))\n"
+        "assert not {'ollama', 'recipe_api', 'recipe_jobs'} & set(sys.modules), sorted(sys.modules)\n"
+        "assert client.get('/health').json()['profile'] == 'detect-only'\n"
+        "assert client.post('/api/recipes', json={}).status_code == 404\n"
+    )
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run([sys.executable, "-c", script], cwd=backend_dir, capture_output=True, text=True,
+                            timeout=120)
+    assert result.returncode == 0, result.stderr[-2000:]
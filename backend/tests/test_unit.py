@@ -35,3 +35,583 @@ def test_food_mapping_consistency():
     for key in YOLO_TO_FOOD_MAPPING.keys():
         assert key == key.lower(), f"Key {key} is not lowercase"
 
+
+def test_resolution_selector_steps_down_under_load():
+    """Test that adaptive imgsz drops resolution as the queue grows"""
+    from adaptive_resolution import ResolutionSelector
+
+    calibration = [
+        {"imgsz": 640, "map50": 0.80},
+        {"imgsz": 512, "map50": 0.78},
+        {"imgsz": 416, "map50": 0.76},
+        {"imgsz": 320, "map50": 0.60},  # Outside accuracy bounds
+    ]
+    selector = ResolutionSelector(calibration, max_map50_drop=0.05, queue_step=2)
+
+    assert selector.sizes == [640, 512, 416]
+    assert selector.choose(0) == 640
+    assert selector.choose(2) == 512
+    assert selector.choose(4) == 416
+    assert selector.choose(100) == 416
+
+def test_extract_ingredients_keeps_best_confidence():
+    """Test vectorized post-processing dedups by class and orders by confidence"""
+    import numpy as np
+    from postprocess import extract_ingredients
+
+    names = {0: 'beef', 1: 'cheese', 2: 'chair'}
+    class_ids = np.array([1, 0, 1, 2])
+    confidences = np.array([0.30, 0.55, 0.90, 0.95], dtype=np.float32)
+
+    ingredients, scores = extract_ingredients(class_ids, confidences, names, YOLO_TO_FOOD_MAPPING)
+
+    assert ingredients == ['Cheese', 'Beef']
+    assert scores == [0.9, 0.55]
+
+def test_keyframe_sampler_skips_near_duplicates():
+    """Test that near-identical frames are not treated as keyframes"""
+    import numpy as np
+    from burst_detection import KeyframeSampler, keyframe_batches
+
+    dark = np.zeros((120, 160, 3), dtype=np.uint8)
+    bright = np.full((120, 160, 3), 200, dtype=np.uint8)
+    frames = [dark, dark.copy(), bright, bright.copy(), dark]
+
+    stats = {}
+    batches = list(keyframe_batches(iter(frames), KeyframeSampler(), batch_size=2, stats=stats))
+
+    assert stats == {"frames": 5, "keyframes": 3}
+    assert [len(batch) for batch in batches] == [2, 1]
+
+def test_temporal_aggregator_combines_frames():
+    """Test that burst aggregation keeps best confidence and frame support"""
+    from burst_detection import TemporalAggregator
+
+    aggregator = TemporalAggregator()
+    aggregator.add(['Milk', 'Cheese'], [0.4, 0.7])
+    aggregator.add(['Milk'], [0.8])
+
+    assert aggregator.result() == (['Milk', 'Cheese'], [0.8, 0.7], [2, 1])
+    assert aggregator.result(min_support=2) == (['Milk'], [0.8], [2])
+
+def test_latest_frame_slot_drops_stale_frames():
+    """Test that only the newest pending frame is kept"""
+    import asyncio
+    from live_detection import LatestFrameSlot
+
+    async def scenario():
+        slot = LatestFrameSlot()
+        slot.put(b"1")
+        slot.put(b"2")
+        slot.put(b"3")
+        latest = await slot.get()
+        slot.close()
+        return latest, await slot.get(), slot.dropped
+
+    assert asyncio.run(scenario()) == ((3, b"3"), None, 2)
+
+def test_ingredient_tracker_is_stable_across_frames():
+    """Test hysteresis keeps an ingredient through a single missed frame"""
+    from live_detection import IngredientTracker
+
+    tracker = IngredientTracker(alpha=0.5, enter=0.3, exit=0.1)
+
+    assert tracker.update(['Milk'], [0.8])[0] == ['Milk']
+    assert tracker.update([], [])[0] == ['Milk']        # EMA 0.2, still visible
+    assert tracker.update(['Beef'], [0.2])[0] == ['Milk']  # Beef below enter threshold
+    tracker.update([], [])
+    assert tracker.update([], [])[0] == []              # Milk decayed below exit
+
+def test_remap_label_maps_and_drops_classes():
+    """Test source class ids are rewritten and unmapped boxes dropped"""
+    from merge_datasets import remap_label
+
+    text = "0 0.5 0.5 0.2 0.2\n1 0.1 0.1 0.1 0.1\n3 0.3 0.3 0.1 0.1"
+    assert remap_label(text, {0: 4, 3: 4}) == ("4 0.5 0.5 0.2 0.2\n4 0.3 0.3 0.1 0.1\n", 1)
+    assert remap_label("", {0: 4}) == ("", 0)
+
+def test_select_outputs_dedupes_across_sources():
+    """Test identical images from two sources are merged once and empty ones skipped"""
+    from merge_datasets import select_outputs
+
+    config = {"sources": {"a": {}, "b": {}}, "val_fraction": 0.2, "drop_empty": True}
+    records = {
+        "a": [{"name": "a_train_1.jpg", "sha": "00ff", "label": "0 0.5 0.5 0.1 0.1\n", "dropped_boxes": 0}],
+        "b": [
+            {"name": "b_train_1.jpg", "sha": "00ff", "label": "1 0.5 0.5 0.1 0.1\n", "dropped_boxes": 0},
+            {"name": "b_train_2.jpg", "sha": "ffff", "label": "", "dropped_boxes": 2},
+        ],
+    }
+
+    selected, stats = select_outputs(config, records)
+    assert list(selected) == ["a_train_1.jpg"]
+    assert selected["a_train_1.jpg"]["split"] == "val"
+    assert stats == {"images": 3, "duplicates": 1, "empty": 1, "dropped_boxes": 2}
+
+def test_image_store_round_trip(tmp_path):
+    """Test images read back from the memmap store match a fresh decode"""
+    import cv2
+    import numpy as np
+    from image_cache import MemmapImageStore, build_store, resize_long_side
+
+    image_dir = tmp_path / "train" / "images"
+    image_dir.mkdir(parents=True)
+    rng = np.random.default_rng(0)
+    for name, shape in (("a.png", (40, 80, 3)), ("b.png", (64, 64, 3))):
+        cv2.imwrite(str(image_dir / name), rng.integers(0, 255, shape, dtype=np.uint8))
+
+    store = MemmapImageStore(build_store(str(image_dir), 32, tmp_path / "cache", workers=1))
+    for name in ("a.png", "b.png"):
+        path = str((image_dir / name).resolve())
+        im, hw0, hw = store.get(path)
+        expected = resize_long_side(cv2.imread(path), 32)
+        assert np.array_equal(im, expected)
+        assert hw0 == cv2.imread(path).shape[:2] and hw == expected.shape[:2]
+    assert store.get("missing.png") is None
+
+def test_cached_dataset_falls_back_to_disk(tmp_path, monkeypatch):
+    """Test buffered and unstored images go through the parent load_image of any pinned release"""
+    from pathlib import Path
+
+    import cv2
+    import numpy as np
+    import image_cache
+    from image_cache import CachedYOLODataset, MemmapImageStore, build_store
+    from ultralytics.data.dataset import YOLODataset
+
+    image_dir = tmp_path / "images"
+    image_dir.mkdir()
+    rng = np.random.default_rng(0)
+    for name in ("a.png", "b.png"):
+        cv2.imwrite(str(image_dir / name), rng.integers(0, 255, (40, 80, 3), dtype=np.uint8))
+    store = MemmapImageStore(build_store(str(image_dir), 32, tmp_path / "cache", workers=1))
+    store.files.pop(str((image_dir / "b.png").resolve()))
+
+    # Just the state BaseDataset.load_image reads, without scanning labels
+    dataset = CachedYOLODataset.__new__(CachedYOLODataset)
+    dataset.image_store = store
+    dataset.im_files = [str(image_dir / "a.png"), str(image_dir / "b.png")]
+    dataset.npy_files = [Path(f).with_suffix(".npy") for f in dataset.im_files]
+    dataset.ims, dataset.im_hw0, dataset.im_hw = [None, None], [None, None], [None, None]
+    dataset.imgsz, dataset.augment, dataset.channels, dataset.prefix = 32, False, 3, ""
+    dataset.cv2_flag = cv2.IMREAD_COLOR
+
+    im, hw0, hw = dataset.load_image(1)  # not in the store: decoded from disk
+    assert hw0 == (40, 80) and hw == (16, 32) and im.shape[:2] == hw
+    dataset.ims[0], dataset.im_hw0[0], dataset.im_hw[0] = im, hw0, hw
+    assert dataset.load_image(0)[0] is im  # already in the mosaic buffer
+
+    # 8.3.x signature: load_image(self, i, rect_mode=True)
+    calls = []
+    monkeypatch.setattr(YOLODataset, "load_image", lambda self, i, rect_mode=True: calls.append((i, rect_mode)))
+    monkeypatch.setattr(image_cache, "LOAD_IMAGE_RESIZE_SHORT", False)
+    dataset.load_image(1, rect_mode=False)
+    assert calls == [(1, False)]
+
+def test_find_resume_checkpoint_prefers_latest_unfinished(tmp_path):
+    """Test finished (stripped) checkpoints are ignored and the furthest resumable one wins"""
+    import torch
+    from train_orchestrator import find_resume_checkpoint
+
+    torch.save({"epoch": -1, "optimizer": None}, tmp_path / "last.pt")  # stripped by final_eval
+    assert find_resume_checkpoint(tmp_path, epochs=10) is None
+
+    torch.save({"epoch": 3, "optimizer": {"state": {}}}, tmp_path / "resume.pt")
+    assert find_resume_checkpoint(tmp_path, epochs=10) == tmp_path / "resume.pt"
+
+    torch.save({"epoch": 5, "optimizer": {"state": {}}}, tmp_path / "last.pt")
+    assert find_resume_checkpoint(tmp_path, epochs=10) == tmp_path / "last.pt"
+    assert find_resume_checkpoint(tmp_path, epochs=6) == tmp_path / "resume.pt"  # epoch 5 was the last
+
+def test_sweep_median_stopping_rule():
+    """Test trials are pruned only after warmup, with enough peers, when below the median"""
+    from sweep import should_prune
+
+    assert should_prune(0.2, [0.3, 0.5], epoch=3, warmup_epochs=1, min_peers=2)
+    assert not should_prune(0.4, [0.3, 0.5], epoch=3, warmup_epochs=1, min_peers=2)
+    assert not should_prune(0.1, [0.3, 0.5], epoch=1, warmup_epochs=1, min_peers=2)  # still warming up
+    assert not should_prune(0.1, [0.3], epoch=3, warmup_epochs=1, min_peers=2)       # too few peers
+
+def test_sweep_trial_generation():
+    """Test grid search covers every combination and random search is reproducible"""
+    from sweep import grid_trials, random_trials
+
+    grid = grid_trials({"mosaic": [0.0, 0.5], "scale": [0.1, 0.2, 0.3]})
+    assert len(grid) == 6 and {"mosaic": 0.5, "scale": 0.3} in grid
+
+    space = {"mosaic": [0.0, 0.5], "lr0": {"low": 0.0001, "high": 0.01, "log": True}}
+    trials = random_trials(space, 5, seed=1)
+    assert trials == random_trials(space, 5, seed=1)
+    assert all(0.0001 <= t["lr0"] <= 0.01 for t in trials)
+
+def test_evaluator_ap_matches_ultralytics_val():
+    """Test AP of a curve stopping below recall 1 uses val()'s envelope (slope down to (1, 0))"""
+    import numpy as np
+    from ultralytics.utils.metrics import compute_ap as ultralytics_ap
+    from evaluate import compute_ap
+
+    recall = np.array([0.2, 0.5, 0.8])
+    precision = np.array([1.0, 0.95, 0.9])
+    x = np.linspace(0, 1, 101)
+    y = np.interp(x, [0.0, 0.2, 0.5, 0.8, 1.0], [1.0, 1.0, 0.95, 0.9, 0.0])
+    assert compute_ap(recall, precision) == pytest.approx(float(((y[1:] + y[:-1]) / 2 * np.diff(x)).sum()))
+
+    reference, _, mrec = ultralytics_ap(recall, precision)
+    if len(mrec) == len(recall) + 2:  # 8.0-8.3 sentinels, as pinned for serving and CI
+        assert compute_ap(recall, precision) == pytest.approx(float(reference))
+
+def test_evaluator_rejects_empty_split(monkeypatch):
+    """Test an empty split fails with a clear error instead of scoring empty arrays"""
+    import evaluate
+
+    assert evaluate.collect_predictions("model.pt", [], cache_dir=None) == ([], 0)
+    monkeypatch.setattr(evaluate, "load_ground_truth", lambda data, split: ([], [], {0: "Tomato"}))
+    with pytest.raises(ValueError, match="No images"):
+        evaluate.evaluate("model.pt", "data.yaml", cache_dir=None)
+
+def test_distill_student_config_is_narrower(tmp_path):
+    """Test the generated student yaml builds a narrower YOLOv8 with the dataset's classes"""
+    from ultralytics.nn.tasks import DetectionModel
+    from distill import student_config
+
+    def params(model):
+        return sum(p.numel() for p in model.parameters())
+
+    student = DetectionModel(student_config(0.125, 11, tmp_path / "student.yaml"), verbose=False)
+    nano = DetectionModel(student_config(0.25, 11, tmp_path / "nano.yaml"), verbose=False)
+    assert student.yaml["nc"] == 11
+    assert params(student) < params(nano) / 2
+
+def test_evaluator_matches_greedily_by_iou():
+    """Test each label is matched once, to the best-overlapping prediction of its class"""
+    import numpy as np
+    from evaluate import ap_per_class, box_iou, match_predictions
+
+    gt = np.array([[0.1, 0.1, 0.5, 0.5], [0.6, 0.6, 0.9, 0.9]])
+    gt_cls = np.array([0, 1])
+    preds = np.array([[0.1, 0.1, 0.5, 0.5], [0.12, 0.1, 0.5, 0.5], [0.6, 0.6, 0.9, 0.9], [0.6, 0.6, 0.9, 0.9]])
+    pred_cls = np.array([0, 0, 2, 1])
+
+    assert np.allclose(np.diag(box_iou(gt, gt)), 1.0)
+    tp = match_predictions(preds, pred_cls, gt, gt_cls)
+    assert tp[:, 0].tolist() == [True, False, False, True]  # duplicate and wrong class are misses
+
+    stats = ap_per_class(tp, np.array([0.9, 0.8, 0.7, 0.6]), pred_cls, gt_cls, nc=3)
+    assert np.allclose(stats["ap"][:2, 0], 1.0, atol=0.01)
+    assert stats["n_labels"].tolist() == [1, 1, 0]
+
+def test_class_thresholds_filter_detections():
+    """Test per-class cutoffs drop weak boxes and the model runs at the lowest cutoff"""
+    import numpy as np
+    from class_thresholds import ClassThresholds, pick_threshold
+    from postprocess import extract_ingredients
+
+    names = {0: 'beef', 1: 'milk', 2: 'tomato'}
+    thresholds = ClassThresholds({'beef': 0.5, 'milk': 0.2}, names, default=0.1)
+    assert thresholds.cutoffs.tolist() == pytest.approx([0.5, 0.2, 0.1])
+    assert thresholds.model_conf == pytest.approx(0.1)
+
+    class_ids = np.array([0, 1, 2], dtype=np.int64)
+    confidences = np.array([0.4, 0.3, 0.15], dtype=np.float32)
+    ingredients, _ = extract_ingredients(class_ids, confidences, names, YOLO_TO_FOOD_MAPPING, thresholds.cutoffs)
+    assert ingredients == ['Milk', 'Tomato']
+
+    conf = np.linspace(0, 1, 5)
+    precision = np.array([0.5, 0.7, 0.9, 1.0, 1.0])
+    recall = np.array([1.0, 0.9, 0.6, 0.2, 0.0])
+    assert pick_threshold(conf, precision, recall) == 1
+    assert pick_threshold(conf, precision, recall, min_precision=0.85) == 2
+
+def test_select_artifact_matches_batch_and_size(tmp_path):
+    """Test the export manifest picks fixed shapes when they fit and dynamic ones otherwise"""
+    import json
+    from export_onnx import select_artifact
+
+    def entry(variant, file, precision="fp32", dynamic=True, passed=True):
+        return {"variant": variant, "file": file, "format": file.rsplit(".", 1)[1], "precision": precision,
+                "imgsz": 640, "dynamic_batch": dynamic, "dynamic_shape": dynamic, "parity_passed": passed}
+
+    manifest = tmp_path / "manifest.json"
+    manifest.write_text(json.dumps({"artifacts": [
+        entry("static", "m_static640.onnx", dynamic=False),
+        entry("dynamic", "m_dynamic.onnx"),
+        entry("fp16", "m_dynamic_fp16.onnx", precision="fp16"),
+        entry("ort", "m_dynamic.ort", passed=False),
+    ]}))
+
+    assert select_artifact(str(manifest), batch=1, imgsz=640) == str(tmp_path / "m_static640.onnx")
+    assert select_artifact(str(manifest), batch=4, imgsz=640) == str(tmp_path / "m_dynamic.onnx")
+    assert select_artifact(str(manifest), batch=1, imgsz=416, precision="fp16") == str(tmp_path / "m_dynamic_fp16.onnx")
+    assert select_artifact(str(manifest), batch=4, imgsz=640, formats=("ort",)) is None  # failed parity
+
+def test_openvino_postprocess_matches_single_label_nms(monkeypatch):
+    """Test the OpenVINO backend's NMS keeps one box per overlap and stays off unless requested"""
+    import numpy as np
+    from openvino_backend import load_detector_from_env, postprocess
+
+    # Raw (4 + nc, anchors) output: two overlapping class-0 boxes, one class-1 box, one below conf
+    output = np.array([
+        [50, 52, 200, 300],    # cx
+        [50, 50, 200, 300],    # cy
+        [40, 40, 40, 40],      # w
+        [40, 40, 40, 40],      # h
+        [0.9, 0.6, 0.1, 0.05], # class 0
+        [0.1, 0.2, 0.8, 0.02], # class 1
+    ], dtype=np.float32)
+    class_ids, confidences = postprocess(output, conf=0.1)
+    assert class_ids.tolist() == [0, 1]
+    assert confidences.tolist() == pytest.approx([0.9, 0.8])
+
+    monkeypatch.delenv("DETECTION_BACKEND", raising=False)
+    assert load_detector_from_env({0: 'beef'}) is None
+
+def test_thread_config_follows_cgroup_quota(tmp_path, monkeypatch):
+    """Test thread counts come from the cgroup CPU quota, not the host core count"""
+    from cpu_config import cgroup_cpu_limit, parse_cpu_list, resolve_thread_config
+
+    (tmp_path / "sys/fs/cgroup").mkdir(parents=True)
+    (tmp_path / "sys/fs/cgroup/cpu.max").write_text("150000 100000\n")
+    assert cgroup_cpu_limit(str(tmp_path)) == pytest.approx(1.5)
+    (tmp_path / "sys/fs/cgroup/cpu.max").write_text("max 100000\n")
+    assert cgroup_cpu_limit(str(tmp_path)) is None
+
+    for var in ("INFERENCE_THREADS", "INFERENCE_INTEROP_THREADS", "CPU_AFFINITY"):
+        monkeypatch.delenv(var, raising=False)
+    config = resolve_thread_config(1.0, list(range(16)))
+    assert (config.intra_op, config.inter_op, config.affinity) == (1, 1, None)
+
+    monkeypatch.setenv("INFERENCE_THREADS", "4")
+    monkeypatch.setenv("CPU_AFFINITY", "2-3,8")
+    config = resolve_thread_config(None, list(range(8)))
+    assert config.affinity == [2, 3]
+    assert config.intra_op == 2  # no more threads than pinned cores
+    assert parse_cpu_list("0,2-3") == [0, 2, 3]
+
+def test_recipe_job_store_survives_restart(tmp_path):
+    """Test jobs whose worker stopped are re-queued and results expire after their TTL"""
+    import time
+    from recipe_jobs import JobStore, RecipeJobQueue
+
+    db = str(tmp_path / "jobs.sqlite3")
+    store = JobStore(db, lease_seconds=0.2)
+    job_id = store.create({"mealCraving": "pasta"})
+    assert store.claim()["id"] == job_id
+    assert store.claim() is None  # already running
+
+    # Another live process sharing the file leaves the leased job alone...
+    assert JobStore(db).requeue_stale() == 0
+    assert store.heartbeat() == 1
+    time.sleep(0.3)  # ...until the owner stops renewing its lease
+
+    # A new process over the same file picks the job up again
+    queue = RecipeJobQueue(JobStore(db), lambda request: {"title": request["mealCraving"].title()},
+                           workers=2, ttl=60, poll_interval=0.05)
+    queue.start()
+    try:
+        deadline = time.time() + 5
+        while store.get(job_id)["status"] != "completed" and time.time() < deadline:
+            time.sleep(0.02)
+        assert store.get(job_id)["result"] == {"title": "Pasta"}
+    finally:
+        queue.stop()
+    assert not store.finish(job_id, ttl=60, result={})  # the original owner lost the lease
+
+    failing = RecipeJobQueue(JobStore(db), lambda request: 1 / 0, workers=1, ttl=0, poll_interval=0.05)
+    failed_id = failing.submit({})
+    deadline = time.time() + 5
+    while store.count("queued") + store.count("running") and time.time() < deadline:
+        time.sleep(0.02)
+    failing.stop()
+    assert store.get(failed_id) is None  # failed with a zero TTL, so already expired
+
+def test_recipe_job_heartbeat_keeps_lease(tmp_path):
+    """Test a job outliving its lease is not re-queued while its worker's heartbeat runs"""
+    import time
+    from recipe_jobs import JobStore, RecipeJobQueue
+
+    db = str(tmp_path / "jobs.sqlite3")
+    queue = RecipeJobQueue(JobStore(db, lease_seconds=0.15), lambda request: time.sleep(0.6) or {},
+                           workers=1, ttl=60, poll_interval=0.05)
+    other = JobStore(db)
+    job_id = queue.submit({})
+    try:
+        deadline = time.time() + 5
+        while other.get(job_id)["status"] != "completed" and time.time() < deadline:
+            assert other.requeue_stale() == 0
+            time.sleep(0.05)
+        assert other.get(job_id)["status"] == "completed"
+    finally:
+        queue.stop()
+
+def test_recipe_index_scores_overlap_and_filters_diet(tmp_path):
+    """Test the recipe store matches on craving and ingredients and respects dietary restrictions"""
+    from recipe_index import RecipeIndex
+
+    def recipe(title, ingredients, tags):
+        return {
+            "title": title, "description": "", "prep_time": 10, "cook_time": 20, "servings": 2,
+            "difficulty": "Easy",
+            "ingredients": [{"name": name, "amount": "1", "unit": None, "notes": None} for name in ingredients],
+            "instructions": [{"step": i, "text": "Cook", "time": None, "temperature": None, "tips": None}
+                             for i in range(1, 4)],
+            "tags": tags, "nutrition_info": None,
+        }
+
+    store = str(tmp_path / "recipes.json")
+    index = RecipeIndex(store, min_score=0.7)
+    assert index.add({"ingredients": ["tomato", "cheese"], "mealCraving": "pasta",
+                      "dietaryRestrictions": ["vegetarian"], "preferredCuisine": "Italian"},
+                     recipe("Tomato Pasta", ["Tomatoes", "Parmesan cheese", "Spaghetti"], ["Italian"]))
+    assert index.add({"ingredients": ["chicken", "broccoli"], "mealCraving": "stir fry",
+                      "dietaryRestrictions": [], "preferredCuisine": "Any"},
+                     recipe("Chicken Stir Fry", ["Chicken breast", "Broccoli", "Soy sauce"], ["Asian"]))
+    assert not index.add({"ingredients": ["milk"], "mealCraving": "tea", "dietaryRestrictions": []},
+                         recipe("Tea", ["Milk"], []) | {"ingredients": []})  # too thin to keep
+
+    reloaded = RecipeIndex(store, min_score=0.7)
+    match = reloaded.lookup({"ingredients": ["tomatoes", "cheese"], "mealCraving": "Pasta",
+                             "dietaryRestrictions": [], "preferredCuisine": "Any"})
+    assert match is not None and match.recipe["title"] == "Tomato Pasta"
+
+    # Generated without a vegan restriction, so never served to a vegan request
+    assert reloaded.lookup({"ingredients": ["tomato"], "mealCraving": "pasta",
+                            "dietaryRestrictions": ["vegan"], "preferredCuisine": "Any"}) is None
+    # Shares ingredients but not the dish
+    assert reloaded.lookup({"ingredients": ["chicken"], "mealCraving": "soup",
+                            "dietaryRestrictions": [], "preferredCuisine": "Any"}) is None
+
+def test_recipe_index_batches_saves(tmp_path):
+    """Test save=False defers the store write until save(), as seeding does once per file"""
+    import os
+    from recipe_index import RecipeIndex
+    from recipe_prompts import BUILTIN_EXEMPLARS
+
+    store = str(tmp_path / "recipes.json")
+    index = RecipeIndex(store)
+    for craving in ("pasta", "soup", "salad"):
+        assert index.add({"ingredients": ["tomato"], "mealCraving": craving, "dietaryRestrictions": []},
+                         BUILTIN_EXEMPLARS["main"], save=False)
+    assert not os.path.exists(store)
+
+    index.save()
+    assert len(RecipeIndex(store)) == 3
+
+def test_prompt_exemplar_matches_dish_type():
+    """Test the prompt exemplar follows the requested dish and prefers validated stored recipes"""
+    import json
+    from recipe_index import RecipeIndex
+    from recipe_prompts import BUILTIN_EXEMPLARS, dish_type, select_exemplar
+
+    exemplar, source = select_exemplar("Chocolate cake")
+    assert source == "builtin" and json.loads(exemplar)["title"] == BUILTIN_EXEMPLARS["dessert"]["title"]
+    assert "null" not in exemplar and ": " not in exemplar  # compact
+    assert json.loads(select_exemplar("chicken noodle stir-fry")[0])["title"] == BUILTIN_EXEMPLARS["stir_fry"]["title"]
+    assert dish_type("fried spaghetti noodle") == "pasta"  # two pasta keywords beat one stir-fry keyword
+    assert dish_type("beef tacos") == "main"
+
+    index = RecipeIndex(None)
+    index.add({"ingredients": ["beef"], "mealCraving": "beef tacos", "dietaryRestrictions": []},
+              {**BUILTIN_EXEMPLARS["main"], "title": "Beef Tacos"})
+    exemplar, source = select_exemplar("tacos", index)
+    assert source == "stored" and json.loads(exemplar)["title"] == "Beef Tacos"
+    assert select_exemplar("lemon tart", index)[1] == "builtin"
+
+def test_recipe_variants_parse_keeps_valid_distinct():
+    """Test one LLM answer is split into validated, distinct recipes"""
+    import json
+    from main import _parse_recipe_variants
+
+    def recipe(title):
+        return {"title": title, "description": "", "prep_time": 5, "cook_time": 10, "servings": 2,
+                "difficulty": "Easy", "ingredients": [{"name": "Tomato", "amount": "2"}],
+                "instructions": [{"step": 1, "text": "Slice"}], "tags": []}
+
+    answer = "Here you go:\n" + json.dumps([
+        recipe("Tomato Salad"), recipe("tomato salad"), {"title": "Broken", "ingredients": [{"amount": "1"}]},
+        recipe("Roast Tomatoes"),
+    ])
+    assert [r.title for r in _parse_recipe_variants(answer, 4)] == ["Tomato Salad", "Roast Tomatoes"]
+    # A single object is still accepted, nested arrays notwithstanding
+    assert len(_parse_recipe_variants(json.dumps(recipe("Soup")), 3)) == 1
+
+def test_ingredient_canonicalization():
+    """Test free-form ingredient names collapse onto one vocabulary entry"""
+    from ingredients import canonicalize, canonicalize_all
+    from main import RecipeRequest
+
+    assert {canonicalize(n) for n in ["tomatoes", "Tomato", "cherry tomatoes", "tomatoe"]} == {"Tomato"}
+    assert canonicalize("Brocolli") == "Broccoli"  # typo, via trigrams
+    assert canonicalize("boneless skinless chicken breasts") == "Chicken Breast"
+    assert canonicalize("creamy peanut butter") == "Peanut Butter"  # not folded into Butter
+    assert canonicalize("fresh basil") == "Basil"  # unknown, kept without descriptors
+    assert canonicalize_all(["Cheddar", "cheese", "", "2 eggs"]) == ["Cheese", "Egg"]
+
+    request = RecipeRequest(ingredients=["tomatoes", "Cherry Tomato", "chicken"], mealCraving="pasta")
+    assert request.ingredients == ["Tomato", "Chicken"]
+
+def test_ingredient_canonicalization_keeps_different_ingredients_apart():
+    """Test fuzzy and suffix matching do not fold other foods in, and unknown plurals dedupe"""
+    from ingredients import canonicalize, canonicalize_all
+
+    assert canonicalize("cheesecake") == "Cheesecake"  # shares most trigrams with Cheese, far longer
+    assert canonicalize("chocolate milk") == "Chocolate Milk"  # flavored, not plain Milk
+    assert canonicalize("chees") == "Cheese"  # a typo of similar length still matches
+    assert canonicalize_all(["beans", "Bean", "black beans"]) == ["Bean", "Black Bean"]
+    assert canonicalize("hummus") == "Hummus"  # not a plural
+
+def test_recipe_parsed_straight_from_llm_text():
+    """Test LLM text is validated in one pass, with defaults for fields the model left out"""
+    import pytest
+    from main import RECIPE_LIST, _recipe_from_llm
+
+    recipe = _recipe_from_llm('Sure! {"title": "Tomato Soup", "ingredients": [{"name": "Tomato", "amount": "4"}], '
+                              '"instructions": [{"step": 1, "text": "Simmer"}], "nutrition_info": {}} Enjoy.')
+    assert recipe.title == "Tomato Soup" and recipe.servings == 4 and recipe.difficulty == "Medium"
+    assert recipe.nutrition_info is None
+    assert b'"title":"Tomato Soup"' in RECIPE_LIST.dump_json([recipe])
+
+    with pytest.raises(ValueError):
+        _recipe_from_llm('{"title": "Broken", "ingredients": [{"amount": 1}]}')
+    with pytest.raises(ValueError):
+        _recipe_from_llm("No recipe today")
+
+def test_image_quality_gate_rejects_bad_uploads():
+    """Test blurry, dark and blank photos are rejected from the thumbnail, sharp ones pass"""
+    import io
+    import numpy as np
+    from PIL import Image, ImageFilter
+    from image_quality import ImageQualityFilter
+
+    def jpeg(image):
+        buffer = io.BytesIO()
+        image.save(buffer, format="JPEG", quality=90)
+        return buffer.getvalue()
+
+    rng = np.random.default_rng(0)
+    shelves = np.kron(rng.integers(40, 220, (24, 32, 3)), np.ones((20, 20, 1))).astype(np.uint8)
+    sharp = Image.fromarray(shelves)
+
+    gate = ImageQualityFilter()
+    assert gate.check(jpeg(sharp)) is None
+    assert gate.check(jpeg(sharp.filter(ImageFilter.GaussianBlur(12)))).reason == "blurry"
+    assert gate.check(jpeg(Image.new("RGB", (640, 480), (5, 5, 5)))).reason == "too_dark"
+    assert gate.check(jpeg(Image.new("RGB", (640, 480), (255, 255, 255)))).reason == "overexposed"
+    assert gate.check(jpeg(Image.new("RGB", (640, 480), (128, 128, 128)))).reason == "no_content"
+    assert gate.check(jpeg(Image.new("RGB", (640, 480), (5, 5, 5)))).as_detail()["message"]
+
+def test_profiler_captures_one_request_at_a_time(tmp_path, monkeypatch):
+    """Test a second armed request is not profiled while a session is active, and empty sessions finish"""
+    import profiling
+    from profiling import ArmRequest, ProfileSession, Profiler
+
+    profiler = Profiler()
+    profiler.arm(ArmRequest(mode="cprofile", count=2))
+    assert profiler.claim({}) == "cprofile"
+    assert profiler.claim({}) is None  # overlapping request runs unprofiled...
+    assert profiler.state()["remaining"] == 1  # ...and does not use up the count
+    profiler.release()
+    assert profiler.claim({}) == "cprofile"
+
+    # enable() refused (another profiler active on 3.12+): nothing captured, no IndexError
+    monkeypatch.setattr(profiling, "PROFILE_DIR", str(tmp_path))
+    assert ProfileSession("cprofile", "api-detect").finish() == []
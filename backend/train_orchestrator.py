@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+Resumable, time-budgeted YOLO training.
+
+`run_training` wraps `model.train` so that a run can be restarted with the
+same command after a preemption or a budget stop:
+- if the run folder holds a resumable checkpoint (weights/last.pt, or the
+  weights/resume.pt snapshot taken at a budget stop) training resumes from it;
+- with a wall-clock budget, training stops after the last epoch that fits,
+  snapshots a resumable checkpoint and records progress;
+- every epoch appends a row to epoch_timings.csv next to results.csv with
+  images/sec and the split between data-loader wait and compute.
+
+Progress across sessions is kept in orchestrator_state.json in the run folder.
+
+Example:
+    python train_orchestrator.py --model yolov8n.pt --epochs 30 --budget-hours 2 \\
+        --data ../datasets/merged_food_dataset/data.yaml --image-cache
+"""
+
+import argparse
+import csv
+import json
+import shutil
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+import torch
+from ultralytics import YOLO
+
+RESUME_SNAPSHOT = "resume.pt"
+STATE_FILE = "orchestrator_state.json"
+TIMINGS_FILE = "epoch_timings.csv"
+TIMING_COLUMNS = ["epoch", "wall_s", "train_s", "data_wait_s", "compute_s", "val_save_s",
+                  "images", "images_per_s", "data_wait_pct", "finished_at"]
+
+
+def find_resume_checkpoint(weights_dir: Path, epochs: int) -> Optional[Path]:
+    """Latest checkpoint that still has optimizer state and epochs left to train."""
+    best, best_epoch = None, -1
+    for name in ("last.pt", RESUME_SNAPSHOT):
+        path = weights_dir / name
+        if not path.exists():
+            continue
+        try:
+            ckpt = torch.load(path, map_location="cpu", weights_only=False)
+        except Exception as e:
+            print(f"⚠️ Ignoring unreadable checkpoint {path}: {e}")
+            continue
+        epoch = ckpt.get("epoch", -1)
+        # Ultralytics strips the optimizer and sets epoch=-1 once a run has finished
+        if ckpt.get("optimizer") is not None and 0 <= epoch < epochs - 1 and epoch > best_epoch:
+            best, best_epoch = path, epoch
+    return best
+
+
+class EpochTimer:
+    """Trainer callbacks that split each epoch into data-loader wait and compute."""
+
+    def __init__(self):
+        self._epoch_start = self._train_end = self._last_batch_end = self._batch_start = 0.0
+        self._wait = self._compute = 0.0
+        self._batches = 0
+        self._pending = False
+        self.last_row: Optional[Dict] = None
+
+    def on_train_epoch_start(self, trainer):
+        self._epoch_start = self._last_batch_end = time.perf_counter()
+        self._wait = self._compute = 0.0
+        self._batches = 0
+
+    def on_train_batch_start(self, trainer):
+        self._batch_start = time.perf_counter()
+        self._wait += self._batch_start - self._last_batch_end
+
+    def on_train_batch_end(self, trainer):
+        self._last_batch_end = time.perf_counter()
+        self._compute += self._last_batch_end - self._batch_start
+        self._batches += 1
+
+    def on_train_epoch_end(self, trainer):
+        self._train_end = time.perf_counter()
+        self._pending = True
+
+    def on_fit_epoch_end(self, trainer):
+        # Also fired by the final validation after training; only log real epochs
+        if not self._pending:
+            return
+        self._pending = False
+        end = time.perf_counter()
+        train_s = self._train_end - self._epoch_start
+        images = min(self._batches * trainer.batch_size, len(trainer.train_loader.dataset))
+        row = {
+            "epoch": trainer.epoch + 1,
+            "wall_s": round(end - self._epoch_start, 3),
+            "train_s": round(train_s, 3),
+            "data_wait_s": round(self._wait, 3),
+            "compute_s": round(self._compute, 3),
+            "val_save_s": round(end - self._train_end, 3),
+            "images": images,
+            "images_per_s": round(images / train_s, 2) if train_s > 0 else 0.0,
+            "data_wait_pct": round(100.0 * self._wait / train_s, 1) if train_s > 0 else 0.0,
+            "finished_at": datetime.now().isoformat(timespec="seconds"),
+        }
+        self.last_row = row
+
+        path = Path(trainer.save_dir) / TIMINGS_FILE
+        write_header = not path.exists()
+        with open(path, "a", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=TIMING_COLUMNS)
+            if write_header:
+                writer.writeheader()
+            writer.writerow(row)
+        print(f"⏱️  Epoch {row['epoch']}: {row['images_per_s']} img/s, "
+              f"data wait {row['data_wait_s']:.1f}s ({row['data_wait_pct']}%), "
+              f"compute {row['compute_s']:.1f}s, val+save {row['val_save_s']:.1f}s")
+
+
+class BudgetGuard:
+    """Stops training after the last epoch that fits in the wall-clock budget."""
+
+    def __init__(self, budget_seconds: Optional[float], on_epoch: Callable[[object], None]):
+        self.budget_seconds = budget_seconds
+        self.on_epoch = on_epoch
+        self.started = time.time()
+        self.epochs_run = 0
+        self.exhausted = False
+        self._pending = False
+
+    def on_train_epoch_end(self, trainer):
+        self._pending = True
+
+    def on_fit_epoch_end(self, trainer):
+        if not self._pending:
+            return
+        self._pending = False
+        self.epochs_run += 1
+        final_epoch = trainer.epoch + 1 >= trainer.epochs
+
+        if self.budget_seconds is not None and not final_epoch and not trainer.stop:
+            elapsed = time.time() - self.started
+            mean_epoch = elapsed / self.epochs_run
+            if elapsed + mean_epoch > self.budget_seconds:
+                # last.pt is about to lose its optimizer state in final_eval; keep a resumable copy
+                shutil.copy2(trainer.last, Path(trainer.wdir) / RESUME_SNAPSHOT)
+                trainer.stop = True
+                self.exhausted = True
+                print(f"⏳ Budget reached after epoch {trainer.epoch + 1} "
+                      f"({elapsed / 60:.1f} of {self.budget_seconds / 60:.1f} min, ~{mean_epoch / 60:.1f} min/epoch)")
+        self.on_epoch(trainer)
+
+
+def _load_state(run_dir: Path) -> Dict:
+    path = run_dir / STATE_FILE
+    return json.loads(path.read_text()) if path.exists() else {"sessions": []}
+
+
+def _save_state(run_dir: Path, state: Dict):
+    run_dir.mkdir(parents=True, exist_ok=True)
+    (run_dir / STATE_FILE).write_text(json.dumps(state, indent=2))
+
+
+def run_training(model_path: str, train_args: Dict, budget_hours: Optional[float] = None,
+                 trainer=None, callbacks: Optional[Dict[str, Callable]] = None) -> Dict:
+    """
+    Train (or resume) the run at train_args' project/name; returns the progress state.
+    Status is "completed", "budget_exhausted" or, if the process died, left as "running".
+    """
+    epochs = train_args["epochs"]
+    run_dir = Path(train_args["project"]) / train_args["name"]
+    state = _load_state(run_dir)
+    if state.get("status") == "running":
+        print(f"⚠️ Previous session in {run_dir} did not finish (preempted?)")
+
+    checkpoint = find_resume_checkpoint(run_dir / "weights", epochs)
+    if checkpoint is not None:
+        print(f"🔄 Resuming from {checkpoint}")
+        model = YOLO(str(checkpoint))
+        args = {**train_args, "resume": str(checkpoint)}
+    else:
+        model = YOLO(model_path)
+        args = {**train_args, "resume": False}
+
+    session = {
+        "started_at": datetime.now().isoformat(timespec="seconds"),
+        "resumed_from": str(checkpoint) if checkpoint else None,
+        "budget_hours": budget_hours,
+    }
+    state.update({"status": "running", "epochs_target": epochs})
+    state["sessions"].append(session)
+    _save_state(run_dir, state)
+
+    def record_epoch(trainer):
+        state["epochs_completed"] = trainer.epoch + 1
+        state["last_epoch_timing"] = timer.last_row
+        _save_state(run_dir, state)
+
+    timer = EpochTimer()
+    guard = BudgetGuard(budget_hours * 3600 if budget_hours else None, record_epoch)
+    for event in ("on_train_epoch_start", "on_train_batch_start", "on_train_batch_end",
+                  "on_train_epoch_end", "on_fit_epoch_end"):
+        model.add_callback(event, getattr(timer, event))
+    model.add_callback("on_train_epoch_end", guard.on_train_epoch_end)
+    model.add_callback("on_fit_epoch_end", guard.on_fit_epoch_end)
+    for event, callback in (callbacks or {}).items():
+        model.add_callback(event, callback)
+
+    started = time.time()
+    model.train(trainer=trainer, **args)
+
+    session["ended_at"] = datetime.now().isoformat(timespec="seconds")
+    session["wall_seconds"] = round(time.time() - started, 1)
+    session["epochs_run"] = guard.epochs_run
+    state["status"] = "budget_exhausted" if guard.exhausted else "completed"
+    state["total_wall_seconds"] = round(sum(s.get("wall_seconds", 0) for s in state["sessions"]), 1)
+    if not guard.exhausted:
+        (run_dir / "weights" / RESUME_SNAPSHOT).unlink(missing_ok=True)
+    _save_state(run_dir, state)
+
+    print(f"📋 Training {state['status']}: {state.get('epochs_completed', 0)}/{epochs} epochs, "
+          f"{state['total_wall_seconds'] / 3600:.2f} h over {len(state['sessions'])} session(s)")
+    return state
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Resumable, time-budgeted YOLO fine-tuning")
+    parser.add_argument("--model", default="yolov8n.pt", help="Starting weights for a fresh run")
+    parser.add_argument("--data", default="../datasets/merged_food_dataset/data.yaml")
+    parser.add_argument("--epochs", type=int, default=30)
+    parser.add_argument("--batch", type=int, default=8)
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--project", default="kitchen_assistant_training_cpu_aug")
+    parser.add_argument("--name", default="merged_food_yolov8n_cpu_aug_30epochs")
+    parser.add_argument("--budget-hours", type=float, default=None, help="Stop cleanly before exceeding this")
+    parser.add_argument("--image-cache", action="store_true", help="Read images from the memmap store")
+    args = parser.parse_args()
+
+    from dataset_config import resolve_dataset_config
+
+    trainer = None
+    if args.image_cache:
+        from image_cache import build_store, cached_trainer, dataset_image_dirs, default_cache_dir
+
+        cache_dir = default_cache_dir(args.data)
+        for img_path in dataset_image_dirs(args.data):
+            build_store(img_path, args.imgsz, cache_dir)
+        trainer = cached_trainer(str(cache_dir))
+
+    run_training(
+        args.model,
+        {
+            "data": resolve_dataset_config(args.data),
+            "epochs": args.epochs,
+            "batch": args.batch,
+            "imgsz": args.imgsz,
+            "workers": args.workers,
+            "device": "cpu",
+            "project": args.project,
+            "name": args.name,
+            "exist_ok": True,
+            "amp": False,
+        },
+        budget_hours=args.budget_hours,
+        trainer=trainer,
+    )
+
+
+if __name__ == "__main__":
+    main()